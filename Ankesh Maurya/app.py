@@ -1,16 +1,19 @@
 import streamlit as st
-import json
-import os
 import requests
-from datetime import datetime
-from PIL import Image
-import pytesseract
-import PyPDF2
-import docx
-from io import BytesIO
-from difflib import get_close_matches
-import hashlib
 import re
+from banking_guardrail import BANKING_KEYWORDS, contains_banking_keyword, fuzzy_match, normalize_with_synonyms
+from batch_answer import MAX_BATCH_QUESTIONS, answer_questions, build_chunk_index, dedupe_questions, select_chunks_for_questions
+from chat_store import ChatStore
+from chat_window import render_window
+from doc_cache import DocumentCache, file_digest
+from doc_extract import EXTRACTION_FAILURES, extract_file_content
+from llm_gateway import BUSY_MESSAGE, PRIORITY_ANSWER, GatewayBusy, gateway
+from model_warmer import MODEL_KEEP_ALIVE, ModelWarmer
+from ollama_health import UNAVAILABLE_MESSAGE, CircuitOpen, health
+from rerun_profiler import finish_rerun, is_admin, profiled, render_panel, section, start_rerun
+from theme_assets import COLOR_SYSTEM, theme_style_tags
+from tracing import record_ollama, request_trace, span, start_metrics_server, traced
+from user_store import UserStore
 
 st.set_page_config(
     page_title="BankBot - Banking Assistant",
@@ -22,6 +25,8 @@ st.set_page_config(
 OLLAMA_URL = "http://127.0.0.1:11434/api/generate"
 USERS_FILE = "users.json"
 DEFAULT_MODEL = "qwen2.5:1.5b"
+# Seconds between refreshes of the sidebar's Ollama status.
+STATUS_REFRESH_SECONDS = 5
 
 SYSTEM_PROMPT = """You are BankBot, a restricted banking assistant.
 You must answer only banking, finance, or account-related questions.
@@ -31,132 +36,81 @@ Do not provide programming, medical, legal, personal, or general knowledge answe
 Do not speculate or invent information.
 Be helpful, professional, and concise in your banking responses."""
 
-BANKING_SYNONYMS = {
-    "money": "balance",
-    "funds": "balance",
-    "cash": "balance",
-    "salary": "salary account",
-    "income": "salary account",
-    "pay": "upi",
-    "payment": "transaction",
-    "send": "transfer",
-    "receive": "credit",
-    "withdrawal": "withdraw",
-    "depositing": "deposit",
-    "loan amount": "loan",
-    "interest charge": "interest",
-    "monthly payment": "emi",
-    "installment": "emi",
-    "card swipe": "debit card",
-    "bank app": "mobile banking",
-    "online transfer": "net banking"
-}
-
-def normalize_with_synonyms(text: str) -> str:
-    text_lower = text.lower()
-    for synonym, actual in BANKING_SYNONYMS.items():
-        text_lower = text_lower.replace(synonym, actual)
-    return text_lower
-
-# Enhanced color system matching your requirements
-COLOR_SYSTEM = {
-    "light": {
-        "bg": "#F8FAFC",
-        "secondary_bg": "#FFFFFF",
-        "sidebar_bg": "#FFFFFF",
-        "text_primary": "#0F172A",
-        "text_secondary": "#64748B",
-        "user_bubble": "#3B82F6",
-        "user_text": "#FFFFFF",
-        "bot_bubble": "#EFF6FF",
-        "bot_text": "#1E40AF",
-        "border": "#E2E8F0",
-        "accent": "#3B82F6",
-        "accent_hover": "#60A5FA",
-        "input_bg": "#FFFFFF",
-        "button_primary": "#3B82F6",
-        "button_hover": "#60A5FA",
-        "icon_color": "#64748B",
-        "document_box_bg": "#F1F5F9",  # Changed from dark to light gray
-        "document_box_text": "#0F172A",  # Changed from light to dark text
-        "chat_input_border": "#CBD5E1",
-        "chat_input_bg": "#F8FAFC"  # Added new property for chat input background
-    },
-    "dark": {
-        "bg": "#0F172A",
-        "secondary_bg": "#1E293B",
-        "sidebar_bg": "#1E293B",
-        "text_primary": "#F1F5F9",
-        "text_secondary": "#94A3B8",
-        "user_bubble": "#60A5FA",
-        "user_text": "#0F172A",
-        "bot_bubble": "#1E40AF",
-        "bot_text": "#EFF6FF",
-        "border": "#334155",
-        "accent": "#60A5FA",
-        "accent_hover": "#3B82F6",
-        "input_bg": "#1E293B",
-        "button_primary": "#3B82F6",
-        "button_hover": "#60A5FA",
-        "icon_color": "#94A3B8",
-        "chat_input_bg": "#1E293B"  # Added for consistency
-    }
-}
-
-def load_users():
-    if os.path.exists(USERS_FILE):
-        with open(USERS_FILE, 'r') as f:
-            return json.load(f)
-    return {}
-
-def save_users(users):
-    with open(USERS_FILE, 'w') as f:
-        json.dump(users, f, indent=2)
+
+@st.cache_resource
+def get_user_store():
+    # Accounts created before the SQLite store are imported from users.json.
+    return UserStore(legacy_users_file=USERS_FILE)
+
+@st.cache_resource
+def get_model_warmer():
+    return ModelWarmer(DEFAULT_MODEL).start()
+
+@st.cache_resource
+def get_ollama_health():
+    # One circuit breaker for all sessions, kept current by a background probe.
+    return health.start()
+
+@st.cache_resource
+def get_chat_store():
+    return ChatStore()
+
+@st.cache_resource
+def get_metrics_server():
+    # Prometheus endpoint for the latency spans on 9465 (BANKBOT_METRICS_PORT overrides, 0 disables).
+    return start_metrics_server(9465)
 
 def verify_login(username, password):
-    users = load_users()
-    hashed = hashlib.sha256(password.encode()).hexdigest()
-    return username in users and users[username] == hashed
+    return get_user_store().verify_login(username, password)
 
 def create_user(username, password):
-    users = load_users()
-    if username in users:
-        return False
-    users[username] = hashlib.sha256(password.encode()).hexdigest()
-    save_users(users)
-    return True
-
-def query_ollama(prompt, context="", model=DEFAULT_MODEL, temperature=0.7, num_predict=512):
+    return get_user_store().create_user(username, password)
+
+@profiled("query_ollama")
+def query_ollama(prompt, context="", model=DEFAULT_MODEL, temperature=0.7, num_predict=512, priority=PRIORITY_ANSWER):
     try:
-        full_prompt = f"""{SYSTEM_PROMPT}
+        with span("prompt_build"):
+            full_prompt = f"""{SYSTEM_PROMPT}
 
 STRICT RULE:
 If document context is provided, answer ONLY from it.
 If the answer is not present, reply exactly:
 "Answer not found in the provided document."
 """
-        if context:
-            full_prompt += f"Context from uploaded file:\n{context}\n\n"
-        full_prompt += f"User: {prompt}\nAssistant:"
+            if context:
+                full_prompt += f"Context from uploaded file:\n{context}\n\n"
+            full_prompt += f"User: {prompt}\nAssistant:"
 
         payload = {
             "model": model,
             "prompt": full_prompt,
             "stream": False,
+            "keep_alive": MODEL_KEEP_ALIVE,
             "options": {
                 "temperature": temperature,
                 "num_predict": num_predict
             }
         }
 
-        response = requests.post(OLLAMA_URL, json=payload, timeout=60)
+        # The breaker is checked first, so while Ollama is down this returns at once instead of timing out
+        with health.call(), gateway.slot(priority), span("generation"):
+            response = requests.post(OLLAMA_URL, json=payload, timeout=60)
+            if response.status_code >= 500:
+                response.raise_for_status()  # counts against the breaker
 
         if response.status_code == 200:
             result = response.json()
+            record_ollama(result)
             return result.get("response", "I apologize, but I couldn't process that request.")
         else:
             return "I'm currently unable to connect to the banking knowledge base. Please try again."
 
+    except CircuitOpen:
+        return UNAVAILABLE_MESSAGE
+    except GatewayBusy:
+        return BUSY_MESSAGE
+    except requests.exceptions.HTTPError:
+        return "I'm currently unable to connect to the banking knowledge base. Please try again."
     except requests.exceptions.ConnectionError:
         return "Unable to connect to the banking assistant service. Please ensure Ollama is running."
     except requests.exceptions.Timeout:
@@ -164,47 +118,6 @@ If the answer is not present, reply exactly:
     except Exception:
         return "I encountered an error processing your request. Please try again."
 
-def extract_text_from_pdf(file):
-    try:
-        pdf_reader = PyPDF2.PdfReader(BytesIO(file.read()))
-        text = ""
-        for page in pdf_reader.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text += page_text
-        return text
-    except Exception as e:
-        return f"Error extracting PDF: {str(e)}"
-
-def extract_text_from_docx(file):
-    try:
-        doc = docx.Document(BytesIO(file.read()))
-        text = "\n".join([paragraph.text for paragraph in doc.paragraphs])
-        return text
-    except Exception as e:
-        return f"Error extracting DOCX: {str(e)}"
-
-def extract_text_from_image(file):
-    try:
-        image = Image.open(file)
-        text = pytesseract.image_to_string(image)
-        return text if text.strip() else "No text detected in image"
-    except Exception as e:
-        return f"Error extracting text from image: {str(e)}"
-
-def extract_file_content(uploaded_file):
-    file_type = uploaded_file.name.split('.')[-1].lower()
-    if file_type == 'txt':
-        return uploaded_file.read().decode('utf-8')
-    elif file_type == 'pdf':
-        return extract_text_from_pdf(uploaded_file)
-    elif file_type == 'docx':
-        return extract_text_from_docx(uploaded_file)
-    elif file_type in ['png', 'jpg', 'jpeg']:
-        return extract_text_from_image(uploaded_file)
-    else:
-        return "Unsupported file format"
-
 def init_session_state():
     if 'authenticated' not in st.session_state:
         st.session_state.authenticated = False
@@ -212,8 +125,10 @@ def init_session_state():
         st.session_state.username = ""
     if 'messages' not in st.session_state:
         st.session_state.messages = []
-    if 'chat_history' not in st.session_state:
-        st.session_state.chat_history = []
+    if 'current_chat_id' not in st.session_state:
+        st.session_state.current_chat_id = None
+    if 'history_page' not in st.session_state:
+        st.session_state.history_page = 0
     if 'file_context' not in st.session_state:
         st.session_state.file_context = ""
     if 'file_name' not in st.session_state:
@@ -228,269 +143,22 @@ def init_session_state():
         st.session_state.confirm_delete_history = False
     if 'document_keywords' not in st.session_state:
         st.session_state.document_keywords = []
+    if 'document_chunks' not in st.session_state:
+        st.session_state.document_chunks = []
+    if 'document_index' not in st.session_state:
+        st.session_state.document_index = {}
+    if 'file_digest' not in st.session_state:
+        st.session_state.file_digest = ""
+    if 'file_upload_id' not in st.session_state:
+        st.session_state.file_upload_id = ""
+    if 'file_notices' not in st.session_state:
+        st.session_state.file_notices = []
     if "scroll_to_bottom" not in st.session_state:
         st.session_state.scroll_to_bottom = False
 
+@profiled("styles")
 def apply_banking_styles(theme):
-    colors = COLOR_SYSTEM[theme]
-    st.markdown(f"""
-        <style>
-        @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&display=swap');
-        
-        * {{
-            font-family: 'Inter', -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif;
-        }}
-
-        html, body, [data-testid="stAppViewContainer"], [data-testid="stApp"] {{
-            background-color: {colors['bg']} !important;
-        }}
-
-        [data-testid="stSidebar"] {{
-            background-color: {colors['sidebar_bg']} !important;
-            border-right: 1px solid {colors['border']};
-        }}
-
-        [data-testid="stSidebar"] [data-testid="stMarkdownContainer"] p {{
-            color: {colors['text_primary']} !important;
-        }}
-
-        [data-testid="stSidebar"] * {{
-            color: {colors['text_primary']} !important;
-        }}
-
-        /* Chat Messages */
-        .stChatMessage {{
-            padding: 1rem 1.25rem !important;
-            border-radius: 1rem !important;
-            margin-bottom: 1rem !important;
-            line-height: 1.6 !important;
-            box-shadow: 0 1px 3px rgba(0,0,0,0.1);
-        }}
-
-        .stChatMessage[data-testid*="user"] {{
-            background-color: {colors['user_bubble']} !important;
-            color: {colors['user_text']} !important;
-            margin-left: 15% !important;
-            border: none !important;
-        }}
-
-        .stChatMessage[data-testid*="user"] p {{
-            color: {colors['user_text']} !important;
-        }}
-
-        .stChatMessage[data-testid*="assistant"] {{
-            background-color: {colors['bot_bubble']} !important;
-            color: {colors['bot_text']} !important;
-            margin-right: 20% !important;
-            border: 1px solid {colors['border']} !important;
-        }}
-
-        .stChatMessage[data-testid*="assistant"] p {{
-            color: {colors['bot_text']} !important;
-        }}
-
-        /* Chat Input */
-        .stChatInput {{
-            border-radius: 1.5rem !important;
-            border: 2px solid {colors.get('chat_input_border', colors['border'])} !important;
-            background-color: {colors.get('chat_input_bg', colors['input_bg'])} !important;
-            box-shadow: 0 2px 8px rgba(0, 0, 0, 0.05) !important;
-        }}
-
-        .stChatInput textarea {{
-            color: {colors['text_primary']} !important;
-            background-color: {colors.get('chat_input_bg', colors['input_bg'])} !important;
-            font-size: 15px !important;
-        }}
-
-        .stChatInput textarea::placeholder {{
-            color: {colors['text_secondary']} !important;
-            font-size: 15px !important;
-        }}
-
-        /* Buttons */
-        .stButton button {{
-            border-radius: 0.75rem !important;
-            font-weight: 500 !important;
-            transition: all 0.2s ease !important;
-            border: 1px solid {colors['border']} !important;
-            background-color: {colors['secondary_bg']} !important;
-            color: {colors['text_primary']} !important;
-        }}
-
-        .stButton button:hover {{
-            background-color: {colors['button_hover']} !important;
-            color: white !important;
-            border-color: {colors['button_hover']} !important;
-            transform: translateY(-1px) !important;
-            box-shadow: 0 4px 12px rgba(59, 130, 246, 0.3) !important;
-        }}
-
-        .stButton button[kind="primary"] {{
-            background-color: {colors['button_primary']} !important;
-            color: white !important;
-            border: none !important;
-        }}
-
-        .stButton button[kind="primary"]:hover {{
-            background-color: {colors['button_hover']} !important;
-        }}
-
-        /* Text Inputs */
-        .stTextInput input, .stPasswordInput input {{
-            border-radius: 0.75rem !important;
-            border: 1px solid {colors['border']} !important;
-            font-size: 15px !important;
-            background-color: {colors['input_bg']} !important;
-            color: {colors['text_primary']} !important;
-        }}
-
-        .stTextInput input:focus, .stPasswordInput input:focus {{
-            border-color: {colors['accent']} !important;
-            box-shadow: 0 0 0 2px {colors['accent']}30 !important;
-        }}
-
-        /* File Uploader */
-        [data-testid="stFileUploader"] {{
-            background-color: {colors.get('document_box_bg', colors['secondary_bg'])} !important;
-            border: 1px dashed {colors['border']} !important;
-            border-radius: 0.75rem !important;
-            padding: 1rem !important;
-        }}
-
-        [data-testid="stFileUploader"] label {{
-            color: {colors.get('document_box_text', colors['text_primary'])} !important;
-            font-weight: 500 !important;
-        }}
-
-        [data-testid="stFileUploader"] small {{
-            color: {colors.get('document_box_text', colors['text_secondary'])} !important;
-        }}
-
-        [data-testid="stFileUploader"] button {{
-            background-color: {colors['accent']} !important;
-            color: black !important;
-            border: none !important;
-            padding: 0.5rem 1rem !important;
-            border-radius: 0.5rem !important;
-            font-weight: 500 !important;
-        }}
-
-        [data-testid="stFileUploader"] button:hover {{
-            background-color: {colors['accent_hover']} !important;
-        }}
-
-        /* Headers and Text */
-        h1, h2, h3, h4, h5, h6 {{
-            color: {colors['text_primary']} !important;
-        }}
-
-        p, span, div {{
-            color: {colors['text_primary']} !important;
-        }}
-
-        .stMarkdown {{
-            color: {colors['text_primary']} !important;
-        }}
-
-        /* Tabs */
-        .stTabs [data-baseweb="tab-list"] {{
-            gap: 0.5rem;
-        }}
-
-        .stTabs [data-baseweb="tab"] {{
-            border-radius: 0.5rem !important;
-            color: {colors['text_secondary']} !important;
-            background-color: transparent !important;
-        }}
-
-        .stTabs [aria-selected="true"] {{
-            background-color: {colors['accent']} !important;
-            color: white !important;
-        }}
-
-        /* Divider */
-        hr {{
-            border-color: {colors['border']} !important;
-        }}
-
-        /* Success/Error/Warning Messages */
-        .stSuccess {{
-            background-color: #10B98120 !important;
-            color: #059669 !important;
-            border-radius: 0.75rem !important;
-        }}
-
-        .stError {{
-            background-color: #EF444420 !important;
-            color: #DC2626 !important;
-            border-radius: 0.75rem !important;
-        }}
-
-        .stWarning {{
-            background-color: #F59E0B20 !important;
-            color: #D97706 !important;
-            border-radius: 0.75rem !important;
-        }}
-
-        /* Custom Classes */
-        .file-status {{
-            padding: 0.875rem !important;
-            border-radius: 0.75rem !important;
-            background-color: {colors.get('document_box_bg', colors['secondary_bg'])} !important;
-            border: 1px solid {colors.get('document_box_bg', colors['border'])} !important;
-            font-size: 14px !important;
-            color: {colors.get('document_box_text', colors['text_primary'])} !important;
-            margin: 0.5rem 0 !important;
-        }}
-
-        .file-status strong {{
-            color: {colors.get('document_box_text', colors['text_primary'])} !important;
-        }}
-
-        .info-box {{
-            padding: 1rem !important;
-            border-radius: 0.75rem !important;
-            background-color: {colors['bot_bubble']} !important;
-            border-left: 4px solid {colors['accent']} !important;
-            font-size: 14px !important;
-            color: {colors['bot_text']} !important;
-            margin: 1rem 0 !important;
-        }}
-
-        /* Spinner */
-        .stSpinner > div {{
-            border-top-color: {colors['accent']} !important;
-        }}
-
-        /* Scrollbar */
-        ::-webkit-scrollbar {{
-            width: 8px;
-            height: 8px;
-        }}
-
-        ::-webkit-scrollbar-track {{
-            background: {colors['secondary_bg']};
-        }}
-
-        ::-webkit-scrollbar-thumb {{
-            background: {colors['border']};
-            border-radius: 4px;
-        }}
-
-        ::-webkit-scrollbar-thumb:hover {{
-            background: {colors['accent']};
-        }}
-
-        /* Theme Toggle Button */
-        .theme-toggle {{
-            position: fixed;
-            top: 1rem;
-            right: 1rem;
-            z-index: 999;
-        }}
-        </style>
-    """, unsafe_allow_html=True)
+    st.markdown(theme_style_tags(theme, st.get_option("server.enableStaticServing")), unsafe_allow_html=True)
 
 def authentication_page():
     apply_banking_styles(st.session_state.theme)
@@ -556,54 +224,16 @@ def authentication_page():
                 else:
                     st.error("Username already exists", icon="❌")
 
-BANKING_KEYWORDS = [
-    "bank", "banking", "branch", "ifsc", "micr", "swift",
-    "customer id", "cif", "account number",
-    "account", "savings account", "current account", "salary account",
-    "joint account", "zero balance account", "student account",
-    "nri account", "demat account",
-    "balance", "available balance", "ledger balance",
-    "account statement", "mini statement", "passbook",
-    "transaction", "credit", "debit", "transfer",
-    "fund transfer", "money transfer", "bank transfer",
-    "net banking", "internet banking", "mobile banking",
-    "online banking", "digital banking",
-    "upi", "upi id", "upi pin", "bhim",
-    "google pay", "phonepe", "paytm",
-    "neft", "rtgs", "imps", "ecs", "nach",
-    "debit card", "credit card", "atm",
-    "card limit", "card blocking",
-    "loan", "personal loan", "home loan", "education loan",
-    "car loan", "gold loan", "business loan",
-    "interest", "interest rate", "emi",
-    "fixed deposit", "fd", "recurring deposit", "rd",
-    "kyc", "aadhaar", "pan card",
-    "charges", "fees", "penalty",
-    "cheque", "demand draft",
-    "fraud", "otp", "mpin"
-]
-
-def fuzzy_match(text: str, keywords, cutoff=0.8) -> bool:
-    words = text.lower().split()
-    for word in words:
-        if get_close_matches(word, keywords, n=1, cutoff=cutoff):
-            return True
-    return False
-
+@traced("guardrail")
 def is_banking_question(text: str) -> bool:
     text_norm = normalize_with_synonyms(text)
-    if any(k in text_norm for k in BANKING_KEYWORDS):
+    if contains_banking_keyword(text_norm):
         return True
     if st.session_state.get("document_keywords"):
         if any(k in text_norm for k in st.session_state.document_keywords):
             return True
     return fuzzy_match(text_norm, BANKING_KEYWORDS)
 
-def extract_banking_terms(text: str):
-    terms = BANKING_KEYWORDS
-    found = sorted({t for t in terms if t in text.lower()})
-    return found
-
 def extract_keywords_from_document(text: str, base_keywords):
     text_lower = text.lower()
     return sorted({kw for kw in base_keywords if kw in text_lower})
@@ -620,15 +250,73 @@ def chunk_text(text, chunk_size=800, overlap=100):
         start = end - overlap
     return chunks
 
-def select_relevant_chunks(chunks, question, max_chunks=3):
-    question_words = set(question.lower().split())
-    scored = []
-    for chunk in chunks:
-        chunk_words = set(chunk.lower().split())
-        score = len(question_words.intersection(chunk_words))
-        scored.append((score, chunk))
-    scored.sort(key=lambda x: x[0], reverse=True)
-    return [chunk for score, chunk in scored[:max_chunks] if score > 0]
+@st.cache_resource
+def get_document_cache():
+    return DocumentCache()
+
+@profiled("process_document")
+def process_document(uploaded_file, progress=None):
+    """Extract and index an upload, reusing the cached result for bytes seen before.
+
+    Returns (digest, entry, error); entry is None when there is no text to use.
+    """
+    cache = get_document_cache()
+    digest = file_digest(uploaded_file.getvalue())
+    entry = cache.get(digest)
+    if entry is None:
+        notices = []
+        content = extract_file_content(uploaded_file, progress=progress, notice=notices.append)
+        if not content or not content.strip():
+            return digest, None, "No readable text found"
+        # Don't pin failures (e.g. Tesseract not installed yet) in the cache, or pass them to the model as text.
+        if content.startswith(EXTRACTION_FAILURES):
+            return digest, None, content
+        chunks = chunk_text(content)
+        entry = {
+            "text": content,
+            "notices": notices,
+            "keywords": extract_keywords_from_document(content, BANKING_KEYWORDS),
+            "chunks": chunks,
+            "index": build_chunk_index(chunks)
+        }
+        cache.put(digest, entry)
+    return digest, entry, None
+
+def load_document(uploaded_file):
+    """Makes the upload the session's document; returns why it couldn't, or None once loaded."""
+    # Reruns with the same upload only cost this comparison.
+    upload_id = getattr(uploaded_file, "file_id", None) or f"{uploaded_file.name}:{uploaded_file.size}"
+    if upload_id == st.session_state.file_upload_id and st.session_state.file_digest:
+        return None
+
+    progress_bar = st.progress(0.0)
+    digest, entry, error = process_document(
+        uploaded_file,
+        progress=lambda done, total: progress_bar.progress(done / total, text=f"Page {done} of {total}")
+    )
+    progress_bar.empty()
+    if entry is None:
+        return error
+
+    st.session_state.file_context = entry["text"]
+    st.session_state.document_keywords = entry["keywords"]
+    st.session_state.document_chunks = entry["chunks"]
+    st.session_state.document_index = entry["index"]
+    st.session_state.file_notices = entry.get("notices", [])
+    st.session_state.file_name = uploaded_file.name
+    st.session_state.file_digest = digest
+    st.session_state.file_upload_id = upload_id
+    return None
+
+def clear_document():
+    st.session_state.file_context = ""
+    st.session_state.file_name = ""
+    st.session_state.document_keywords = []
+    st.session_state.document_chunks = []
+    st.session_state.document_index = {}
+    st.session_state.file_notices = []
+    st.session_state.file_digest = ""
+    st.session_state.file_upload_id = ""
 
 def extract_questions_from_text(text: str):
     lines = re.split(r'\n|\.', text)
@@ -649,11 +337,44 @@ def get_banking_questions_from_document(text: str):
     banking_questions = [q for q in all_questions if is_banking_question(q)]
     return banking_questions
 
+def answer_document_questions(questions):
+    chunks = st.session_state.document_chunks
+    selections = select_chunks_for_questions(chunks, questions, index=st.session_state.document_index)
+    contexts = ["\n\n".join(selected) for selected in selections]
+    answers = [None] * len(questions)
+
+    def render():
+        return "\n\n---\n\n".join(
+            f"**Q{idx}. {question}**\n\n{answer if answer is not None else '_Answering..._'}"
+            for idx, (question, answer) in enumerate(zip(questions, answers), start=1)
+        )
+
+    with st.chat_message("assistant"):
+        progress = st.progress(0.0, text=f"Answering {len(questions)} questions...")
+        placeholder = st.empty()
+        placeholder.markdown(render())
+        answer_fn = lambda question, context: query_ollama(question, context=context, temperature=0.2, num_predict=200)
+        for done, (position, answer) in enumerate(answer_questions(questions, contexts, answer_fn), start=1):
+            answers[position] = answer
+            placeholder.markdown(render())
+            progress.progress(done / len(questions), text=f"Answered {done} of {len(questions)} questions")
+        progress.empty()
+    return render()
+
+def render_message(message):
+    with st.chat_message(message["role"]):
+        st.write(message["content"])
+
+def ollama_status():
+    ollama = get_ollama_health()
+    st.caption(get_model_warmer().status_label() if ollama.online else ollama.status_label())
+
 def chat_interface():
     apply_banking_styles(st.session_state.theme)
     colors = COLOR_SYSTEM[st.session_state.theme]
+    chat_store = get_chat_store()
 
-    with st.sidebar:
+    with st.sidebar, section("sidebar"):
         # Theme Toggle at Top
         st.markdown(f"""
             <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 1.5rem; padding: 0.5rem 0;">
@@ -667,6 +388,12 @@ def chat_interface():
                 st.session_state.theme = "dark" if st.session_state.theme == "light" else "light"
                 st.rerun()
 
+        st.fragment(ollama_status, run_every=STATUS_REFRESH_SECONDS)()
+        queue = gateway.stats()
+        if queue["completed"] or queue["queued"] or queue["rejected"]:
+            st.caption(f"Queue: {queue['active']} running · {queue['queued']} waiting · "
+                       f"p95 wait {queue['p95_wait_ms']:.0f} ms · {queue['rejected']} turned away")
+
         st.divider()
 
         # New Chat Section
@@ -675,30 +402,49 @@ def chat_interface():
         if st.button("➕ New Chat", use_container_width=True):
             if st.session_state.messages:
                 first_question = next((m["content"] for m in st.session_state.messages if m["role"] == "user"), "New Chat")
-                st.session_state.chat_history.insert(0, {
-                    "title": first_question[:40] + ("..." if len(first_question) > 40 else ""),
-                    "messages": st.session_state.messages.copy()
-                })
+                chat_store.save_chat(
+                    st.session_state.username,
+                    first_question[:40] + ("..." if len(first_question) > 40 else ""),
+                    st.session_state.messages,
+                    chat_id=st.session_state.current_chat_id
+                )
             st.session_state.messages = []
-            st.session_state.file_context = ""
-            st.session_state.file_name = ""
+            st.session_state.current_chat_id = None
+            st.session_state.history_page = 0
+            clear_document()
             st.rerun()
 
-        # Recent Chats
-        if st.session_state.chat_history:
+        # Recent Chats (one page at a time; messages are loaded when a chat is opened)
+        with section("chat_list"):
+            saved_chats, has_older = chat_store.list_chats(st.session_state.username, st.session_state.history_page)
+        if saved_chats:
             st.markdown(f"""<p style="font-size: 11px; color: {colors['text_secondary']}; margin-top: 1rem; margin-bottom: 0.5rem; text-transform: uppercase; letter-spacing: 0.5px;">Recent Chats</p>""", unsafe_allow_html=True)
-            for idx, chat in enumerate(st.session_state.chat_history):
+            for chat in saved_chats:
                 col1, col2 = st.columns([5, 1])
                 with col1:
-                    if st.button(f"{chat['title']}", key=f"load_{idx}", use_container_width=True):
-                        st.session_state.messages = chat['messages'].copy()
+                    if st.button(f"{chat['title']}", key=f"load_{chat['id']}", use_container_width=True):
+                        st.session_state.messages = chat_store.get_messages(st.session_state.username, chat['id'])
+                        st.session_state.current_chat_id = chat['id']
                         st.rerun()
                 with col2:
-                    if st.button("×", key=f"delete_{idx}"):
-                        st.session_state.chat_history.pop(idx)
+                    if st.button("×", key=f"delete_{chat['id']}"):
+                        chat_store.delete_chat(st.session_state.username, chat['id'])
+                        if st.session_state.current_chat_id == chat['id']:
+                            st.session_state.current_chat_id = None
                         st.rerun()
 
-        if st.session_state.chat_history:
+        if st.session_state.history_page > 0 or has_older:
+            col_newer, col_older = st.columns(2)
+            with col_newer:
+                if st.session_state.history_page > 0 and st.button("‹ Newer", use_container_width=True):
+                    st.session_state.history_page -= 1
+                    st.rerun()
+            with col_older:
+                if has_older and st.button("Older ›", use_container_width=True):
+                    st.session_state.history_page += 1
+                    st.rerun()
+
+        if saved_chats:
             if st.button("Delete History", use_container_width=True):
                 st.session_state.confirm_delete_history = True
 
@@ -707,7 +453,9 @@ def chat_interface():
             col_yes, col_no = st.columns(2)
             with col_yes:
                 if st.button("Yes"):
-                    st.session_state.chat_history.clear()
+                    chat_store.delete_all(st.session_state.username)
+                    st.session_state.current_chat_id = None
+                    st.session_state.history_page = 0
                     st.session_state.confirm_delete_history = False
                     st.success("History deleted")
                     st.rerun()
@@ -729,18 +477,16 @@ def chat_interface():
 
         if uploaded_file:
             with st.spinner("⏳ Processing..."):
-                content = extract_file_content(uploaded_file)
-                if content and content.strip():
-                    st.session_state.file_context = content
-                    st.session_state.document_keywords = extract_keywords_from_document(content, BANKING_KEYWORDS)
-                    st.session_state.file_name = uploaded_file.name
+                error = load_document(uploaded_file)
+                if error is None:
                     st.success("Document loaded", icon="✅")
+                    for notice in st.session_state.file_notices:
+                        st.info(notice, icon="ℹ️")
                 else:
-                    st.warning("⚠️ No readable text found")
+                    st.warning(f"⚠️ {error}")
 
             if st.button("Clear Document", use_container_width=True):
-                st.session_state.file_context = ""
-                st.session_state.file_name = ""
+                clear_document()
                 st.rerun()
 
         elif st.session_state.file_context:
@@ -750,8 +496,7 @@ def chat_interface():
                 </div>
             """, unsafe_allow_html=True)
             if st.button("Clear Document", use_container_width=True):
-                st.session_state.file_context = ""
-                st.session_state.file_name = ""
+                clear_document()
                 st.rerun()
 
         st.divider()
@@ -767,8 +512,9 @@ def chat_interface():
             st.session_state.authenticated = False
             st.session_state.username = ""
             st.session_state.messages = []
-            st.session_state.file_context = ""
-            st.session_state.file_name = ""
+            st.session_state.current_chat_id = None
+            st.session_state.history_page = 0
+            clear_document()
             st.rerun()
 
     # Main Chat Area
@@ -814,7 +560,7 @@ def chat_interface():
 
     # Document Info Box
     if st.session_state.file_context:
-        terms = extract_banking_terms(st.session_state.file_context)
+        terms = st.session_state.document_keywords
         st.markdown(f"""
             <div class="info-box">
                 <strong>Document Active:</strong> {st.session_state.file_name}<br>
@@ -824,61 +570,64 @@ def chat_interface():
             </div>
         """, unsafe_allow_html=True)
 
-    # Display Messages
-    for message in st.session_state.messages:
-        with st.chat_message(message["role"]):
-            st.write(message["content"])
+    # Display Messages (latest page only; earlier pages on demand)
+    with section("messages"):
+        render_window(st.session_state.messages, render_message, chat_key=st.session_state.current_chat_id)
 
     # Chat Input
     user_input = st.chat_input("Ask about loans, KYC, transactions...")
 
     if user_input:
-        st.session_state.messages.append({"role": "user", "content": user_input})
+        with request_trace("chat", model=DEFAULT_MODEL):
+            st.session_state.messages.append({"role": "user", "content": user_input})
 
-        if user_input.lower().strip() == "answer" and st.session_state.file_context:
-            banking_questions = get_banking_questions_from_document(st.session_state.file_context)
-            if not banking_questions:
-                response = "No banking-related questions were found in the uploaded document."
-            else:
-                answers = []
-                chunks = chunk_text(st.session_state.file_context)
-                for idx, question in enumerate(banking_questions, start=1):
-                    if idx > 20:
-                        break
-                    relevant_chunks = select_relevant_chunks(chunks, question)
-                    context = "\n\n".join(relevant_chunks)
-                    answer = query_ollama(question, context=context, temperature=0.2, num_predict=200)
-                    answers.append(f"**Q{idx}. {question}**\n\n{answer}")
-                response = "\n\n---\n\n".join(answers)
-
-        elif not is_banking_question(user_input):
-            response = "I can assist only with banking-related queries."
+            if user_input.lower().strip() == "answer" and st.session_state.file_context:
+                banking_questions = dedupe_questions(get_banking_questions_from_document(st.session_state.file_context))
+                if not banking_questions:
+                    response = "No banking-related questions were found in the uploaded document."
+                else:
+                    response = answer_document_questions(banking_questions[:MAX_BATCH_QUESTIONS])
 
-        else:
-            context_to_use = ""
-            if st.session_state.file_context:
-                chunks = chunk_text(st.session_state.file_context)
-                relevant_chunks = select_relevant_chunks(chunks, user_input)
-                if relevant_chunks:
-                    context_to_use = "\n\n".join(relevant_chunks)
-
-            with st.spinner("Thinking..."):
-                response = query_ollama(
-                    user_input,
-                    context=context_to_use,
-                    temperature=st.session_state.temperature,
-                    num_predict=st.session_state.max_tokens
-                )
+            elif not is_banking_question(user_input):
+                response = "I can assist only with banking-related queries."
 
-        st.session_state.messages.append({"role": "assistant", "content": response})
+            else:
+                context_to_use = ""
+                if st.session_state.file_context:
+                    with span("retrieval"):
+                        relevant_chunks = select_chunks_for_questions(
+                            st.session_state.document_chunks, [user_input], index=st.session_state.document_index
+                        )[0]
+                    if relevant_chunks:
+                        context_to_use = "\n\n".join(relevant_chunks)
+
+                with st.spinner("Thinking..."):
+                    response = query_ollama(
+                        user_input,
+                        context=context_to_use,
+                        temperature=st.session_state.temperature,
+                        num_predict=st.session_state.max_tokens
+                    )
+
+            st.session_state.messages.append({"role": "assistant", "content": response})
         st.rerun()
 
 def main():
+    # Opt-in (BANKBOT_PROFILE_MODE); times the sections and calls marked with section/@profiled
+    start_rerun()
     init_session_state()
+    # Start loading the model while the user is still signing in.
+    if get_ollama_health().online:
+        get_model_warmer().ensure_warm()
+    get_metrics_server()
     if not st.session_state.authenticated:
         authentication_page()
     else:
         chat_interface()
+    # Not reached when the rerun ends in st.rerun(); that partial rerun isn't recorded
+    finish_rerun("chat" if st.session_state.authenticated else "login")
+    if is_admin(st.session_state.username):
+        render_panel()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
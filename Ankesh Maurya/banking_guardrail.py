@@ -0,0 +1,134 @@
+import re
+from collections import defaultdict
+from difflib import SequenceMatcher
+from functools import lru_cache
+
+BANKING_SYNONYMS = {
+    "money": "balance",
+    "funds": "balance",
+    "cash": "balance",
+    "salary": "salary account",
+    "income": "salary account",
+    "pay": "upi",
+    "payment": "transaction",
+    "send": "transfer",
+    "receive": "credit",
+    "withdrawal": "withdraw",
+    "depositing": "deposit",
+    "loan amount": "loan",
+    "interest charge": "interest",
+    "monthly payment": "emi",
+    "installment": "emi",
+    "card swipe": "debit card",
+    "bank app": "mobile banking",
+    "online transfer": "net banking"
+}
+
+BANKING_KEYWORDS = [
+    "bank", "banking", "branch", "ifsc", "micr", "swift",
+    "customer id", "cif", "account number",
+    "account", "savings account", "current account", "salary account",
+    "joint account", "zero balance account", "student account",
+    "nri account", "demat account",
+    "balance", "available balance", "ledger balance",
+    "account statement", "mini statement", "passbook",
+    "transaction", "credit", "debit", "transfer",
+    "fund transfer", "money transfer", "bank transfer",
+    "net banking", "internet banking", "mobile banking",
+    "online banking", "digital banking",
+    "upi", "upi id", "upi pin", "bhim",
+    "google pay", "phonepe", "paytm",
+    "neft", "rtgs", "imps", "ecs", "nach",
+    "debit card", "credit card", "atm",
+    "card limit", "card blocking",
+    "loan", "personal loan", "home loan", "education loan",
+    "car loan", "gold loan", "business loan",
+    "interest", "interest rate", "emi",
+    "fixed deposit", "fd", "recurring deposit", "rd",
+    "kyc", "aadhaar", "pan card",
+    "charges", "fees", "penalty",
+    "cheque", "demand draft",
+    "fraud", "otp", "mpin"
+]
+
+
+def _alternation(phrases):
+    # Longest first so "monthly payment" wins over "payment".
+    return "|".join(re.escape(p) for p in sorted(phrases, key=len, reverse=True))
+
+
+# A synonym matches at the start of a word with any ending ("payments", "sending",
+# "paycheck"), and the text is rewritten in a single pass so a replacement is never
+# rewritten again.
+_SYNONYM_PATTERN = re.compile(rf"\b({_alternation(BANKING_SYNONYMS)})\w*")
+# Same substring semantics as `any(k in text for k in BANKING_KEYWORDS)`.
+_KEYWORD_PATTERN = re.compile(_alternation(BANKING_KEYWORDS))
+
+
+def normalize_with_synonyms(text: str) -> str:
+    return _SYNONYM_PATTERN.sub(lambda m: BANKING_SYNONYMS[m.group(1)], text.lower())
+
+
+def contains_banking_keyword(text: str) -> bool:
+    return _KEYWORD_PATTERN.search(text) is not None
+
+
+class FuzzyKeywordIndex:
+    """Character-bigram index answering `difflib.get_close_matches(word, keywords, n=1)`.
+
+    Any word/keyword pair with a SequenceMatcher ratio >= cutoff either shares a bigram
+    or both strings are at most 4 characters long, so checking only those candidates
+    (after a length filter) gives the same answer as scanning every keyword.
+    """
+
+    SHORT = 4
+
+    def __init__(self, keywords, cutoff=0.8):
+        self.keywords = list(keywords)
+        self.cutoff = cutoff
+        self.bigrams = defaultdict(set)
+        self.short = []
+        for position, keyword in enumerate(self.keywords):
+            for bigram in self._bigrams(keyword):
+                self.bigrams[bigram].add(position)
+            if len(keyword) <= self.SHORT:
+                self.short.append(position)
+        self.lookup = lru_cache(maxsize=4096)(self._lookup)
+
+    @staticmethod
+    def _bigrams(text):
+        return {text[i:i + 2] for i in range(len(text) - 1)}
+
+    def _lookup(self, word):
+        candidates = set()
+        for bigram in self._bigrams(word):
+            candidates.update(self.bigrams.get(bigram, ()))
+        if len(word) <= self.SHORT:
+            candidates.update(self.short)
+
+        best_score, best_keyword = 0.0, None
+        matcher = SequenceMatcher()
+        matcher.set_seq2(word)
+        for position in sorted(candidates):
+            keyword = self.keywords[position]
+            # ratio can't exceed 2 * min(len) / (len_a + len_b)
+            shorter, total = min(len(word), len(keyword)), len(word) + len(keyword)
+            if 2.0 * shorter / total < self.cutoff:
+                continue
+            matcher.set_seq1(keyword)
+            if matcher.real_quick_ratio() >= self.cutoff and matcher.quick_ratio() >= self.cutoff:
+                score = matcher.ratio()
+                if score >= self.cutoff and score > best_score:
+                    best_score, best_keyword = score, keyword
+        return best_keyword
+
+
+_FUZZY_INDEX = FuzzyKeywordIndex(BANKING_KEYWORDS)
+
+
+def fuzzy_match(text: str, keywords=None, cutoff=0.8) -> bool:
+    if (keywords is None or keywords is BANKING_KEYWORDS) and cutoff == _FUZZY_INDEX.cutoff:
+        index = _FUZZY_INDEX
+    else:
+        index = FuzzyKeywordIndex(keywords if keywords is not None else BANKING_KEYWORDS, cutoff)
+    return any(index.lookup(word) for word in text.lower().split())
@@ -0,0 +1,83 @@
+import contextvars
+import os
+import re
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from difflib import SequenceMatcher
+
+# Match the number of generations Ollama runs side by side (OLLAMA_NUM_PARALLEL).
+OLLAMA_NUM_PARALLEL = int(os.getenv("OLLAMA_NUM_PARALLEL", "4"))
+MAX_BATCH_QUESTIONS = 20
+DUPLICATE_CUTOFF = 0.9
+
+
+def normalize_question(question: str) -> str:
+    question = re.sub(r"[^a-z0-9\s]", " ", question.lower())
+    return " ".join(question.split())
+
+
+def dedupe_questions(questions, cutoff=DUPLICATE_CUTOFF):
+    """Drop questions that are (near) identical to one already kept, preserving order."""
+    kept = []
+    kept_norm = []
+    seen = set()
+    for question in questions:
+        norm = normalize_question(question)
+        if not norm or norm in seen:
+            continue
+        if any(SequenceMatcher(None, norm, other).ratio() >= cutoff for other in kept_norm):
+            continue
+        seen.add(norm)
+        kept.append(question)
+        kept_norm.append(norm)
+    return kept
+
+
+def build_chunk_index(chunks):
+    """Inverted index of word -> chunk positions, built once per document."""
+    index = defaultdict(list)
+    for position, chunk in enumerate(chunks):
+        for word in set(chunk.lower().split()):
+            index[word].append(position)
+    return dict(index)
+
+
+def select_chunks_for_questions(chunks, questions, index=None, max_chunks=3):
+    """Score every question against every chunk in one pass over the inverted index.
+
+    Gives the same ranking as scoring each chunk by the number of question words
+    it contains, ties broken by chunk order.
+    """
+    if index is None:
+        index = build_chunk_index(chunks)
+    selected = []
+    for question in questions:
+        scores = defaultdict(int)
+        for word in set(question.lower().split()):
+            for position in index.get(word, ()):
+                scores[position] += 1
+        best = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:max_chunks]
+        selected.append([chunks[position] for position, _ in best])
+    return selected
+
+
+def answer_questions(questions, contexts, answer_fn, max_workers=OLLAMA_NUM_PARALLEL):
+    """Answer questions concurrently, yielding (position, answer) as each one finishes.
+
+    Each call runs in its own copy of the caller's context, so the spans and profiler
+    sections it records land in the request's trace and rerun profile.
+    """
+    if not questions:
+        return
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(questions)))) as pool:
+        futures = {
+            pool.submit(contextvars.copy_context().run, answer_fn, question, context): position
+            for position, (question, context) in enumerate(zip(questions, contexts))
+        }
+        for future in as_completed(futures):
+            position = futures[future]
+            try:
+                answer = future.result()
+            except Exception:
+                answer = "I encountered an error processing your request. Please try again."
+            yield position, answer
@@ -0,0 +1,102 @@
+"""Per-message cost of the banking guardrail: legacy loops vs. compiled matcher.
+
+Run with: python bench_guardrail.py [--repeat N]
+"""
+import argparse
+import timeit
+from difflib import get_close_matches
+
+from banking_guardrail import (
+    _FUZZY_INDEX,
+    BANKING_KEYWORDS,
+    BANKING_SYNONYMS,
+    contains_banking_keyword,
+    fuzzy_match,
+    normalize_with_synonyms,
+)
+
+MESSAGES = [
+    "What is the interest rate on a home loan?",
+    "How do I send money to my friend using UPI?",
+    "My monthly payment for the car loan failed, what are the charges?",
+    "Can you block my debit card, I lost it at the mall yesterday",
+    "Write me a python script that sorts a list of numbers",
+    "Who won the cricket world cup in 2011?",
+    "What is the procedure for changing the registered mobile number on my savings acount?",
+    "Tell me a joke about elephants and giraffes playing football",
+    "I want to know the minimum balence and penalty for my zero balance acount",
+    "Please explain how recurring deposits differ from fixed deposits for senior citizens",
+]
+
+
+def legacy_normalize(text):
+    text_lower = text.lower()
+    for synonym, actual in BANKING_SYNONYMS.items():
+        text_lower = text_lower.replace(synonym, actual)
+    return text_lower
+
+
+def legacy_fuzzy_match(text, keywords, cutoff=0.8):
+    for word in text.lower().split():
+        if get_close_matches(word, keywords, n=1, cutoff=cutoff):
+            return True
+    return False
+
+
+def legacy_is_banking(text):
+    text_norm = legacy_normalize(text)
+    if any(k in text_norm for k in BANKING_KEYWORDS):
+        return True
+    return legacy_fuzzy_match(text_norm, BANKING_KEYWORDS)
+
+
+def compiled_is_banking(text):
+    text_norm = normalize_with_synonyms(text)
+    if contains_banking_keyword(text_norm):
+        return True
+    return fuzzy_match(text_norm)
+
+
+def compiled_is_banking_cold(text):
+    # Every word seen for the first time: no help from the per-word lookup cache.
+    _FUZZY_INDEX.lookup.cache_clear()
+    return compiled_is_banking(text)
+
+
+def per_message_us(fn, messages, repeat):
+    total = timeit.timeit(lambda: [fn(m) for m in messages], number=repeat)
+    return total / (repeat * len(messages)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    # Off-topic messages fall through to the fuzzy matcher, which is the expensive path.
+    off_topic = [m for m in MESSAGES if not legacy_is_banking(m)]
+    rows = [
+        ("normalize", legacy_normalize, normalize_with_synonyms, MESSAGES),
+        ("full check (all messages)", legacy_is_banking, compiled_is_banking, MESSAGES),
+        ("full check (off-topic only)", legacy_is_banking, compiled_is_banking, off_topic),
+    ]
+    # Warm the compiled matcher's per-word cache the same way a running app would.
+    for message in MESSAGES:
+        compiled_is_banking(message)
+
+    print(f"{'stage':<30}{'legacy µs/msg':>16}{'compiled µs/msg':>18}{'speedup':>10}")
+    for name, legacy, compiled, messages in rows:
+        if not messages:
+            continue
+        old = per_message_us(legacy, messages, args.repeat)
+        new = per_message_us(compiled, messages, args.repeat)
+        print(f"{name:<30}{old:>16.1f}{new:>18.1f}{old / new:>9.1f}x")
+
+    if off_topic:
+        old = per_message_us(legacy_is_banking, off_topic, args.repeat)
+        new = per_message_us(compiled_is_banking_cold, off_topic, args.repeat)
+        print(f"{'off-topic, cold word cache':<30}{old:>16.1f}{new:>18.1f}{old / new:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
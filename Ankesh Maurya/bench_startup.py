@@ -0,0 +1,83 @@
+"""Cold-start cost of the app: import time (python -X importtime) and first login render.
+
+Every measurement runs in a fresh interpreter, like a newly started worker.
+
+Run with: python bench_startup.py [--repeat N] [--top N] [--render]
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP_MODULE = "app"
+# Needed only once a document is uploaded; none of them should load before login.
+DEFERRED_MODULES = ["PyPDF2", "docx", "PIL", "pytesseract"]
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)$")
+
+# --render: the first script run of the login page, imports included.
+LOGIN_RENDER = """
+import time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+AppTest.from_file({path!r}, default_timeout=120).run()
+print(time.perf_counter() - start)
+"""
+
+
+def import_times(module):
+    """{name: (self ms, cumulative ms, depth)} for every module a fresh `import module` loads."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=HERE, capture_output=True, text=True
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            times[name] = (int(self_us) / 1000, int(cumulative_us) / 1000, (len(indent) - 1) // 2)
+    if module not in times:
+        sys.exit(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    return times
+
+
+def login_render_seconds():
+    script = LOGIN_RENDER.format(path=os.path.join(HERE, f"{APP_MODULE}.py"))
+    result = subprocess.run([sys.executable, "-c", script], cwd=HERE, capture_output=True, text=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="direct imports to list")
+    parser.add_argument("--render", action="store_true", help="also time the first login render (AppTest)")
+    args = parser.parse_args()
+
+    runs = [import_times(APP_MODULE) for _ in range(args.repeat)]
+    totals = [times[APP_MODULE][1] for times in runs]
+    print(f"import {APP_MODULE}: median {statistics.median(totals):.0f} ms, "
+          f"min {min(totals):.0f} ms over {args.repeat} fresh interpreters")
+
+    last = runs[-1]
+    direct = [(name, cumulative) for name, (_, cumulative, depth) in last.items() if depth == 1]
+    print(f"\n{'slowest direct imports':<32}{'cumulative ms':>14}")
+    for name, cumulative in sorted(direct, key=lambda item: -item[1])[:args.top]:
+        print(f"{name:<32}{cumulative:>14.1f}")
+
+    print(f"\n{'deferred until first use':<32}{'at startup':>14}")
+    for name in DEFERRED_MODULES:
+        loaded = any(loaded_name == name or loaded_name.startswith(name + ".") for loaded_name in last)
+        print(f"{name:<32}{'LOADED' if loaded else 'no':>14}")
+
+    if args.render:
+        seconds = [login_render_seconds() for _ in range(args.repeat)]
+        print(f"\nfirst login render: median {statistics.median(seconds) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import threading
+
+from user_store import DB_FILE, connect
+
+CHAT_PAGE_SIZE = 10
+
+
+class ChatStore:
+    """Per-user saved chats in SQLite.
+
+    Listing a page of chats reads only ids and titles; message bodies are fetched
+    when a chat is opened.
+    """
+
+    def __init__(self, db_file=DB_FILE):
+        self.db_file = db_file
+        self._local = threading.local()
+        self._init_db()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = connect(self.db_file)
+            conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    def _init_db(self):
+        self._conn().executescript(
+            """CREATE TABLE IF NOT EXISTS chats (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                username TEXT NOT NULL,
+                title TEXT NOT NULL,
+                updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+            );
+            CREATE INDEX IF NOT EXISTS idx_chats_user_updated ON chats (username, updated_at DESC, id DESC);
+            CREATE TABLE IF NOT EXISTS chat_messages (
+                chat_id INTEGER NOT NULL REFERENCES chats (id) ON DELETE CASCADE,
+                position INTEGER NOT NULL,
+                role TEXT NOT NULL,
+                content TEXT NOT NULL,
+                PRIMARY KEY (chat_id, position)
+            );"""
+        )
+
+    def save_chat(self, username, title, messages, chat_id=None):
+        """Insert a chat, or replace the messages of `chat_id`. Returns the chat id."""
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            if chat_id is not None:
+                updated = conn.execute(
+                    "UPDATE chats SET updated_at = CURRENT_TIMESTAMP WHERE id = ? AND username = ?",
+                    (chat_id, username)
+                ).rowcount
+                if not updated:
+                    chat_id = None
+                else:
+                    conn.execute("DELETE FROM chat_messages WHERE chat_id = ?", (chat_id,))
+            if chat_id is None:
+                chat_id = conn.execute(
+                    "INSERT INTO chats (username, title) VALUES (?, ?)", (username, title)
+                ).lastrowid
+            conn.executemany(
+                "INSERT INTO chat_messages (chat_id, position, role, content) VALUES (?, ?, ?, ?)",
+                [(chat_id, position, m["role"], m["content"]) for position, m in enumerate(messages)]
+            )
+        return chat_id
+
+    def list_chats(self, username, page=0, page_size=CHAT_PAGE_SIZE):
+        """One page of {id, title}, most recent first, plus whether an older page exists."""
+        rows = self._conn().execute(
+            """SELECT id, title FROM chats WHERE username = ?
+               ORDER BY updated_at DESC, id DESC LIMIT ? OFFSET ?""",
+            (username, page_size + 1, page * page_size)
+        ).fetchall()
+        chats = [{"id": chat_id, "title": title} for chat_id, title in rows[:page_size]]
+        return chats, len(rows) > page_size
+
+    def get_messages(self, username, chat_id):
+        rows = self._conn().execute(
+            """SELECT m.role, m.content FROM chat_messages m JOIN chats c ON c.id = m.chat_id
+               WHERE c.id = ? AND c.username = ? ORDER BY m.position""",
+            (chat_id, username)
+        ).fetchall()
+        return [{"role": role, "content": content} for role, content in rows]
+
+    def delete_chat(self, username, chat_id):
+        self._conn().execute("DELETE FROM chats WHERE id = ? AND username = ?", (chat_id, username))
+
+    def delete_all(self, username):
+        self._conn().execute("DELETE FROM chats WHERE username = ?", (username,))
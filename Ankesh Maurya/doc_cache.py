@@ -0,0 +1,74 @@
+import hashlib
+import json
+import os
+import threading
+
+CACHE_DIR = os.getenv("DOC_CACHE_DIR", ".doc_cache")
+CACHE_MAX_BYTES = int(os.getenv("DOC_CACHE_MAX_MB", "200")) * 1024 * 1024
+
+
+def file_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class DocumentCache:
+    """Disk cache of processed documents keyed by the SHA-256 of the uploaded bytes.
+
+    Each entry is one JSON file holding the extracted text, keyword sets, chunks and
+    retrieval index. Reading an entry bumps its mtime, and the least recently used
+    entries are evicted once the directory grows past max_bytes.
+
+    Entries are plaintext and shared by every user of the app: anyone who uploads
+    the same bytes gets the cached result, and anyone who can read cache_dir can
+    read every processed document. The directory is created owner-only (0700).
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, mode=0o700, exist_ok=True)
+
+    def _path(self, digest):
+        return os.path.join(self.cache_dir, f"{digest}.json")
+
+    def get(self, digest):
+        path = self._path(digest)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            os.utime(path)
+            return entry
+        except (OSError, ValueError):
+            return None
+
+    def put(self, digest, entry):
+        path = self._path(digest)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def _evict(self):
+        with self._lock:
+            entries = []
+            total = 0
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith(".json"):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(self.cache_dir, name))
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name))
+                total += stat.st_size
+            entries.sort()
+            for _, size, name in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                    total -= size
+                except OSError:
+                    pass
@@ -0,0 +1,239 @@
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+
+# PyPDF2, python-docx, Pillow and pytesseract are imported by the functions that
+# use them, so the login page doesn't pay for them on a fresh worker.
+
+MAX_FILE_BYTES = int(os.getenv("MAX_UPLOAD_MB", "25")) * 1024 * 1024
+MAX_PDF_PAGES = int(os.getenv("MAX_PDF_PAGES", "300"))
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+# Page images queued for OCR at once; further pages wait until earlier ones finish.
+MAX_OCR_IN_FLIGHT = 2 * OCR_WORKERS
+OCR_TILE_HEIGHT = 2000
+MIN_PAGE_TEXT_CHARS = 20
+
+# Messages returned instead of document text: shown to the user, never cached or sent to the model.
+EXTRACTION_FAILURES = ("Error extracting", "File is larger than", "Unsupported file format", "No text detected")
+
+_ocr_pool = None
+_ocr_pool_lock = threading.Lock()
+
+
+def _get_ocr_pool():
+    # One pool per server process, shared by every session. Workers are spawned, not
+    # forked, so they don't inherit the server's threads and the locks they hold.
+    global _ocr_pool
+    with _ocr_pool_lock:
+        if _ocr_pool is None:
+            _ocr_pool = ProcessPoolExecutor(max_workers=OCR_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _ocr_pool
+
+
+def _discard_ocr_pool(pool):
+    # A worker died (e.g. killed for memory) and the pool refuses all further work;
+    # the next _get_ocr_pool() starts a new one.
+    global _ocr_pool
+    with _ocr_pool_lock:
+        if _ocr_pool is pool:
+            _ocr_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _submit_ocr(data):
+    """Queue one image for OCR; returns (pool, future)."""
+    pool = _get_ocr_pool()
+    try:
+        return pool, pool.submit(_ocr_image_bytes, data)
+    except BrokenProcessPool:
+        _discard_ocr_pool(pool)
+        pool = _get_ocr_pool()
+        return pool, pool.submit(_ocr_image_bytes, data)
+
+
+def _ocr_image_bytes(data: bytes) -> str:
+    # Runs inside an OCR worker process. pytesseract's exceptions don't survive
+    # pickling back to the parent, so re-raise them as plain RuntimeErrors.
+    import pytesseract
+    from PIL import Image
+
+    try:
+        with Image.open(BytesIO(data)) as image:
+            return pytesseract.image_to_string(image)
+    except Exception as e:
+        raise RuntimeError(str(e)) from None
+
+
+def _image_tiles(image):
+    """Split tall scans into horizontal bands so one image can use several workers."""
+    if image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    width, height = image.size
+    for top in range(0, height, OCR_TILE_HEIGHT):
+        tile = image.crop((0, top, width, min(top + OCR_TILE_HEIGHT, height)))
+        buffer = BytesIO()
+        tile.save(buffer, format="PNG")
+        yield buffer.getvalue()
+
+
+def _page_images(page):
+    try:
+        return [image.data for image in page.images]
+    except Exception:
+        return []
+
+
+def _ocr_result(pool, future):
+    # A page that fails OCR keeps whatever text layer it had instead of failing the document.
+    try:
+        return future.result()
+    except BrokenProcessPool:
+        _discard_ocr_pool(pool)
+        return ""
+    except Exception:
+        return ""
+
+
+def _file_size(file):
+    size = getattr(file, "size", None)
+    if size is None:
+        position = file.tell()
+        file.seek(0, os.SEEK_END)
+        size = file.tell()
+        file.seek(position)
+    return size
+
+
+def _check_size(file):
+    if _file_size(file) > MAX_FILE_BYTES:
+        return f"File is larger than the {MAX_FILE_BYTES // (1024 * 1024)} MB upload limit"
+    return None
+
+
+def _report(progress, done, total):
+    if progress and total:
+        progress(done, total)
+
+
+def extract_text_from_pdf(file, progress=None, notice=None):
+    error = _check_size(file)
+    if error:
+        return error
+    try:
+        import PyPDF2
+
+        file.seek(0)
+        pdf_reader = PyPDF2.PdfReader(file)
+        page_count = len(pdf_reader.pages)
+        total = min(page_count, MAX_PDF_PAGES)
+        if page_count > total and notice:
+            notice(f"Only the first {total} of {page_count} pages were read (MAX_PDF_PAGES).")
+        page_texts = [""] * total
+        ocr_jobs = deque()  # (page number, [(pool, future), ...]), oldest first
+        in_flight = 0
+        done = 0
+
+        def finish_oldest_page():
+            nonlocal in_flight, done
+            number, jobs = ocr_jobs.popleft()
+            in_flight -= len(jobs)
+            ocr_text = "\n".join(_ocr_result(pool, future) for pool, future in jobs)
+            if ocr_text.strip():
+                page_texts[number] = ocr_text
+            done += 1
+            _report(progress, done, total)
+
+        for number in range(total):
+            page = pdf_reader.pages[number]
+            page_text = page.extract_text() or ""
+            # Kept if OCR finds nothing better.
+            page_texts[number] = page_text
+            if len(page_text.strip()) >= MIN_PAGE_TEXT_CHARS:
+                done += 1
+                _report(progress, done, total)
+                continue
+            # No usable text layer: OCR the page's embedded scan images instead.
+            images = _page_images(page)
+            if not images:
+                done += 1
+                _report(progress, done, total)
+                continue
+            while ocr_jobs and in_flight + len(images) > MAX_OCR_IN_FLIGHT:
+                finish_oldest_page()
+            ocr_jobs.append((number, [_submit_ocr(data) for data in images]))
+            in_flight += len(images)
+
+        while ocr_jobs:
+            finish_oldest_page()
+        return "\n".join(text for text in page_texts if text)
+    except Exception as e:
+        return f"Error extracting PDF: {str(e)}"
+
+
+def extract_text_from_docx(file):
+    error = _check_size(file)
+    if error:
+        return error
+    try:
+        import docx
+
+        file.seek(0)
+        doc = docx.Document(file)
+        text = "\n".join([paragraph.text for paragraph in doc.paragraphs])
+        return text
+    except Exception as e:
+        return f"Error extracting DOCX: {str(e)}"
+
+
+def extract_text_from_image(file, progress=None):
+    error = _check_size(file)
+    if error:
+        return error
+    try:
+        from PIL import Image
+
+        file.seek(0)
+        with Image.open(file) as image:
+            tiles = list(_image_tiles(image))
+        jobs = [_submit_ocr(tile) for tile in tiles]
+        futures = {future: (number, pool) for number, (pool, future) in enumerate(jobs)}
+        tile_texts = [""] * len(tiles)
+        for done, future in enumerate(as_completed(futures), start=1):
+            number, pool = futures[future]
+            try:
+                tile_texts[number] = future.result()
+            except BrokenProcessPool:
+                _discard_ocr_pool(pool)
+                raise
+            _report(progress, done, len(tiles))
+        text = "\n".join(tile_texts)
+        return text if text.strip() else "No text detected in image"
+    except Exception as e:
+        return f"Error extracting text from image: {str(e)}"
+
+
+def extract_text_from_txt(file):
+    error = _check_size(file)
+    if error:
+        return error
+    file.seek(0)
+    return file.read().decode('utf-8')
+
+
+def extract_file_content(uploaded_file, progress=None, notice=None):
+    # notice(message) is called for anything the user should know about a partial read.
+    file_type = uploaded_file.name.split('.')[-1].lower()
+    if file_type == 'txt':
+        return extract_text_from_txt(uploaded_file)
+    elif file_type == 'pdf':
+        return extract_text_from_pdf(uploaded_file, progress, notice)
+    elif file_type == 'docx':
+        return extract_text_from_docx(uploaded_file)
+    elif file_type in ['png', 'jpg', 'jpeg']:
+        return extract_text_from_image(uploaded_file, progress)
+    else:
+        return "Unsupported file format"
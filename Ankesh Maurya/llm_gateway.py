@@ -0,0 +1,113 @@
+# Shared module. This file (M Nihan Anoop/llm_gateway.py) is the original; Ankesh Maurya/ and Hariprasad R S/ keep
+# identical copies and Reja Fathima/ a typed port that reads config.settings. Change them together.
+import heapq
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from tracing import record_span
+
+# Match Ollama's own parallelism so extra requests wait here instead of thrashing the server.
+MAX_CONCURRENCY = int(os.getenv("OLLAMA_NUM_PARALLEL", "4"))
+# Longest a request may wait for a slot before the user gets a "busy" reply.
+QUEUE_WAIT_SLO_SECONDS = float(os.getenv("LLM_QUEUE_WAIT_SLO", "15"))
+MAX_QUEUE_LENGTH = int(os.getenv("LLM_MAX_QUEUE", "32"))
+
+# Lower runs first.
+PRIORITY_SHORT = 0   # titles, one-line rewrites, anything with a small num_predict
+PRIORITY_ANSWER = 1  # full answers
+PRIORITY_SPECULATIVE = 2  # answers prepared before anyone asked; never ahead of a real request
+PRIORITY_BACKGROUND = 3  # maintenance such as model calibration; started only while the gateway is idle
+
+BUSY_MESSAGE = "The banking assistant is busy right now. Please try again in a few seconds."
+
+
+class GatewayBusy(Exception):
+    pass
+
+
+class LLMGateway:
+    """Admission control in front of Ollama, shared by every session in the process.
+
+    At most `max_concurrency` requests run at once. Waiting requests are served
+    by priority, then arrival order. A request that can't start within
+    `max_wait` seconds, or arrives when `max_queue` are already waiting, raises
+    GatewayBusy instead of piling onto the model server.
+    """
+
+    def __init__(self, max_concurrency=MAX_CONCURRENCY, max_wait=QUEUE_WAIT_SLO_SECONDS, max_queue=MAX_QUEUE_LENGTH):
+        self.max_concurrency = max_concurrency
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self._cond = threading.Condition()
+        self._waiting = []  # heap of (priority, sequence)
+        self._sequence = itertools.count()
+        self._active = 0
+        self._waits = deque(maxlen=500)
+        self.completed = 0
+        self.rejected = 0
+
+    @contextmanager
+    def slot(self, priority=PRIORITY_ANSWER, max_wait=None):
+        """Holds one of the concurrency slots for the duration of the block."""
+        max_wait = self.max_wait if max_wait is None else max_wait
+        enqueued = time.monotonic()
+        deadline = enqueued + max_wait
+        with self._cond:
+            if len(self._waiting) >= self.max_queue:
+                self.rejected += 1
+                raise GatewayBusy("queue full")
+            entry = (priority, next(self._sequence))
+            heapq.heappush(self._waiting, entry)
+            while self._active >= self.max_concurrency or self._waiting[0] != entry:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._waiting.remove(entry)
+                    heapq.heapify(self._waiting)
+                    self.rejected += 1
+                    self._cond.notify_all()
+                    raise GatewayBusy(f"waited {max_wait:.0f}s for a slot")
+                self._cond.wait(remaining)
+            heapq.heappop(self._waiting)
+            self._active += 1
+            waited = time.monotonic() - enqueued
+            self._waits.append(waited)
+            # The next request in line may fit too.
+            self._cond.notify_all()
+        record_span("queue_wait", waited)
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active -= 1
+                self.completed += 1
+                self._cond.notify_all()
+
+    def idle(self):
+        """True when no request is running or waiting for a slot."""
+        with self._cond:
+            return self._active == 0 and not self._waiting
+
+    def waiting_ahead_of(self, priority):
+        """True when a request that outranks `priority` is waiting for a slot."""
+        with self._cond:
+            return any(waiting < priority for waiting, _ in self._waiting)
+
+    def stats(self):
+        with self._cond:
+            waits = sorted(self._waits)
+            return {
+                "active": self._active,
+                "queued": len(self._waiting),
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "p50_wait_ms": waits[len(waits) // 2] * 1000 if waits else 0.0,
+                "p95_wait_ms": waits[int(len(waits) * 0.95)] * 1000 if waits else 0.0,
+            }
+
+
+# One gateway per server process: Streamlit imports this module once and every session shares it.
+gateway = LLMGateway()
@@ -0,0 +1,126 @@
+# Shared module. This file (M Nihan Anoop/model_warmer.py) is the original; Ankesh Maurya/ and Hariprasad R S/ keep
+# identical copies and Reja Fathima/ a typed port that reads config.settings. Change them together.
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+import requests
+
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://127.0.0.1:11434")
+# Passed on every request so Ollama doesn't unload the model between pings.
+MODEL_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+WARM_INTERVAL_SECONDS = int(os.getenv("WARM_INTERVAL_SECONDS", "240"))
+# Keep the model resident between these hours (local time, Mon-Sat); let it unload overnight.
+BUSINESS_HOURS = (int(os.getenv("BUSINESS_HOURS_START", "8")), int(os.getenv("BUSINESS_HOURS_END", "20")))
+BUSINESS_DAYS = range(0, 6)
+
+COLD, LOADING, WARM, UNAVAILABLE = "cold", "loading", "warm", "unavailable"
+
+
+class ModelWarmer:
+    """Keeps one Ollama model loaded so customer requests never pay the load.
+
+    `start()` loads the model in a background thread (a generate request with no
+    prompt only loads it) and then re-sends that request every
+    WARM_INTERVAL_SECONDS during business hours, which also resets Ollama's
+    keep-alive timer. Outside business hours it only checks /api/ps.
+    """
+
+    def __init__(self, model, base_url=OLLAMA_BASE_URL, keep_alive=MODEL_KEEP_ALIVE,
+                 interval=WARM_INTERVAL_SECONDS, business_hours=BUSINESS_HOURS, business_days=BUSINESS_DAYS):
+        self.model = model
+        self.base_url = base_url.rstrip("/")
+        self.keep_alive = keep_alive
+        self.interval = interval
+        self.business_hours = business_hours
+        self.business_days = business_days
+        self.state = COLD
+        self.last_load_seconds = None
+        self.last_checked = None
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def in_business_hours(self, now=None):
+        now = now or datetime.now()
+        start, end = self.business_hours
+        return now.weekday() in self.business_days and start <= now.hour < end
+
+    def is_loaded(self):
+        """Asks Ollama whether the model is resident right now."""
+        response = requests.get(f"{self.base_url}/api/ps", timeout=5)
+        response.raise_for_status()
+        wanted = self.model if ":" in self.model else f"{self.model}:latest"
+        return any(wanted in (m.get("name"), m.get("model")) for m in response.json().get("models", []))
+
+    def warm(self):
+        """Loads the model (or refreshes its keep-alive). Blocks until Ollama answers."""
+        if not self._lock.acquire(blocking=False):
+            return self.state  # another warm-up is already in flight
+        try:
+            if self.state != WARM:
+                self.state = LOADING
+            started = time.perf_counter()
+            response = requests.post(
+                f"{self.base_url}/api/generate",
+                json={"model": self.model, "keep_alive": self.keep_alive},
+                timeout=300
+            )
+            response.raise_for_status()
+            self.last_load_seconds = time.perf_counter() - started
+            if self.state != WARM:
+                logging.info(f"Model {self.model} loaded in {self.last_load_seconds:.1f}s")
+            self.state = WARM
+            self.last_error = None
+        except requests.exceptions.RequestException as e:
+            logging.warning(f"Could not warm {self.model}: {e}")
+            self.state = UNAVAILABLE
+            self.last_error = str(e)
+        finally:
+            self.last_checked = datetime.now()
+            self._lock.release()
+        return self.state
+
+    def refresh_state(self):
+        try:
+            self.state = WARM if self.is_loaded() else COLD
+            self.last_error = None
+        except requests.exceptions.RequestException as e:
+            self.state = UNAVAILABLE
+            self.last_error = str(e)
+        self.last_checked = datetime.now()
+        return self.state
+
+    def ensure_warm(self):
+        """Starts a load in the background if the model isn't resident; never blocks."""
+        if self.state != WARM and not self._lock.locked():
+            threading.Thread(target=self.warm, daemon=True).start()
+
+    def _run(self):
+        self.warm()
+        while not self._stop.wait(self.interval):
+            if self.in_business_hours():
+                self.warm()
+            else:
+                self.refresh_state()
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="model-warmer", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def status_label(self):
+        return {
+            WARM: "🟢 Model warm",
+            LOADING: "🟡 Loading model...",
+            COLD: "⚪ Model cold (loads on first question)",
+            UNAVAILABLE: "🔴 Ollama unreachable",
+        }[self.state]
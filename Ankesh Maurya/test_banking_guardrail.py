@@ -0,0 +1,23 @@
+from banking_guardrail import BANKING_KEYWORDS, contains_banking_keyword, fuzzy_match, normalize_with_synonyms
+
+
+def is_banking(text):
+    """The guardrail as app.is_banking_question applies it (without document keywords)."""
+    normalized = normalize_with_synonyms(text)
+    return contains_banking_keyword(normalized) or fuzzy_match(normalized, BANKING_KEYWORDS)
+
+
+def test_inflected_synonyms_are_recognised():
+    for question in ["how do I track my payments?", "my installments are late", "sending to friend", "my paycheck"]:
+        assert is_banking(question), question
+
+
+def test_replacements_are_not_rewritten_again():
+    # "monthly payment" -> "emi"; the "pay" inside it must not become "upi" afterwards.
+    assert normalize_with_synonyms("My monthly payment failed") == "my emi failed"
+    assert normalize_with_synonyms("Sending money") == "transfer balance"
+
+
+def test_off_topic_questions_are_refused():
+    for question in ["Write me a python script that sorts a list", "Who won the cricket world cup in 2011?"]:
+        assert not is_banking(question), question
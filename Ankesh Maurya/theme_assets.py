@@ -0,0 +1,91 @@
+import hashlib
+import os
+from functools import lru_cache
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+STYLESHEET = "banking.css"
+# Streamlit serves ./static at app/static/ when server.enableStaticServing is on (.streamlit/config.toml).
+STATIC_URL = "app/static"
+
+COLOR_SYSTEM = {
+    "light": {
+        "bg": "#F8FAFC",
+        "secondary_bg": "#FFFFFF",
+        "sidebar_bg": "#FFFFFF",
+        "text_primary": "#0F172A",
+        "text_secondary": "#64748B",
+        "user_bubble": "#3B82F6",
+        "user_text": "#FFFFFF",
+        "bot_bubble": "#EFF6FF",
+        "bot_text": "#1E40AF",
+        "border": "#E2E8F0",
+        "accent": "#3B82F6",
+        "accent_hover": "#60A5FA",
+        "input_bg": "#FFFFFF",
+        "button_primary": "#3B82F6",
+        "button_hover": "#60A5FA",
+        "icon_color": "#64748B",
+        "document_box_bg": "#F1F5F9",  # Changed from dark to light gray
+        "document_box_text": "#0F172A",  # Changed from light to dark text
+        "chat_input_border": "#CBD5E1",
+        "chat_input_bg": "#F8FAFC"  # Added new property for chat input background
+    },
+    "dark": {
+        "bg": "#0F172A",
+        "secondary_bg": "#1E293B",
+        "sidebar_bg": "#1E293B",
+        "text_primary": "#F1F5F9",
+        "text_secondary": "#94A3B8",
+        "user_bubble": "#60A5FA",
+        "user_text": "#0F172A",
+        "bot_bubble": "#1E40AF",
+        "bot_text": "#EFF6FF",
+        "border": "#334155",
+        "accent": "#60A5FA",
+        "accent_hover": "#3B82F6",
+        "input_bg": "#1E293B",
+        "button_primary": "#3B82F6",
+        "button_hover": "#60A5FA",
+        "icon_color": "#94A3B8",
+        "chat_input_bg": "#1E293B"  # Added for consistency
+    }
+}
+
+
+def css_variable(key):
+    return "--" + key.replace("_", "-")
+
+
+@lru_cache(maxsize=None)
+def theme_variables_css(theme):
+    """The only per-theme part of the stylesheet: a :root block of colour custom properties."""
+    colors = COLOR_SYSTEM[theme]
+    lines = "".join(f"{css_variable(key)}:{value};" for key, value in colors.items())
+    return f":root{{{lines}}}"
+
+
+@lru_cache(maxsize=None)
+def read_stylesheet():
+    with open(os.path.join(STATIC_DIR, STYLESHEET), encoding="utf-8") as f:
+        return f.read()
+
+
+@lru_cache(maxsize=None)
+def stylesheet_version():
+    """Content hash for the ?v= query string, so browsers cache the file until it changes."""
+    return hashlib.sha1(read_stylesheet().encode("utf-8")).hexdigest()[:10]
+
+
+@lru_cache(maxsize=None)
+def theme_style_tags(theme, static_serving=True):
+    """Markup to inject on every rerun. Built once per (theme, static_serving) and reused.
+
+    With static serving the stylesheet is a cached <link>, so each rerun only sends
+    the theme's colour variables (well under 1 KB). Without it the whole stylesheet
+    is inlined, still from the memoized copy.
+    """
+    variables = f"<style>{theme_variables_css(theme)}</style>"
+    if static_serving:
+        href = f"{STATIC_URL}/{STYLESHEET}?v={stylesheet_version()}"
+        return f'{variables}<link rel="stylesheet" href="{href}">'
+    return f"{variables}<style>{read_stylesheet()}</style>"
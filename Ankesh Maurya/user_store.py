@@ -0,0 +1,135 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import re
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+DB_FILE = os.getenv("BANKBOT_DB", "bankbot.db")
+
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+SCRYPT_DKLEN = 32
+SALT_BYTES = 16
+
+_LEGACY_SHA256 = re.compile(r"[0-9a-f]{64}")
+
+
+def connect(db_file):
+    conn = sqlite3.connect(db_file, timeout=10, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA busy_timeout=10000")
+    return conn
+
+
+def _b64(data):
+    return base64.b64encode(data).decode("ascii")
+
+
+def hash_password(password: str) -> str:
+    salt = os.urandom(SALT_BYTES)
+    digest = hashlib.scrypt(
+        password.encode("utf-8"), salt=salt, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P, dklen=SCRYPT_DKLEN
+    )
+    return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${_b64(salt)}${_b64(digest)}"
+
+
+def verify_password(password: str, stored: str) -> bool:
+    if _LEGACY_SHA256.fullmatch(stored):
+        return hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), stored)
+    try:
+        _, n, r, p, salt, expected = stored.split("$")
+        expected = base64.b64decode(expected)
+        digest = hashlib.scrypt(
+            password.encode("utf-8"), salt=base64.b64decode(salt),
+            n=int(n), r=int(r), p=int(p), dklen=len(expected)
+        )
+    except ValueError:
+        return False
+    return hmac.compare_digest(digest, expected)
+
+
+def needs_rehash(stored: str) -> bool:
+    return not stored.startswith(f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}$")
+
+
+class UserStore:
+    """SQLite-backed user accounts with scrypt password hashes.
+
+    Hashing runs in a small thread pool (hashlib.scrypt releases the GIL) so a burst
+    of logins doesn't serialize on one session. Hashes from the old users.json
+    (unsalted SHA-256) are imported as-is and upgraded on the user's next login.
+    """
+
+    def __init__(self, db_file=DB_FILE, legacy_users_file=None, hash_workers=2):
+        self.db_file = db_file
+        self._local = threading.local()
+        self._pool = ThreadPoolExecutor(max_workers=hash_workers, thread_name_prefix="pwhash")
+        self._init_db()
+        if legacy_users_file:
+            self._import_legacy(legacy_users_file)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = connect(self.db_file)
+        return conn
+
+    def _init_db(self):
+        self._conn().execute(
+            """CREATE TABLE IF NOT EXISTS users (
+                username TEXT PRIMARY KEY,
+                password_hash TEXT NOT NULL,
+                created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )"""
+        )
+
+    def _import_legacy(self, users_file):
+        if not os.path.exists(users_file):
+            return
+        try:
+            with open(users_file, 'r') as f:
+                users = json.load(f)
+        except (OSError, ValueError):
+            return
+        self._conn().executemany(
+            "INSERT OR IGNORE INTO users (username, password_hash) VALUES (?, ?)",
+            list(users.items())
+        )
+
+    def _stored_hash(self, username):
+        row = self._conn().execute(
+            "SELECT password_hash FROM users WHERE username = ?", (username,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def verify_login(self, username, password):
+        stored = self._stored_hash(username)
+        if stored is None:
+            # Burn the same time as a real check so response time doesn't reveal usernames.
+            self._pool.submit(hash_password, password).result()
+            return False
+        if not self._pool.submit(verify_password, password, stored).result():
+            return False
+        if needs_rehash(stored):
+            new_hash = self._pool.submit(hash_password, password).result()
+            self._conn().execute(
+                "UPDATE users SET password_hash = ? WHERE username = ? AND password_hash = ?",
+                (new_hash, username, stored)
+            )
+        return True
+
+    def create_user(self, username, password):
+        password_hash = self._pool.submit(hash_password, password).result()
+        try:
+            # The primary key makes this atomic: of two concurrent signups, one wins.
+            self._conn().execute(
+                "INSERT INTO users (username, password_hash) VALUES (?, ?)", (username, password_hash)
+            )
+        except sqlite3.IntegrityError:
+            return False
+        return True
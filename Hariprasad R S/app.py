@@ -2,6 +2,12 @@ import streamlit as st
 import requests
 from datetime import datetime
 
+from chat_window import render_window
+from llm_gateway import BUSY_MESSAGE, GatewayBusy, gateway
+from model_warmer import MODEL_KEEP_ALIVE, ModelWarmer
+from ollama_health import UNAVAILABLE_MESSAGE, CircuitOpen, health
+from tracing import record_ollama, request_trace, span, start_metrics_server, traced
+
 st.set_page_config(page_title="BankBot AI", page_icon="🤖", layout="wide")
 
 # ---------------- Global Welcome Message ----------------
@@ -19,6 +25,7 @@ BANKING_KEYWORDS = [
     "kyc", "branch", "ifsc"
 ]
 
+@traced("guardrail")
 def is_banking_query(text: str) -> bool:
     text = text.lower()
     return any(keyword in text for keyword in BANKING_KEYWORDS)
@@ -29,23 +36,54 @@ RESTRICTED_RESPONSE = (
 )
 
 # ---------------- Ollama call ----------------
-def ask_ollama(prompt: str, model: str = "mistral") -> str:
+OLLAMA_MODEL = "mistral"
+
+@st.cache_resource
+def get_model_warmer():
+    return ModelWarmer(OLLAMA_MODEL).start()
+
+@st.cache_resource
+def get_ollama_health():
+    # One circuit breaker shared by all sessions, probed in the background
+    return health.start()
+
+@st.cache_resource
+def get_metrics_server():
+    # Prometheus endpoint for the latency spans on 9466 (BANKBOT_METRICS_PORT overrides, 0 disables)
+    return start_metrics_server(9466)
+
+def ask_ollama(prompt: str, model: str = OLLAMA_MODEL) -> str:
     try:
-        resp = requests.post(
-            "http://localhost:11434/api/generate",
-            json={"model": model, "prompt": prompt},
-            timeout=120,
-        )
+        # Checked before queueing: while Ollama is down this fails at once instead of after the timeout
+        with health.call(), gateway.slot(), span("generation"):
+            resp = requests.post(
+                "http://localhost:11434/api/generate",
+                # One JSON reply (not a stream) so the timing fields come back with it
+                json={"model": model, "prompt": prompt, "stream": False, "keep_alive": MODEL_KEEP_ALIVE},
+                timeout=120,
+            )
+            if resp.status_code >= 500:
+                resp.raise_for_status()  # counts against the breaker
         # Check if the response is valid JSON and extract the 'response' field
         if resp.status_code == 200:
-            return resp.json().get("response", "⚠️ No response or valid content from Ollama.")
+            result = resp.json()
+            record_ollama(result)
+            return result.get("response", "⚠️ No response or valid content from Ollama.")
         else:
             return f"⚠️ Ollama API returned status code {resp.status_code}: {resp.text}"
+    except CircuitOpen:
+        return UNAVAILABLE_MESSAGE
+    except GatewayBusy:
+        return f"⚠️ {BUSY_MESSAGE}"
     except requests.exceptions.ConnectionError:
         return "⚠️ Connection Error: Could not connect to Ollama at http://localhost:11434. Please ensure Ollama is running."
     except Exception as e:
         return f"⚠️ Ollama error: {e}"
 
+def ollama_status():
+    ollama = get_ollama_health()
+    st.caption(get_model_warmer().status_label() if ollama.online else ollama.status_label())
+
 # ---------------- FAQ Knowledge Base ----------------
 # The FAQ data is kept for direct matching/lookup from user input
 faq_data = {
@@ -92,9 +130,16 @@ if "current_chat" not in st.session_state:
 if "chat_counter" not in st.session_state:
     st.session_state.chat_counter = 1
 
+# Load the model before the first question arrives
+if get_ollama_health().online:
+    get_model_warmer().ensure_warm()
+get_metrics_server()
+
 # ---------------- Sidebar ----------------
 with st.sidebar:
     st.title("Chat History")
+    # Refreshes on its own so an outage or recovery shows without a rerun
+    st.fragment(ollama_status, run_every=5)()
 
     if st.button("➕ New Chat"):
         st.session_state.chat_counter += 1
@@ -126,50 +171,58 @@ st.write("---")
 # ---------------- Conversation ----------------
 st.subheader("Conversation")
 
-for sender, msg, ts in st.session_state.all_chats[st.session_state.current_chat]:
+def render_message(message):
+    sender, msg, ts = message
     # Use st.chat_message for a more native Streamlit look
     with st.chat_message("user" if sender == "You" else "assistant"):
         st.markdown(msg)
         st.caption(f"{ts}")
 
+# Long chats only draw their latest page; older messages load on demand
+render_window(st.session_state.all_chats[st.session_state.current_chat], render_message,
+              chat_key=st.session_state.current_chat)
+
 # ---------------- Bottom Input ----------------
 with st.form("chat_form", clear_on_submit=True):
     user_text = st.text_input("Message BankBot…")
     send = st.form_submit_button("Send")
 
 if send and user_text.strip():
-    ts = timestamp_now()
-    st.session_state.all_chats[st.session_state.current_chat].append(("You", user_text, ts))
-
-    low = user_text.lower()
-    reply = None
-
-    # Step 1: FAQ Match (if a user types a common query like "loan plans")
-    for k, v in faq_data.items():
-        if k in low:
-            reply = v
-            break
-
-    # Step 2: Banking-only validation / Ollama call
-    if not reply:
-        if is_banking_query(user_text):
-            # For better context, prepend a summary of the current chat history to the prompt
-            history_summary = "\n".join([
-                f"{s}: {m}" for s, m, _ in st.session_state.all_chats[st.session_state.current_chat]
-            ])
-            
-            prompt = (
-                "You are BankBot, a helpful banking assistant. "
-                "Answer ONLY banking-related questions. "
-                "If the question is not about banking, you must state that you cannot assist with that topic. "
-                "Keep your answers concise and professional.\n\n"
-                "Current Conversation History:\n"
-                f"{history_summary}\n\n"
-                f"User Question: {user_text}"
-            )
-            reply = ask_ollama(prompt)
-        else:
-            reply = RESTRICTED_RESPONSE
-
-    st.session_state.all_chats[st.session_state.current_chat].append(("BankBot", reply, ts))
+    with request_trace("chat", model=OLLAMA_MODEL):
+        ts = timestamp_now()
+        st.session_state.all_chats[st.session_state.current_chat].append(("You", user_text, ts))
+
+        low = user_text.lower()
+        reply = None
+
+        # Step 1: FAQ Match (if a user types a common query like "loan plans")
+        with span("faq_match"):
+            for k, v in faq_data.items():
+                if k in low:
+                    reply = v
+                    break
+
+        # Step 2: Banking-only validation / Ollama call
+        if not reply:
+            if is_banking_query(user_text):
+                with span("prompt_build"):
+                    # For better context, prepend a summary of the current chat history to the prompt
+                    history_summary = "\n".join([
+                        f"{s}: {m}" for s, m, _ in st.session_state.all_chats[st.session_state.current_chat]
+                    ])
+
+                    prompt = (
+                        "You are BankBot, a helpful banking assistant. "
+                        "Answer ONLY banking-related questions. "
+                        "If the question is not about banking, you must state that you cannot assist with that topic. "
+                        "Keep your answers concise and professional.\n\n"
+                        "Current Conversation History:\n"
+                        f"{history_summary}\n\n"
+                        f"User Question: {user_text}"
+                    )
+                reply = ask_ollama(prompt)
+            else:
+                reply = RESTRICTED_RESPONSE
+
+        st.session_state.all_chats[st.session_state.current_chat].append(("BankBot", reply, ts))
     st.rerun()
\ No newline at end of file
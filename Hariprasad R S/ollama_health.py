@@ -0,0 +1,170 @@
+# Shared module. This file (M Nihan Anoop/ollama_health.py) is the original; Ankesh Maurya/ and Hariprasad R S/ keep
+# identical copies and Reja Fathima/ a typed port that reads config.settings. Change them together.
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://127.0.0.1:11434")
+# Background probe period while Ollama is healthy.
+HEALTH_INTERVAL_SECONDS = float(os.getenv("OLLAMA_HEALTH_INTERVAL", "10"))
+# Consecutive failed calls or probes that open the breaker.
+FAILURE_THRESHOLD = int(os.getenv("OLLAMA_FAILURE_THRESHOLD", "3"))
+# How long an open breaker fails fast before a half-open probe is allowed.
+OPEN_SECONDS = float(os.getenv("OLLAMA_BREAKER_OPEN_SECONDS", "15"))
+PROBE_TIMEOUT_SECONDS = 2
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+UNAVAILABLE_MESSAGE = ("⚠️ **System Offline:** my AI brain (Ollama) isn't responding right now, "
+                       "so I can't answer this. Please try again in a minute.")
+
+
+class CircuitOpen(Exception):
+    pass
+
+
+def is_outage(error):
+    """Connection failures, timeouts and 5xx replies count against Ollama; a 404 for a missing model doesn't."""
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return True
+    response = getattr(error, "response", None)
+    return response is not None and response.status_code >= 500
+
+
+class OllamaHealth:
+    """Circuit breaker in front of Ollama, shared by every session in the process.
+
+    closed:    calls go through. FAILURE_THRESHOLD consecutive failures open the breaker.
+    open:      calls raise CircuitOpen at once instead of waiting out a timeout.
+    half_open: after OPEN_SECONDS one trial (a call or the background probe) is
+               let through; success closes the breaker, failure opens it again.
+
+    A background thread probes /api/version every HEALTH_INTERVAL_SECONDS while
+    closed, and as soon as a half-open trial is allowed while open, so an
+    outage is noticed before a customer hits it and recovery without one.
+    """
+
+    def __init__(self, base_url=OLLAMA_BASE_URL, failure_threshold=FAILURE_THRESHOLD,
+                 open_seconds=OPEN_SECONDS, interval=HEALTH_INTERVAL_SECONDS):
+        self.base_url = base_url.rstrip("/")
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.interval = interval
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.last_error = None
+        self.last_checked = None
+        self.fast_failed = 0
+        self._trial_running = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # --- Breaker ---
+    def retry_in(self):
+        """Seconds until an open breaker allows a trial (0 when it already would)."""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.opened_at + self.open_seconds - time.monotonic())
+
+    def allow(self):
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and self.retry_in() > 0:
+                return False
+            if self._trial_running:
+                return False  # one trial at a time while half-open
+            self.state = HALF_OPEN
+            self._trial_running = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self.state != CLOSED:
+                logging.info("Ollama is reachable again; closing the circuit breaker.")
+            self.state = CLOSED
+            self.failures = 0
+            self.last_error = None
+            self._trial_running = False
+
+    def record_failure(self, error):
+        with self._lock:
+            self.failures += 1
+            self.last_error = str(error)
+            self._trial_running = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    logging.warning(f"Ollama unavailable ({error}); failing fast for {self.open_seconds:.0f}s.")
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    @contextmanager
+    def call(self):
+        """Wraps one request to Ollama. Raises CircuitOpen without calling it while the breaker is open."""
+        if not self.allow():
+            self.fast_failed += 1
+            raise CircuitOpen(f"Ollama unavailable, retrying in {self.retry_in():.0f}s")
+        try:
+            yield
+        except requests.exceptions.RequestException as e:
+            if is_outage(e):
+                self.record_failure(e)
+            else:
+                self.record_success()  # Ollama answered, just not with what we wanted
+            raise
+        except BaseException:
+            # Anything else (a busy gateway, the user leaving mid-stream) says nothing about Ollama.
+            with self._lock:
+                self._trial_running = False
+            raise
+        self.record_success()
+
+    # --- Background probe ---
+    def probe(self):
+        try:
+            with self.call():
+                response = requests.get(f"{self.base_url}/api/version", timeout=PROBE_TIMEOUT_SECONDS)
+                response.raise_for_status()
+        except (CircuitOpen, requests.exceptions.RequestException):
+            pass
+        self.last_checked = time.time()
+        return self.state
+
+    def _run(self):
+        while True:
+            self.probe()
+            wait = self.interval if self.state == CLOSED else max(self.retry_in(), 0.5)
+            if self._stop.wait(wait):
+                return
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="ollama-health", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    # --- Status ---
+    @property
+    def online(self):
+        return self.state == CLOSED
+
+    def status_label(self):
+        if self.state == CLOSED:
+            return "🟢 Ollama online"
+        if self.state == HALF_OPEN:
+            return "🟡 Ollama: checking whether it's back..."
+        return f"🔴 Ollama offline · retrying in {self.retry_in():.0f}s"
+
+
+# One breaker per server process: Streamlit imports this module once and every session shares it.
+health = OllamaHealth()
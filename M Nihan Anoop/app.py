@@ -3,183 +3,33 @@ import time
 import uuid
 from datetime import datetime
 
+from canned_answers import STARTER_PROMPTS, SUGGESTED_PROMPTS, CannedAnswers, knowledge_base_fingerprint
+from chat_window import render_window
+from speculation import SPECULATE_MODE, Speculation, hit_rate
+from title_jobs import TitleJobs, fast_title
+from tracing import metrics, request_trace, start_metrics_server
+from ui_styles import style_tags
+
 # --- Backend Integration ---
 BACKEND_AVAILABLE = False
 LLM_AVAILABLE = False
 
 try:
-    from llm_engine import LLMEngine
+    from llm_engine import FAILURE_MESSAGES, LLMEngine
+    from llm_gateway import PRIORITY_SPECULATIVE
+    from model_warmer import ModelWarmer
+    from ollama_health import health
     LLM_AVAILABLE = True
 except ImportError as e:
     print(f"LLM Engine import failed: {e}")
 
 try:
     from backend import BankBotBackend
+    from domain_classifier import REFUSAL_MESSAGE
     BACKEND_AVAILABLE = True
 except ImportError as e:
     print(f"Backend (RAG) import failed: {e}")
 
-# --- Custom CSS (Inlined for Stability) ---
-def get_custom_css():
-    return """
-    <style>
-        /* Import Premium Fonts */
-        @import url('https://fonts.googleapis.com/css2?family=Outfit:wght@300;400;500;600;700&family=Space+Grotesk:wght@300;400;500;600;700&display=swap');
-
-        /* Global Font Settings */
-        html, body, [class*="css"] {
-            font-family: 'Outfit', sans-serif;
-            color: #ffffff;
-        }
-        
-        h1, h2, h3 {
-            font-family: 'Space Grotesk', sans-serif;
-            font-weight: 700;
-            letter-spacing: -0.5px;
-        }
-
-        /* Premium Animated Background - Deep Midnight Theme */
-        .stApp {
-            background: linear-gradient(-45deg, #0f2027, #203a43, #2c5364); /* Professional Dark Teal */
-            background-size: 400% 400%;
-            background-attachment: fixed; /* Ensures background stays even when scrolling */
-            animation: gradient 15s ease infinite;
-        }
-
-        /* Ensure main container is transparent to show background */
-        [data-testid="stAppViewContainer"] {
-            background: transparent !important;
-        }
-
-        @keyframes gradient {
-            0% { background-position: 0% 50%; }
-            50% { background-position: 100% 50%; }
-            100% { background-position: 0% 50%; }
-        }
-
-        /* Header Styling - Neon Pop (Negative/High Contrast) */
-        h1 {
-            color: #ffffff !important;
-            text-align: center;
-            font-size: 4.5rem !important;
-            font-weight: 800 !important;
-            padding-bottom: 1rem;
-            margin-top: 1rem;
-            text-shadow: 0 0 10px rgba(0, 212, 255, 0.8), 0 0 20px rgba(0, 212, 255, 0.5), 0 0 30px rgba(0, 212, 255, 0.3); /* Neon Cyan Glow */
-            letter-spacing: -1px;
-            background: transparent !important;
-            -webkit-text-fill-color: #ffffff !important;
-        }
-        
-        /* Sidebar Title - BankBot Pop */
-        [data-testid="stSidebar"] h1 {
-            font-size: 3rem !important;
-            text-shadow: 0 0 15px rgba(255, 255, 255, 0.6);
-            color: #ffffff !important;
-        }
-        
-        /* Subheader/Text Styling */
-        p, label, .stMarkdown {
-            font-size: 1.1rem;
-            line-height: 1.6;
-            color: #e0e0e0 !important; /* Off-white for readability */
-        }
-        
-        /* Global Text Color Override */
-        html, body, [class*="css"] {
-            color: #ffffff !important;
-        }
-        
-        /* Advanced Glassmorphic Buttons */
-        .stButton > button {
-            background: rgba(255, 255, 255, 0.1) !important;
-            backdrop-filter: blur(10px);
-            border: 1px solid rgba(255, 255, 255, 0.2) !important;
-            color: #ffffff !important;
-            border-radius: 12px !important;
-            padding: 0.75rem 1.5rem !important;
-            transition: all 0.3s ease !important;
-            font-weight: 600 !important;
-            text-transform: uppercase;
-            letter-spacing: 1px;
-            box-shadow: 0 4px 15px rgba(0, 0, 0, 0.2);
-        }
-        
-        .stButton > button:hover {
-            background: rgba(0, 212, 255, 0.2) !important; /* Cyan tint */
-            border-color: #00d4ff !important;
-            transform: translateY(-3px);
-            box-shadow: 0 0 20px rgba(0, 212, 255, 0.4);
-            color: #ffffff !important;
-        }
-
-        /* Chat Input Styling - Responsive Bottom Rectangle */
-        .stChatInput {
-            /* Remove fixed position to let Streamlit handle sidebar adjustment */
-            background: rgba(15, 32, 39, 0.95) !important;
-            backdrop-filter: blur(20px);
-            border-top: 1px solid rgba(255, 255, 255, 0.1);
-            padding: 1rem 1rem !important;
-            z-index: 100; /* Lower than sidebar */
-        }
-        
-        .stChatInputContainer {
-            padding-bottom: 0 !important;
-        }
-        
-        .stChatInput textarea {
-            background-color: rgba(255, 255, 255, 0.1) !important;
-            border: 1px solid rgba(255, 255, 255, 0.2) !important;
-            color: #ffffff !important;
-            border-radius: 12px !important;
-            padding: 0.8rem 1rem !important;
-            font-size: 1rem;
-            box-shadow: none !important;
-        }
-        
-        .stChatInput textarea:focus {
-            background-color: rgba(255, 255, 255, 0.15) !important;
-            border-color: #00d4ff !important;
-            box-shadow: 0 0 15px rgba(0, 212, 255, 0.1) !important;
-        }
-        
-        /* Adjust main container */
-        .main .block-container {
-            padding-bottom: 100px !important;
-            max-width: 1000px;
-        }
-        
-        /* Header Styling - Transparent but Visible for Hamburger */
-        [data-testid="stHeader"] {
-            background: transparent !important;
-            color: white !important;
-        }
-        
-        /* Style the hamburger menu button if possible (Streamlit specific) */
-        [data-testid="stHeader"] button {
-            color: white !important;
-        }
-
-        /* Sidebar Styling */
-        [data-testid="stSidebar"] {
-            background-color: rgba(15, 32, 39, 0.8); /* Slightly more opaque */
-            backdrop-filter: blur(20px);
-            border-right: 1px solid rgba(255, 255, 255, 0.1);
-        }
-        
-        /* Chat Message Bubbles */
-        [data-testid="stChatMessageContent"] {
-            background: rgba(255, 255, 255, 0.05);
-            border: 1px solid rgba(255, 255, 255, 0.1);
-            color: #ffffff;
-            border-radius: 15px;
-        }
-
-        /* Hide Footer only */
-        footer {visibility: hidden;}
-        #MainMenu {visibility: visible;} /* Ensure menu is visible */
-    </style>
-    """
 
 # --- Page Config ---
 st.set_page_config(
@@ -190,7 +40,8 @@ st.set_page_config(
 )
 
 # --- Inject Custom CSS ---
-st.markdown(get_custom_css(), unsafe_allow_html=True)
+# A cached <link> when static serving is on, so reruns don't resend the stylesheet.
+st.markdown(style_tags(st.get_option("server.enableStaticServing")), unsafe_allow_html=True)
 
 # --- Session State Initialization ---
 if 'history' not in st.session_state:
@@ -208,7 +59,6 @@ if 'chat_id' not in st.session_state:
 def get_backend():
     backend = None
     engine = None
-    ollama_status = False
 
     # Initialize RAG Backend
     if BACKEND_AVAILABLE:
@@ -223,52 +73,98 @@ def get_backend():
     if LLM_AVAILABLE:
         try:
             engine = LLMEngine()
-            
-            # Check Ollama Connectivity
-            try:
-                import requests
-                response = requests.get("http://127.0.0.1:11434", timeout=1)
-                if response.status_code == 200:
-                    ollama_status = True
-            except:
-                ollama_status = False
         except Exception as e:
             print(f"Error initializing LLM Engine: {e}")
             engine = None
             
-    return backend, engine, ollama_status
+    return backend, engine
+
+backend, engine = get_backend()
+
+
+@st.cache_resource
+def get_ollama_health():
+    # Shared by every session; probes Ollama in the background and opens the breaker on an outage.
+    return health.start()
+
+# Read on every rerun, so an outage or a recovery shows up without restarting the app.
+ollama_online = LLM_AVAILABLE and get_ollama_health().online
+
+
+@st.cache_resource
+def get_model_warmer(_model):
+    # One warmer per process; its model is updated below rather than starting another.
+    return ModelWarmer(_model).start()
+
+model_warmer = get_model_warmer(engine.model) if engine else None
+if model_warmer and model_warmer.model != engine.model:
+    # Background calibration picked another model; keep that one warm instead.
+    model_warmer.model = engine.model
+if model_warmer and ollama_online:
+    # Load the model now rather than on the first question.
+    model_warmer.ensure_warm()
+
+
+@st.cache_resource(max_entries=4)
+def get_canned_answers(_backend, model, index_version):
+    # Button answers generated offline by canned_answers.py; empty if the knowledge base or model changed since.
+    documents = _backend.documents if _backend else {}
+    return CannedAnswers(knowledge_base_fingerprint(documents, model))
+
+if backend:
+    # Picks up documents ingested since start-up, so the fingerprint below is checked against them.
+    backend.refresh_if_stale()
+canned_answers = get_canned_answers(backend, engine.model, backend.index_version if backend else 0) if engine else None
+
+
+def speculate_answer(question, cancelled):
+    """Background job for a displayed suggestion: the steps of process_user_input, stopping early if cancelled."""
+    with request_trace("speculation", model=engine.model):
+        query_embedding = backend.embed_query(question) if backend.rag_enabled else None
+        if query_embedding is not None and not backend.is_banking_query(query_embedding):
+            return {"answer": REFUSAL_MESSAGE}
+        context = backend.query_knowledge_base(question, query_embedding=query_embedding)
+        if SPECULATE_MODE != "generation" or cancelled.is_set() or not health.online:
+            return {"context": context}
+        # Streamed, so it stops (and frees its gateway slot) once cancelled or a real request is queued.
+        answer = engine.query_ollama(question, context, priority=PRIORITY_SPECULATIVE, cancelled=cancelled)
+        if answer is None or answer in FAILURE_MESSAGES:
+            return {"context": context}
+        return {"context": context, "answer": answer}
+
+# Per session: the suggested follow-ups are prepared while the user reads (BANKBOT_SPECULATE).
+if backend and engine and 'speculation' not in st.session_state:
+    st.session_state.speculation = Speculation(speculate_answer)
+speculation = st.session_state.get('speculation')
+
+
+@st.cache_resource
+def get_title_jobs(_engine):
+    return TitleJobs(_engine.generate_title)
 
-backend, engine, ollama_online = get_backend()
+title_jobs = get_title_jobs(engine) if engine else None
+
+
+@st.cache_resource
+def get_metrics_server():
+    # Prometheus scrape endpoint for the latency spans on 9464 (BANKBOT_METRICS_PORT overrides, 0 disables).
+    return start_metrics_server(9464)
+
+get_metrics_server()
+
+# Seconds between refreshes of the sidebar's Ollama status.
+STATUS_REFRESH_SECONDS = 5
 
 # --- Helper Functions ---
 def start_new_chat():
-        # Generate a context-based title using LLM
+        # Show a truncated title now; the LLM title replaces it when the background job finishes
         title_text = "New Chat"
         if len(st.session_state.current_chat) > 1:
-            try:
-                # Extract conversation context
-                conversation_text = ""
-                for msg in st.session_state.current_chat:
-                    if msg['role'] == 'user':
-                        conversation_text += f"User: {msg['content']}\n"
-                
-                # Use LLM to summarize if available
-                if engine and ollama_online and conversation_text:
-                    prompt = "Summarize this banking query into a single short 2-3 word title (e.g., 'Credit Card Fees', 'Account Opening'). Do not use quotes or punctuation."
-                    # We pass empty context chunks as we don't need RAG for summarization
-                    summary = engine.query_ollama(conversation_text, [], system_instructions=prompt)
-                    title_text = summary.strip().replace('"', '').replace("'", "")
-                    # Fallback if specific failure or too long
-                    if len(title_text) > 40: 
-                        title_text = title_text[:37] + "..."
-                else:
-                    # Fallback to simple truncation
-                    first_user_msg = st.session_state.current_chat[1]['content']
-                    title_text = (first_user_msg[:30] + '...') if len(first_user_msg) > 30 else first_user_msg
-            except Exception as e:
-                print(f"Title generation error: {e}")
-                first_user_msg = st.session_state.current_chat[1]['content']
-                title_text = (first_user_msg[:30] + '...') if len(first_user_msg) > 30 else first_user_msg
+            first_user_msg = st.session_state.current_chat[1]['content']
+            if title_jobs and ollama_online:
+                title_text = title_jobs.request(st.session_state.chat_id, first_user_msg)
+            else:
+                title_text = fast_title(first_user_msg)
 
         st.session_state.history.insert(0, {
             "id": st.session_state.chat_id,
@@ -301,25 +197,55 @@ def process_user_input(user_text, uploaded_file=None):
         
     st.session_state.current_chat.append(new_msg)
     
+    # Button prompts are answered from the precomputed table, without retrieval or the LLM
+    canned = canned_answers.lookup(user_text) if canned_answers and user_text and not uploaded_file else None
+
+    # A suggestion prepared in the background; asking anything else stops the unfinished preparation
+    prepared = None
+    if speculation and not canned and not uploaded_file:
+        prepared = speculation.take(user_text)
+        if user_text not in SUGGESTED_PROMPTS:
+            speculation.cancel()
+
     # Generate Bot Response
     with st.spinner("Analyzing..."):
         bot_response = ""
         
-        if backend and engine and ollama_online:
+        if canned:
+            metrics.inc("canned_answers_total")
+            bot_response = canned
+        elif prepared and "answer" in prepared:
+            bot_response = prepared["answer"]
+        elif backend and engine and ollama_online:
             try:
-                # 1. Retrieve Context
-                context = backend.query_knowledge_base(user_text)
-                
-                # 2. Generate Response
-                bot_response = engine.query_ollama(user_text, context)
+                with request_trace("chat", model=engine.model) as trace:
+                    if prepared:
+                        # Domain check and retrieval already ran in the background
+                        trace.attrs["speculated"] = "retrieval"
+                        bot_response = engine.query_ollama(user_text, prepared["context"])
+                    else:
+                        # 1. Embed once: the domain check and retrieval share the vector
+                        query_embedding = backend.embed_query(user_text) if backend.rag_enabled else None
+
+                        if query_embedding is not None and not backend.is_banking_query(query_embedding):
+                            # Off-topic: refuse without spending a generation on it
+                            trace.attrs["refused"] = "off_topic"
+                            bot_response = REFUSAL_MESSAGE
+                        else:
+                            # 2. Retrieve Context
+                            context = backend.query_knowledge_base(user_text, query_embedding=query_embedding)
+
+                            # 3. Generate Response
+                            bot_response = engine.query_ollama(user_text, context)
             except Exception as e:
                 bot_response = f"I encountered an error processing your request: {str(e)}"
         else:
             # Fallback / Simulation Mode
-            time.sleep(1.0)
             if not ollama_online:
+                 # Answered at once: the breaker is open, so there is nothing to wait for
                  bot_response = "⚠️ **System Offline:** I cannot generate a smart response because my AI brain (Ollama) is disconnected. Please run `ollama serve` in your terminal."
             else:
+                 time.sleep(1.0)
                  bot_response = "Backend is not connected. I am running in UI-only mode."
             
             if uploaded_file:
@@ -334,6 +260,44 @@ def process_user_input(user_text, uploaded_file=None):
 
 # --- Views ---
 
+def history_list():
+    if title_jobs:
+        chat_ids = [chat['id'] for chat in st.session_state.history]
+        finished = title_jobs.collect(chat_ids)
+        for chat in st.session_state.history:
+            if chat['id'] in finished:
+                chat['title'] = finished[chat['id']]
+        # A full rerun shows the new titles and, once nothing is pending, stops the polling.
+        if finished or (st.session_state.polling_titles and not title_jobs.pending(chat_ids)):
+            st.rerun()
+
+    for chat in st.session_state.history:
+        if st.button(f"{chat['title']}", key=chat['id'], use_container_width=True):
+            load_chat(chat)
+            st.rerun()
+
+
+def status_indicator():
+    if LLM_AVAILABLE and health.online:
+        st.success("🟢 System Online")
+        if model_warmer:
+            st.caption(model_warmer.status_label())
+        speed = engine.registry.describe(engine.model).get("tokens_per_second") if engine else None
+        if speed:
+            st.caption(f"🧠 {engine.model} · {speed:.0f} tokens/s")
+        avg_prefill = engine.average_prefill_ms() if engine else None
+        if avg_prefill is not None:
+            st.caption(f"⚡ Avg prompt prefill: {avg_prefill:.0f} ms over {len(engine.prefill_history)} requests")
+        used, started = hit_rate()
+        if started:
+            st.caption(f"🔮 Prepared suggestions used: {used}/{started} ({used / started:.0%})")
+    else:
+        st.error("🔴 AI Offline")
+        if LLM_AVAILABLE:
+            st.caption(health.status_label())
+        st.caption("Run `ollama serve` to enable AI.")
+
+
 def sidebar():
     # Deduplicate history
     seen_ids = set()
@@ -347,12 +311,8 @@ def sidebar():
     with st.sidebar:
         st.title("💬 BankBot")
         
-        # Status Indicator
-        if ollama_online:
-            st.success("🟢 System Online")
-        else:
-            st.error("🔴 AI Offline")
-            st.caption("Run `ollama serve` to enable AI.")
+        # Status Indicator (refreshes on its own so an outage shows up without a rerun)
+        st.fragment(status_indicator, run_every=STATUS_REFRESH_SECONDS)()
         
         # Navigation
         st.markdown("### 🧭 Navigation")
@@ -362,10 +322,10 @@ def sidebar():
             st.rerun()
             
         st.markdown("### 🕒 History")
-        for chat in st.session_state.history:
-            if st.button(f"{chat['title']}", key=chat['id'], use_container_width=True):
-                load_chat(chat)
-                st.rerun()
+        chat_ids = [chat['id'] for chat in st.session_state.history]
+        st.session_state.polling_titles = bool(title_jobs) and title_jobs.pending(chat_ids)
+        # While titles are being generated, poll for them without rerunning the whole page.
+        st.fragment(history_list, run_every=2 if st.session_state.polling_titles else None)()
                 
         st.markdown("---")
         st.markdown("### ⚙️ Actions")
@@ -395,33 +355,27 @@ def chat_interface():
     st.markdown("<h1 style='text-align: center;'>Banking Assistant</h1>", unsafe_allow_html=True)
     st.markdown("<p style='text-align: center; margin-bottom: 3rem;'>Ask questions or upload documents for analysis.</p>", unsafe_allow_html=True)
     
-    # Display Chat Messages
-    for message in st.session_state.current_chat:
-        with st.chat_message(message["role"]):
-            st.markdown(message["content"])
-            if "image" in message:
-                st.image(message["image"])
+    # Display Chat Messages (latest page only; earlier pages on demand)
+    render_window(st.session_state.current_chat, render_message, chat_key=st.session_state.chat_id)
 
     # FAQ Prompts (Only show if chat is empty/new)
     if len(st.session_state.current_chat) <= 1:
         st.markdown("<br>", unsafe_allow_html=True)
-        col1, col2, col3 = st.columns(3)
+        cols = st.columns(3)
         
-        if col1.button("What's my balance?", use_container_width=True):
-            process_user_input("What's my balance?")
-        if col2.button("Compare credit cards", use_container_width=True):
-            process_user_input("Compare credit cards")
-        if col3.button("Reset my PIN", use_container_width=True):
-            process_user_input("Reset my PIN")
+        for i, starter in enumerate(STARTER_PROMPTS):
+            if cols[i].button(starter, use_container_width=True):
+                process_user_input(starter)
 
     # Suggested Follow-up Questions
     if len(st.session_state.current_chat) > 1 and st.session_state.current_chat[-1]["role"] == "assistant":
         st.markdown("<br>", unsafe_allow_html=True)
         st.caption("Suggested:")
         cols = st.columns(3)
-        suggestions = ["How do I open an account?", "Interest rates?", "Contact support"]
-        
-        for i, sugg in enumerate(suggestions):
+        if speculation:
+            # The canned table already answers some suggestions instantly; prepare the others
+            speculation.start([s for s in SUGGESTED_PROMPTS if not (canned_answers and canned_answers.lookup(s))])
+        for i, sugg in enumerate(SUGGESTED_PROMPTS):
             if cols[i].button(sugg, key=f"sugg_{len(st.session_state.current_chat)}_{i}", use_container_width=True):
                 process_user_input(sugg)
 
@@ -433,6 +387,12 @@ def chat_interface():
     if prompt := st.chat_input("Type your question here..."):
         process_user_input(prompt, uploaded_file)
 
+def render_message(message):
+    with st.chat_message(message["role"]):
+        st.markdown(message["content"])
+        if "image" in message:
+            st.image(message["image"])
+
 # --- Main App Logic ---
 def main():
     sidebar()
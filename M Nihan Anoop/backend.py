@@ -1,21 +1,42 @@
 import logging
 import os
+import threading
+import time
 import uuid
-from datetime import datetime
+
+from hybrid_retriever import BM25Index, CrossEncoderReranker, reciprocal_rank_fusion
+from tracing import record_span, span
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# How many documents each retriever contributes before fusion / re-ranking.
+CANDIDATE_POOL = int(os.getenv("BANKBOT_CANDIDATE_POOL", "20"))
+# e.g. "cross-encoder/ms-marco-MiniLM-L-6-v2"; re-ranking is off when unset.
+RERANKER_MODEL = os.getenv("BANKBOT_RERANKER_MODEL")
+# How often a query checks the collection for documents ingested since the indexes were built.
+INDEX_CHECK_SECONDS = float(os.getenv("BANKBOT_INDEX_CHECK_SECONDS", "10"))
+
 class BankBotBackend:
-    def __init__(self):
+    def __init__(self, reranker_model=RERANKER_MODEL):
         self.persist_directory = "bankbot_db"
         self.rag_enabled = False
         self.collection = None
         self.model = None
+        self.bm25 = BM25Index()
+        self.documents = {}
+        self.vector_dtype = ""
+        self.vectors = None
+        self.reranker_model = reranker_model
+        self.reranker = None
+        self.domain_classifier = None
+        self._index_lock = threading.Lock()
+        self._index_checked = 0.0
+        self.index_version = 0  # bumped on every rebuild, for caches derived from the documents
 
         try:
             import chromadb
-            from sentence_transformers import SentenceTransformer
+            from encoders import VECTOR_DTYPE, load_encoder
             
             # Initialize ChromaDB Client
             self.client = chromadb.PersistentClient(path=self.persist_directory)
@@ -23,10 +44,12 @@ class BankBotBackend:
             self.collection = self.client.get_or_create_collection(name=self.collection_name)
             
             # Initialize Embedding Model
-            logging.info("Loading embedding model...")
-            self.model = SentenceTransformer('all-MiniLM-L6-v2')
+            self.model = load_encoder()
             logging.info("Embedding model loaded.")
+            self.vector_dtype = VECTOR_DTYPE
             self.rag_enabled = True
+            self.refresh_indexes()
+            self._load_domain_classifier()
             logging.info("✅ RAG Backend initialized successfully.")
         except ImportError as e:
             logging.warning(f"⚠️ RAG dependencies missing ({e}). Running in LLM-only mode.")
@@ -46,23 +69,143 @@ class BankBotBackend:
         logging.info("Knowledge base is empty. Running in LLM-only mode or waiting for manual ingestion.")
         pass
 
-    def query_knowledge_base(self, query_text, n_results=3):
-        """Queries the knowledge base for relevant context."""
-        if not self.rag_enabled:
-            return []
+    def refresh_indexes(self):
+        """Rebuilds the in-memory indexes from the collection.
 
+        `refresh_if_stale` calls this when the collection's size changes; the new
+        indexes are built aside and swapped in, so queries running meanwhile
+        keep using the old ones.
+        """
+        include = ["documents", "embeddings"] if self.vector_dtype else ["documents"]
+        data = self.collection.get(include=include)
+        bm25 = BM25Index().build(data['ids'], data['documents'])
+        logging.info(f"BM25 index built over {len(bm25)} documents.")
+        vectors = None
+        if self.vector_dtype:
+            from encoders import QuantizedVectors
+
+            vectors = QuantizedVectors(data['ids'], data['embeddings'], self.vector_dtype)
+            logging.info(f"Document vectors held in memory as {self.vector_dtype} ({vectors.nbytes} bytes).")
+        self.documents, self.bm25, self.vectors = dict(zip(data['ids'], data['documents'])), bm25, vectors
+        self.index_version += 1
+        self._index_checked = time.monotonic()
+
+    def refresh_if_stale(self):
+        """Rebuilds the indexes when documents were added to or removed from the collection.
+
+        `collection.count()` is checked at most every INDEX_CHECK_SECONDS, so
+        documents ingested after start-up are found without a restart. Called by
+        `retrieve`, and by the app before anything keyed on `index_version`.
+        """
+        if self.collection is None or time.monotonic() - self._index_checked < INDEX_CHECK_SECONDS:
+            return
+        with self._index_lock:
+            if time.monotonic() - self._index_checked < INDEX_CHECK_SECONDS:
+                return
+            try:
+                count = self.collection.count()
+                if count != len(self.documents):
+                    logging.info(f"Collection has {count} documents, indexes have {len(self.documents)}; rebuilding.")
+                    self.refresh_indexes()
+            except Exception as e:
+                logging.error(f"Could not refresh the retrieval indexes: {e}")
+            self._index_checked = time.monotonic()
+
+    def _load_domain_classifier(self):
         try:
-            query_embedding = self.model.encode([query_text]).tolist()
-            
+            from domain_classifier import DomainClassifier
+
+            self.domain_classifier = DomainClassifier(self.model)
+        except Exception as e:
+            logging.error(f"Domain classifier unavailable ({e}). Every query goes to the LLM.")
+
+    def embed_query(self, query_text):
+        """The query's embedding, for `is_banking_query` and then retrieval."""
+        with span("embedding"):
+            return self.model.encode([query_text])[0]
+
+    def is_banking_query(self, query_embedding):
+        """False only when the domain classifier is confident the query isn't about banking."""
+        if self.domain_classifier is None:
+            return True
+        with span("domain_check"):
+            return self.domain_classifier.is_banking(query_embedding)
+
+    def _get_reranker(self):
+        if self.reranker is None and self.reranker_model:
+            try:
+                self.reranker = CrossEncoderReranker(self.reranker_model)
+            except Exception as e:
+                logging.error(f"Re-ranker unavailable ({e}). Using fused ranking only.")
+                self.reranker_model = None
+        return self.reranker
+
+    def dense_search(self, query_text, n_results, query_embedding=None):
+        """Document ids from the embedding search, best first."""
+        if query_embedding is None:
+            query_embedding = self.embed_query(query_text)
+        with span("vector_search"):
+            if self.vectors is not None:
+                return self.vectors.search(query_embedding, n_results)
             results = self.collection.query(
-                query_embeddings=query_embedding,
-                n_results=n_results
+                query_embeddings=[list(map(float, query_embedding))],
+                n_results=min(n_results, len(self.documents)),
+                include=[]
             )
-            
-            # Extract documents
-            if results['documents']:
-                return results['documents'][0] # List of strings
+        return results['ids'][0] if results['ids'] else []
+
+    def sparse_search(self, query_text, n_results):
+        """Document ids from BM25, best first."""
+        return [doc_id for doc_id, _ in self.bm25.search(query_text, n_results)]
+
+    def retrieve(self, query_text, n_results=3, candidates=CANDIDATE_POOL, rerank=True, timings=None,
+                 query_embedding=None):
+        """Hybrid retrieval: dense + BM25, fused with RRF, optionally re-ranked.
+
+        Returns document ids. If `timings` is a dict, each stage's wall time in
+        seconds is stored under "dense", "sparse", "fusion" and "rerank".
+        """
+        self.refresh_if_stale()
+        if not self.documents:
             return []
+        timings = {} if timings is None else timings
+
+        start = time.perf_counter()
+        dense_ids = self.dense_search(query_text, candidates, query_embedding)
+        timings['dense'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        sparse_ids = self.sparse_search(query_text, candidates)
+        timings['sparse'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        fused = reciprocal_rank_fusion([dense_ids, sparse_ids])
+        timings['fusion'] = time.perf_counter() - start
+
+        reranker = self._get_reranker() if rerank else None
+        if reranker is None:
+            return fused[:n_results]
+
+        start = time.perf_counter()
+        pool = [(doc_id, self.documents[doc_id]) for doc_id in fused[:candidates]]
+        ranked = reranker.rerank(query_text, pool, n_results)
+        timings['rerank'] = time.perf_counter() - start
+        return [doc_id for doc_id, _ in ranked]
+
+    def query_knowledge_base(self, query_text, n_results=3, query_embedding=None):
+        """Queries the knowledge base for relevant context. Pass `query_embedding` if already computed."""
+        if not self.rag_enabled:
+            return []
+
+        try:
+            timings = {}
+            with span("retrieval"):
+                doc_ids = self.retrieve(query_text, n_results, timings=timings, query_embedding=query_embedding)
+            # Dense search is already split into embedding + vector_search spans.
+            for stage in ("sparse", "fusion", "rerank"):
+                if stage in timings:
+                    record_span(f"retrieval_{stage}", timings[stage])
+            return [self.documents[doc_id] for doc_id in doc_ids]
         except Exception as e:
             logging.error(f"Error querying knowledge base: {e}")
             return []
@@ -0,0 +1,118 @@
+"""Load time, memory, encode throughput and recall for each encoder backend and vector dtype.
+
+Run with: python bench_encoders.py [--backends torch onnx onnx-int8]
+
+Each backend is measured in a fresh subprocess so import time and RSS aren't
+shared between them. Recall uses every FAQ's stored question as the query and its
+own entry as the relevant document, searched against the vectors already in
+Chroma (written by the PyTorch encoder at ingestion).
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+KS = (1, 5)
+
+
+def rss_mb():
+    try:
+        import psutil
+
+        return psutil.Process().memory_info().rss / 2 ** 20
+    except ImportError:
+        import resource
+
+        # Peak rather than current RSS; ru_maxrss is KiB on Linux, bytes on macOS.
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+def load_collection():
+    import chromadb
+
+    client = chromadb.PersistentClient(path="bankbot_db")
+    data = client.get_collection("rbi_faqs").get(include=["documents", "embeddings", "metadatas"])
+    questions = [
+        (meta["question"], doc_id)
+        for doc_id, meta in zip(data['ids'], data['metadatas'])
+        if meta and meta.get("question")
+    ]
+    return data['ids'], data['documents'], data['embeddings'], questions
+
+
+def run_worker(backend, batch_size):
+    ids, documents, embeddings, questions = load_collection()
+    baseline_rss = rss_mb()
+
+    start = time.perf_counter()
+    from encoders import VECTOR_DTYPES, QuantizedVectors, load_encoder
+
+    model = load_encoder(backend)
+    load_seconds = time.perf_counter() - start
+    model_rss = rss_mb() - baseline_rss
+
+    query_vectors = []
+    start = time.perf_counter()
+    for question, _ in questions:
+        query_vectors.append(model.encode([question])[0])
+    query_ms = (time.perf_counter() - start) / len(questions) * 1000
+
+    start = time.perf_counter()
+    model.encode(documents, batch_size=batch_size)
+    docs_per_second = len(documents) / (time.perf_counter() - start)
+
+    rows = []
+    for dtype in VECTOR_DTYPES:
+        vectors = QuantizedVectors(ids, embeddings, dtype)
+        hits = {k: 0 for k in KS}
+        for query_vector, (_, doc_id) in zip(query_vectors, questions):
+            ranked = vectors.search(query_vector, max(KS))
+            for k in KS:
+                hits[k] += doc_id in ranked[:k]
+        rows.append({
+            "backend": backend,
+            "dtype": dtype,
+            "load_s": load_seconds,
+            "rss_mb": model_rss,
+            "query_ms": query_ms,
+            "docs_per_s": docs_per_second,
+            "vector_kb": vectors.nbytes / 1024,
+            **{f"R@{k}": hits[k] / len(questions) for k in KS},
+        })
+    print(json.dumps(rows))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "onnx-int8"])
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.batch_size)
+        return
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    header = (f"{'backend':<11}{'vectors':<9}{'load s':>8}{'RSS MB':>8}{'query ms':>10}"
+              f"{'docs/s':>8}{'vec KB':>8}" + "".join(f"{f'R@{k}':>7}" for k in KS))
+    print(header)
+    for backend in args.backends:
+        result = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--worker", backend, "--batch-size", str(args.batch_size)],
+            cwd=here, capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            print(f"{backend:<11}failed: {result.stderr.strip().splitlines()[-1] if result.stderr.strip() else result.returncode}")
+            continue
+        for row in json.loads(result.stdout.strip().splitlines()[-1]):
+            print(f"{row['backend']:<11}{row['dtype']:<9}{row['load_s']:>8.2f}{row['rss_mb']:>8.0f}"
+                  f"{row['query_ms']:>10.2f}{row['docs_per_s']:>8.0f}{row['vector_kb']:>8.0f}"
+                  + "".join(f"{row[f'R@{k}']:>7.3f}" for k in KS))
+
+
+if __name__ == "__main__":
+    main()
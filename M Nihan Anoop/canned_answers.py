@@ -0,0 +1,117 @@
+"""Precomputed answers for the chat's starter and suggestion buttons.
+
+The buttons always send the same text, so their answers are generated offline
+and looked up before a click reaches retrieval or the LLM. Answers are stored
+with a fingerprint of the knowledge base, model and system prompt; when any of
+those changes the stored answers are ignored until they are regenerated.
+
+Regenerate (a no-op while the fingerprint still matches) with:
+    python canned_answers.py [--force]
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime
+
+from llm_engine import FAILURE_MESSAGES, SYSTEM_PROMPT
+from title_jobs import normalize_question
+
+ANSWERS_FILE = os.getenv("BANKBOT_CANNED_ANSWERS", "canned_answers.json")
+
+# Shown on an empty chat, and as follow-ups after every answer.
+STARTER_PROMPTS = ["What's my balance?", "Compare credit cards", "Reset my PIN"]
+SUGGESTED_PROMPTS = ["How do I open an account?", "Interest rates?", "Contact support"]
+CANNED_PROMPTS = STARTER_PROMPTS + SUGGESTED_PROMPTS
+
+
+def knowledge_base_fingerprint(documents, model, system_prompt=SYSTEM_PROMPT):
+    """Changes whenever a document, the answer model or the system prompt does."""
+    digest = hashlib.sha256()
+    for part in [model, system_prompt] + [f"{doc_id}\0{text}" for doc_id, text in sorted(documents.items())]:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class CannedAnswers:
+    """Answer table for CANNED_PROMPTS, valid only for the fingerprint it was generated with."""
+
+    def __init__(self, fingerprint, path=ANSWERS_FILE):
+        self.fingerprint = fingerprint
+        self.path = path
+        self.answers = {}
+        self.generated_at = None
+        stored = self._load()
+        if stored.get("fingerprint") == fingerprint:
+            self.answers = {normalize_question(q): a for q, a in stored.get("answers", {}).items()}
+            self.generated_at = stored.get("generated_at")
+        elif stored:
+            logging.info(f"{path} was generated for an older knowledge base; regenerate it with `python canned_answers.py`.")
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def lookup(self, question):
+        """The stored answer for a canned prompt (matched on normalized text), else None."""
+        return self.answers.get(normalize_question(question))
+
+    def __len__(self):
+        return len(self.answers)
+
+
+def generate(backend, engine, prompts=CANNED_PROMPTS, path=ANSWERS_FILE, force=False):
+    """Answers `prompts` through the normal RAG + LLM path and saves them; returns the number written."""
+    fingerprint = knowledge_base_fingerprint(backend.documents, engine.model)
+    current = CannedAnswers(fingerprint, path)
+    if not force and all(current.lookup(prompt) for prompt in prompts):
+        logging.info(f"{path} is up to date.")
+        return 0
+
+    answers = {}
+    for prompt in prompts:
+        context = backend.query_knowledge_base(prompt)
+        answer = engine.query_ollama(prompt, context)
+        if answer in FAILURE_MESSAGES:
+            # Keep the previous file rather than caching an error as the answer
+            raise RuntimeError(f"Ollama did not answer {prompt!r}: {answer}")
+        answers[prompt] = answer
+        logging.info(f"Answered {prompt!r} ({len(answer)} chars).")
+
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({
+            "fingerprint": fingerprint,
+            "model": engine.model,
+            "generated_at": datetime.now().isoformat(timespec="seconds"),
+            "answers": answers,
+        }, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+    return len(answers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Regenerate the canned button answers.")
+    parser.add_argument("--force", action="store_true", help="regenerate even if the knowledge base is unchanged")
+    args = parser.parse_args()
+
+    from backend import BankBotBackend
+    from llm_engine import LLMEngine
+    from model_registry import ModelRegistry
+
+    backend = BankBotBackend()
+    backend.initialize_knowledge_base()
+    # Wait for calibration, so the answers are generated with (and keyed to) the model the app will settle on.
+    registry = ModelRegistry()
+    written = generate(backend, LLMEngine(model=registry.select(), registry=registry), force=args.force)
+    if written:
+        print(f"Wrote {written} answers to {ANSWERS_FILE}")
+
+
+if __name__ == "__main__":
+    main()
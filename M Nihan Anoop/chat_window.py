@@ -0,0 +1,39 @@
+# Shared module. This file (M Nihan Anoop/chat_window.py) is the original; Ankesh Maurya/ and Hariprasad R S/ keep
+# identical copies and Reja Fathima/ a typed port. Change them together.
+import os
+
+import streamlit as st
+
+# Messages drawn per page; older pages are added on demand.
+MESSAGES_PER_PAGE = int(os.getenv("CHAT_PAGE_SIZE", "20"))
+
+
+def visible_messages(messages, pages, page_size=MESSAGES_PER_PAGE):
+    """Index of the first visible message, and the newest `pages` pages of messages."""
+    start = max(0, len(messages) - pages * page_size)
+    return start, messages[start:]
+
+
+def _show_more(pages_key):
+    chat_key, pages = st.session_state[pages_key]
+    st.session_state[pages_key] = (chat_key, pages + 1)
+
+
+def render_window(messages, render_message, chat_key, page_size=MESSAGES_PER_PAGE, pages_key="chat_pages"):
+    """Calls `render_message(message)` for the visible window of the open chat.
+
+    Long chats only draw their last page on each rerun; a button above it adds
+    one earlier page at a time. The page count starts over when `chat_key`
+    (the open chat) changes.
+    """
+    stored_key, pages = st.session_state.get(pages_key, (None, 1))
+    if pages_key not in st.session_state or stored_key != chat_key:
+        pages = 1
+        st.session_state[pages_key] = (chat_key, pages)
+
+    start, window = visible_messages(messages, pages, page_size)
+    if start:
+        st.button(f"Show {min(start, page_size)} earlier messages ({start} hidden)",
+                  key=f"{pages_key}_more", on_click=_show_more, args=(pages_key,))
+    for message in window:
+        render_message(message)
@@ -0,0 +1,117 @@
+import logging
+import os
+
+import numpy as np
+
+# Replaces the LLM call for messages the classifier is sure aren't about banking.
+REFUSAL_MESSAGE = ("I am a dedicated Banking Assistant. I can help you with your financial questions. "
+                   "How can I assist you with your banking needs today?")
+# Fixed decision threshold; when unset it is calibrated from the examples below.
+THRESHOLD = os.getenv("BANKBOT_DOMAIN_THRESHOLD")
+# Share of the banking examples that calibration must still accept. Wrongly
+# refusing a customer costs more than occasionally generating for an off-topic one.
+BANKING_RECALL = float(os.getenv("BANKBOT_DOMAIN_RECALL", "0.95"))
+
+BANKING_EXAMPLES = [
+    "What is my account balance?",
+    "How do I open a savings account?",
+    "What is the interest rate on a fixed deposit?",
+    "How can I apply for a home loan?",
+    "My debit card was stolen, how do I block it?",
+    "How do I reset my net banking password?",
+    "What documents are needed for KYC?",
+    "How do I transfer money using UPI?",
+    "Why was I charged a fee on my credit card?",
+    "What is the minimum balance for a current account?",
+    "How long does a NEFT transfer take?",
+    "Can I exchange soiled or torn currency notes?",
+    "How do I report a fraudulent transaction?",
+    "What are the RBI guidelines on ATM withdrawal limits?",
+    "How do I update my mobile number with the bank?",
+    "What is the EMI on a personal loan of 5 lakh?",
+    "How can I increase my credit card limit?",
+    "How do I stop a cheque payment?",
+    "What is a recurring deposit?",
+    "How is interest calculated on a savings account?",
+    "Can I close my loan early, and is there a prepayment penalty?",
+    "How do I add a beneficiary for IMPS?",
+    "What happens if I miss a credit card payment?",
+    "How do I get my account statement for the last six months?",
+]
+
+OFF_TOPIC_EXAMPLES = [
+    "Tell me a joke about cats",
+    "Write a python function that reverses a string",
+    "Who won the football world cup in 2018?",
+    "What is the capital of Australia?",
+    "Give me a recipe for chocolate cake",
+    "Write a poem about the ocean",
+    "How do I fix a segmentation fault in C?",
+    "What's the weather like tomorrow?",
+    "Explain the theory of relativity",
+    "Recommend a good movie to watch tonight",
+    "How many calories are in a banana?",
+    "Translate 'good morning' into French",
+    "Who are you and who made you?",
+    "What is the best programming language to learn?",
+    "Summarize the plot of Hamlet",
+    "How do I train for a marathon?",
+    "What are the symptoms of the flu?",
+    "Write a story about a dragon",
+    "Solve this equation: 3x + 5 = 20",
+    "Which planet is the largest in the solar system?",
+    "How do I center a div in CSS?",
+    "What is the history of the Roman empire?",
+    "Suggest names for my new puppy",
+    "Play a game of chess with me",
+]
+
+
+def _unit(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1.0)
+
+
+class DomainClassifier:
+    """Banking vs. off-topic decision on the query embedding retrieval computes anyway.
+
+    The score is the cosine similarity to the banking centroid minus the
+    similarity to the off-topic centroid. Unless THRESHOLD is set, the cut-off
+    is calibrated on leave-one-out scores of the examples. It is the highest
+    threshold that still accepts BANKING_RECALL of the banking examples.
+    """
+
+    def __init__(self, encoder, banking=BANKING_EXAMPLES, off_topic=OFF_TOPIC_EXAMPLES,
+                 threshold=THRESHOLD, recall=BANKING_RECALL):
+        banking_vectors = _unit(encoder.encode(list(banking)))
+        off_topic_vectors = _unit(encoder.encode(list(off_topic)))
+        self.banking_centroid = _unit(banking_vectors.mean(axis=0))
+        self.off_topic_centroid = _unit(off_topic_vectors.mean(axis=0))
+        if threshold is not None:
+            self.threshold = float(threshold)
+        else:
+            self.threshold = self.calibrate(banking_vectors, off_topic_vectors, recall)
+        logging.info(f"Domain classifier ready (threshold {self.threshold:.3f}).")
+
+    @staticmethod
+    def _held_out_scores(vectors, own_sum, other_centroid):
+        # Each example is scored against its class centroid computed without it.
+        held_out = _unit((own_sum[None, :] - vectors) / max(len(vectors) - 1, 1))
+        return np.sum(vectors * held_out, axis=1) - vectors @ other_centroid
+
+    def calibrate(self, banking_vectors, off_topic_vectors, recall):
+        banking_scores = self._held_out_scores(banking_vectors, banking_vectors.sum(axis=0), self.off_topic_centroid)
+        off_topic_scores = -self._held_out_scores(off_topic_vectors, off_topic_vectors.sum(axis=0), self.banking_centroid)
+        threshold = float(np.quantile(banking_scores, 1.0 - recall, method="lower"))
+        refused = float(np.mean(off_topic_scores < threshold))
+        logging.info(f"Calibrated domain threshold {threshold:.3f}: accepts {np.mean(banking_scores >= threshold):.0%} "
+                     f"of banking examples, refuses {refused:.0%} of off-topic ones.")
+        return threshold
+
+    def score(self, query_embedding):
+        query = _unit(np.asarray(query_embedding, dtype=np.float32).ravel())
+        return float(query @ self.banking_centroid - query @ self.off_topic_centroid)
+
+    def is_banking(self, query_embedding):
+        return self.score(query_embedding) >= self.threshold
@@ -0,0 +1,88 @@
+import logging
+import os
+
+import numpy as np
+
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
+# "torch" (full precision), "onnx" (ONNX Runtime, fp32) or "onnx-int8" (ONNX Runtime, int8 weights).
+ENCODER_BACKEND = os.getenv("BANKBOT_ENCODER", "torch")
+# The quantized exports published with the model; pick the one matching the CPU (avx2, avx512, arm64).
+ONNX_INT8_FILE = os.getenv("BANKBOT_ONNX_FILE", "onnx/model_qint8_avx2.onnx")
+# Empty: search vectors inside Chroma. "float32", "float16" or "int8": keep an in-memory copy at that precision.
+VECTOR_DTYPE = os.getenv("BANKBOT_VECTOR_DTYPE", "")
+
+ENCODER_BACKENDS = ("torch", "onnx", "onnx-int8")
+VECTOR_DTYPES = ("float32", "float16", "int8")
+
+
+def load_encoder(backend=ENCODER_BACKEND, model_name=EMBEDDING_MODEL):
+    """Loads the sentence encoder on the requested inference backend.
+
+    The ONNX backends need sentence-transformers >= 3.2 with `onnxruntime` (or
+    `optimum[onnxruntime]`) installed.
+    """
+    from sentence_transformers import SentenceTransformer
+
+    if backend not in ENCODER_BACKENDS:
+        raise ValueError(f"Unknown encoder backend {backend!r}; expected one of {ENCODER_BACKENDS}")
+    logging.info(f"Loading embedding model {model_name} ({backend})...")
+    if backend == "torch":
+        return SentenceTransformer(model_name)
+    if backend == "onnx":
+        return SentenceTransformer(model_name, backend="onnx")
+    return SentenceTransformer(model_name, backend="onnx", model_kwargs={"file_name": ONNX_INT8_FILE})
+
+
+class QuantizedVectors:
+    """Document vectors held in memory as float32, float16 or int8.
+
+    int8 uses one symmetric scale per vector, so a 384-dim MiniLM vector takes
+    388 bytes instead of 1536. Scores are dot products, which rank the same as
+    Chroma's L2 distance because MiniLM embeddings are unit length.
+    """
+
+    BLOCK_ROWS = 4096
+
+    def __init__(self, ids, embeddings, dtype="int8"):
+        if dtype not in VECTOR_DTYPES:
+            raise ValueError(f"Unknown vector dtype {dtype!r}; expected one of {VECTOR_DTYPES}")
+        self.ids = list(ids)
+        self.dtype = dtype
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        matrix = matrix.reshape(len(self.ids), -1) if matrix.size else np.zeros((0, 0), np.float32)
+        self.scales = None
+        if dtype == "int8":
+            peak = np.abs(matrix).max(axis=1, initial=0.0)
+            self.scales = np.where(peak > 0, peak / 127.0, 1.0).astype(np.float32)
+            self.matrix = np.round(matrix / self.scales[:, None]).astype(np.int8)
+        else:
+            self.matrix = matrix.astype(dtype)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def nbytes(self):
+        return self.matrix.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def scores(self, query_embedding):
+        query = np.asarray(query_embedding, dtype=np.float32).ravel()
+        # Widen a block at a time so memory stays at the stored precision.
+        scores = np.empty(len(self.ids), dtype=np.float32)
+        for start in range(0, len(self.ids), self.BLOCK_ROWS):
+            block = self.matrix[start:start + self.BLOCK_ROWS].astype(np.float32)
+            scores[start:start + len(block)] = block @ query
+        if self.scales is not None:
+            scores *= self.scales
+        return scores
+
+    def search(self, query_embedding, n_results):
+        """Ids of the `n_results` most similar documents, best first."""
+        if not self.ids:
+            return []
+        scores = self.scores(query_embedding)
+        n_results = min(n_results, len(self.ids))
+        top = np.argpartition(-scores, n_results - 1)[:n_results]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [self.ids[position] for position in top]
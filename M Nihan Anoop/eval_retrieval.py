@@ -0,0 +1,92 @@
+"""Recall@k and per-stage latency for the knowledge base retrievers.
+
+Run with: python eval_retrieval.py [--queries eval.jsonl] [--reranker MODEL]
+
+Without --queries, every FAQ's stored question is used as a query and its own
+entry is the relevant document. A queries file has one JSON object per line:
+{"query": "...", "relevant": ["<doc id>", ...]}.
+"""
+import argparse
+import json
+import statistics
+
+from backend import CANDIDATE_POOL, BankBotBackend
+
+KS = (1, 3, 5, 10)
+
+
+def load_queries(backend, path=None):
+    if path:
+        with open(path, 'r', encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+    data = backend.collection.get(include=["metadatas"])
+    return [
+        {"query": meta["question"], "relevant": [doc_id]}
+        for doc_id, meta in zip(data['ids'], data['metadatas'])
+        if meta and meta.get("question")
+    ]
+
+
+def recall_at(ranked, relevant, k):
+    return len(set(ranked[:k]) & set(relevant)) / len(relevant)
+
+
+def recall_row(ranked, relevant):
+    return {k: recall_at(ranked, relevant, k) for k in KS}
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", help="JSONL file of queries and relevant doc ids")
+    parser.add_argument("--reranker", help="cross-encoder model name (default: BANKBOT_RERANKER_MODEL)")
+    parser.add_argument("--candidates", type=int, default=CANDIDATE_POOL)
+    args = parser.parse_args()
+
+    backend = BankBotBackend(**({"reranker_model": args.reranker} if args.reranker else {}))
+    if not backend.rag_enabled or not backend.documents:
+        print("Knowledge base unavailable or empty; nothing to evaluate.")
+        return
+    queries = load_queries(backend, args.queries)
+    depth = max(max(KS), args.candidates)
+
+    systems = {"dense": [], "sparse": [], "hybrid": []}
+    if backend._get_reranker() is not None:
+        systems["hybrid+rerank"] = []
+    latencies = {"dense": [], "sparse": [], "fusion": [], "rerank": []}
+
+    for item in queries:
+        query, relevant = item["query"], item["relevant"]
+        systems["dense"].append(recall_row(backend.dense_search(query, depth), relevant))
+        systems["sparse"].append(recall_row(backend.sparse_search(query, depth), relevant))
+
+        # A fresh dict per configuration, so the re-ranked run doesn't overwrite the
+        # dense/sparse/fusion timings of the plain hybrid run.
+        timings = {}
+        hybrid = backend.retrieve(query, depth, args.candidates, rerank=False, timings=timings)
+        systems["hybrid"].append(recall_row(hybrid, relevant))
+        for stage, seconds in timings.items():
+            latencies[stage].append(seconds)
+        if "hybrid+rerank" in systems:
+            timings = {}
+            reranked = backend.retrieve(query, depth, args.candidates, rerank=True, timings=timings)
+            systems["hybrid+rerank"].append(recall_row(reranked, relevant))
+            latencies["rerank"].append(timings["rerank"])
+
+    print(f"{len(queries)} queries, {len(backend.documents)} documents, candidate pool {args.candidates}\n")
+    print(f"{'retriever':<16}" + "".join(f"{f'R@{k}':>8}" for k in KS))
+    for name, rows in systems.items():
+        print(f"{name:<16}" + "".join(f"{statistics.mean(r[k] for r in rows):>8.3f}" for k in KS))
+
+    print(f"\n{'stage':<16}{'mean ms':>10}{'p95 ms':>10}")
+    for stage, values in latencies.items():
+        if values:
+            print(f"{stage:<16}{statistics.mean(values) * 1000:>10.2f}{percentile(values, 95) * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import logging
+import math
+import re
+from collections import Counter, OrderedDict, defaultdict
+
+# Keeps codes like "15g", "neft" and "2013" as single tokens.
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+RRF_K = 60
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    """Okapi BM25 over an in-memory inverted index.
+
+    Exact terms ("NEFT", "RTGS", "Form 15G") that a small embedding model tends to blur
+    score highly here, which is what the dense search misses.
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.ids = []
+        self.postings = defaultdict(list)  # term -> [(doc position, term frequency)]
+        self.doc_lengths = []
+        self.avg_length = 0.0
+
+    def __len__(self):
+        return len(self.ids)
+
+    def build(self, ids, documents):
+        self.ids = list(ids)
+        self.postings = defaultdict(list)
+        self.doc_lengths = []
+        for position, document in enumerate(documents):
+            tokens = tokenize(document)
+            self.doc_lengths.append(len(tokens))
+            for term, frequency in Counter(tokens).items():
+                self.postings[term].append((position, frequency))
+        self.avg_length = sum(self.doc_lengths) / len(self.doc_lengths) if self.doc_lengths else 0.0
+        return self
+
+    def _idf(self, term):
+        df = len(self.postings.get(term, ()))
+        return math.log(1 + (len(self.ids) - df + 0.5) / (df + 0.5))
+
+    def search(self, query, n_results=10):
+        """Returns [(doc id, score)] for the best `n_results` documents, highest first."""
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self._idf(term)
+            for position, frequency in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[position] / self.avg_length)
+                scores[position] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:n_results]
+        return [(self.ids[position], score) for position, score in ranked]
+
+
+def reciprocal_rank_fusion(rankings, k=RRF_K, n_results=None):
+    """Fuses several ranked id lists; each id scores sum(1 / (k + rank)).
+
+    Ties keep the order in which ids were first seen, so the first ranking wins them.
+    """
+    scores = OrderedDict()
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    fused = sorted(scores, key=lambda doc_id: -scores[doc_id])
+    return fused[:n_results] if n_results is not None else fused
+
+
+class CrossEncoderReranker:
+    """Scores (query, document) pairs with a cross-encoder, one batch per query.
+
+    Scores are cached per (query, doc id), so a repeated question only pays for
+    candidates it hasn't seen before.
+    """
+
+    def __init__(self, model_name, batch_size=16, cache_size=2048):
+        from sentence_transformers import CrossEncoder
+
+        logging.info(f"Loading re-ranker {model_name}...")
+        self.model = CrossEncoder(model_name)
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+
+    def rerank(self, query, candidates, n_results=None):
+        """`candidates` is [(doc id, text)]; returns them re-ordered by cross-encoder score."""
+        missing = [(doc_id, text) for doc_id, text in candidates if (query, doc_id) not in self._cache]
+        if missing:
+            scores = self.model.predict(
+                [(query, text) for _, text in missing], batch_size=self.batch_size
+            )
+            for (doc_id, _), score in zip(missing, scores):
+                self._cache[(query, doc_id)] = float(score)
+        ranked = sorted(candidates, key=lambda item: -self._cache[(query, item[0])])
+
+        for doc_id, _ in candidates:
+            self._cache.move_to_end((query, doc_id))
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return ranked[:n_results] if n_results is not None else ranked
@@ -1,76 +1,176 @@
 import requests
 import json
 import logging
+import os
+from collections import deque
+
+from llm_gateway import BUSY_MESSAGE, PRIORITY_ANSWER, PRIORITY_SHORT, GatewayBusy, gateway
+from model_registry import ModelRegistry
+from ollama_health import UNAVAILABLE_MESSAGE, CircuitOpen, health
+from tracing import record_ollama, span
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# How long Ollama keeps the model (and its prompt cache) loaded after a request.
+KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+
+CONNECTION_ERROR_MESSAGE = "I'm having trouble connecting to my AI brain (Ollama) right now. Please ensure Ollama is running."
+# Replies query_ollama gives instead of an answer when the request didn't go through.
+FAILURE_MESSAGES = {BUSY_MESSAGE, UNAVAILABLE_MESSAGE, CONNECTION_ERROR_MESSAGE}
+
+# Titles can use a smaller, faster model than answers (defaults to the answer model).
+TITLE_MODEL = os.getenv("TITLE_MODEL")
+TITLE_NUM_PREDICT = int(os.getenv("TITLE_NUM_PREDICT", "12"))
+
+TITLE_PROMPT = "Summarize this banking query into a single short 2-3 word title (e.g., 'Credit Card Fees', 'Account Opening'). Do not use quotes or punctuation."
+
+# Kept byte-identical across requests and sent first, so Ollama can reuse the
+# cached prefill for it; retrieved context and the question go in the user turn.
+SYSTEM_PROMPT = """You are BankBot, a specialized, professional, and friendly Banking Assistant.
+
+Your Mission:
+Provide accurate, helpful, and secure banking information to customers.
+
+Guidelines:
+1. **Scope:** Answer ONLY banking-related questions (e.g., accounts, transactions, loans, cards, regulations, security).
+2. **Guardrails:**
+   - If a user asks a non-banking question (e.g., "Who made you?", "Weather?", "General knowledge"), gently redirect them: "I am a dedicated Banking Assistant. I can help you with your financial questions. How can I assist you with your banking needs today?"
+   - Do not answer meta-questions about your underlying model or training data.
+3. **Tone:** Professional, empathetic, and concise.
+4. **Context:** Use the context provided with the question if relevant. If context is empty, use your general banking knowledge but be cautious not to hallucinatory specific policy details.
+"""
+
+
+def build_user_message(user_query, context_chunks):
+    if not context_chunks:
+        return user_query
+    context_text = "\n\n".join(context_chunks)
+    return f"Context:\n{context_text}\n\nQuestion: {user_query}"
+
+
 class LLMEngine:
-    def __init__(self, model=None):
+    def __init__(self, model=None, registry=None):
         self.base_url = "http://127.0.0.1:11434/api/chat"
-        self.model = model
-        
-        if not self.model:
-            try:
-                tags_url = "http://127.0.0.1:11434/api/tags"
-                response = requests.get(tags_url, timeout=2)
-                if response.status_code == 200:
-                    models = response.json().get('models', [])
-                    if models:
-                        self.model = models[0]['name']
-                        logging.info(f"Auto-selected model: {self.model}")
-                    else:
-                        self.model = "llama3" 
-                        logging.warning("No models found in Ollama, defaulting to llama3")
-                else:
-                    self.model = "llama3"
-            except Exception as e:
-                logging.error(f"Error detecting model: {e}")
-                self.model = "llama3"
-
-    def query_ollama(self, user_query, context_chunks, system_instructions=None):
-       
-        if system_instructions:
-            system_prompt = system_instructions
-        else:
-            context_text = "\n\n".join(context_chunks)
-            system_prompt = f"""You are BankBot, a specialized, professional, and friendly Banking Assistant.
-        
-        Your Mission:
-        Provide accurate, helpful, and secure banking information to customers.
-        
-        Guidelines:
-        1. **Scope:** Answer ONLY banking-related questions (e.g., accounts, transactions, loans, cards, regulations, security).
-        2. **Guardrails:** 
-           - If a user asks a non-banking question (e.g., "Who made you?", "Weather?", "General knowledge"), gently redirect them: "I am a dedicated Banking Assistant. I can help you with your financial questions. How can I assist you with your banking needs today?"
-           - Do not answer meta-questions about your underlying model or training data.
-        3. **Tone:** Professional, empathetic, and concise.
-        4. **Context:** Use the provided context if relevant. If context is empty, use your general banking knowledge but be cautious not to hallucinatory specific policy details.
-        
-        Context:
-        {context_text}
+        self.prefill_history = deque(maxlen=200)  # prompt-eval stats from recent requests
+        # Without an explicit model, the registry picks (and remembers) the fastest one that meets the quality tier.
+        # Until a first calibration finishes, answers come from the smallest candidate.
+        self.registry = registry or ModelRegistry()
+        self.model = model or self.registry.select_in_background(self.use_model)
+
+    def use_model(self, name):
+        """Switches later requests to `name`, e.g. once the registry has calibrated the installed models."""
+        if name != self.model:
+            logging.info(f"Switching answer model from {self.model} to {name}")
+            self.model = name
+
+    def record_prefill(self, result):
+        """Keeps Ollama's prompt-eval timings so prefix-cache savings are visible."""
+        stats = {
+            "prompt_tokens": result.get("prompt_eval_count", 0),
+            "prefill_ms": result.get("prompt_eval_duration", 0) / 1e6,
+        }
+        self.prefill_history.append(stats)
+        logging.info(f"Prefill: {stats['prompt_tokens']} prompt tokens in {stats['prefill_ms']:.0f} ms")
+        return stats
+
+    def average_prefill_ms(self):
+        if not self.prefill_history:
+            return None
+        return sum(s["prefill_ms"] for s in self.prefill_history) / len(self.prefill_history)
+
+    def query_ollama(self, user_query, context_chunks, system_instructions=None, priority=PRIORITY_ANSWER,
+                     cancelled=None):
+        """The model's answer, or one of FAILURE_MESSAGES.
+
+        With `cancelled` (a threading.Event, for speculative work) the reply is
+        streamed and abandoned, returning None, as soon as the event is set or a
+        request that outranks `priority` is waiting for the gateway.
         """
+        system_prompt = system_instructions or SYSTEM_PROMPT
         
-        payload = {
-            "model": self.model,
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_query}
-            ],
-            "stream": False
-        }
+        with span("prompt_build"):
+            payload = {
+                "model": self.model,
+                "messages": [
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": build_user_message(user_query, context_chunks)}
+                ],
+                "stream": cancelled is not None,
+                "keep_alive": KEEP_ALIVE
+            }
         
         try:
             logging.info(f"Sending query to Ollama ({self.model})...")
-            response = requests.post(self.base_url, json=payload, timeout=60)
-            response.raise_for_status()
-            
-            result = response.json()
+            # The breaker is checked before queueing, so an outage fails fast instead of per-request timeouts
+            with health.call(), gateway.slot(priority), span("generation"):
+                if cancelled is None:
+                    response = requests.post(self.base_url, json=payload, timeout=60)
+                    response.raise_for_status()
+                    result = response.json()
+                else:
+                    result = self.stream_unless_cancelled(payload, priority, cancelled)
+            if result is None:
+                return None
+
+            self.record_prefill(result)
+            record_ollama(result)
             return result['message']['content']
             
+        except CircuitOpen as e:
+            logging.warning(f"Skipping generation: {e}")
+            return UNAVAILABLE_MESSAGE
+        except GatewayBusy as e:
+            logging.warning(f"LLM gateway busy: {e}")
+            return BUSY_MESSAGE
         except requests.RequestException as e:
             logging.error(f"Error communicating with Ollama: {e}")
-            return "I'm having trouble connecting to my AI brain (Ollama) right now. Please ensure Ollama is running."
+            return CONNECTION_ERROR_MESSAGE
+
+    def stream_unless_cancelled(self, payload, priority, cancelled):
+        """Final chat chunk with the whole reply as its message, or None if abandoned.
+
+        Checked between chunks; leaving the `with` closes the connection, which
+        makes Ollama stop generating, and the gateway slot is released.
+        """
+        parts = []
+        with requests.post(self.base_url, json=payload, timeout=60, stream=True) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if cancelled.is_set() or gateway.waiting_ahead_of(priority):
+                    logging.info("Speculative generation abandoned.")
+                    return None
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                parts.append(chunk.get("message", {}).get("content", ""))
+                if chunk.get("done"):
+                    chunk["message"] = {"role": "assistant", "content": "".join(parts)}
+                    return chunk
+        return None
+
+    def generate_title(self, question):
+        """Short chat title for a first question, or None if Ollama can't provide one."""
+        payload = {
+            "model": TITLE_MODEL or self.model,
+            "messages": [
+                {"role": "system", "content": TITLE_PROMPT},
+                {"role": "user", "content": question}
+            ],
+            "stream": False,
+            "keep_alive": KEEP_ALIVE,
+            "options": {"num_predict": TITLE_NUM_PREDICT, "temperature": 0.2}
+        }
+        try:
+            with health.call(), gateway.slot(PRIORITY_SHORT):
+                response = requests.post(self.base_url, json=payload, timeout=30)
+                response.raise_for_status()
+        except (CircuitOpen, GatewayBusy, requests.RequestException) as e:
+            logging.warning(f"Title generation skipped: {e}")
+            return None
+        title = response.json()['message']['content'].strip().strip('.').replace('"', '').replace("'", "")
+        title = title.splitlines()[0] if title else ""
+        return (title[:37] + "...") if len(title) > 40 else (title or None)
 
 if __name__ == "__main__":
     engine = LLMEngine()
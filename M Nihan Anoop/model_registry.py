@@ -0,0 +1,279 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime
+
+import requests
+
+from llm_gateway import PRIORITY_BACKGROUND, GatewayBusy, gateway
+from ollama_health import CircuitOpen, health
+
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://127.0.0.1:11434")
+FALLBACK_MODEL = "llama3"
+# /api/tags is re-read at most this often.
+TAGS_TTL_SECONDS = float(os.getenv("OLLAMA_TAGS_TTL", "300"))
+# Selection and calibration results survive restarts here.
+REGISTRY_FILE = os.getenv("BANKBOT_MODEL_REGISTRY", "model_registry.json")
+
+# Smallest model (billions of parameters) acceptable for each quality tier.
+QUALITY_TIERS = {"basic": 1.0, "standard": 3.0, "high": 7.0}
+QUALITY_TIER = os.getenv("BANKBOT_QUALITY_TIER", "standard")
+# Never calibrate (and so never load) models bigger than this on disk.
+MAX_MODEL_GB = float(os.getenv("BANKBOT_MAX_MODEL_GB", "16"))
+# Memory Ollama may give to models at once. A model is only calibrated if it fits
+# beside the ones already loaded, so calibration never evicts the serving model.
+MODEL_MEMORY_GB = float(os.getenv("BANKBOT_MODEL_MEMORY_GB", "16"))
+# Calibration waits for the gateway to be idle, checking this often.
+IDLE_POLL_SECONDS = 5
+
+CALIBRATION_PROMPT = "In two sentences, explain what a fixed deposit is."
+CALIBRATION_TOKENS = 48
+
+
+def parameter_billions(model):
+    """Parameter count in billions from Ollama's details ("3.2B", "494M"), else from the tag ("qwen2.5:1.5b")."""
+    for text in (model.get("details", {}).get("parameter_size", ""), model.get("name", "")):
+        match = re.search(r"(\d+(?:\.\d+)?)\s*([bm])\b", text.lower())
+        if match:
+            value = float(match.group(1))
+            return value / 1000 if match.group(2) == "m" else value
+    return None
+
+
+def is_embedding_model(model):
+    details = model.get("details", {})
+    families = [details.get("family") or ""] + list(details.get("families") or [])
+    return "embed" in model.get("name", "") or any("bert" in family for family in families)
+
+
+class ModelRegistry:
+    """Picks the Ollama model BankBot answers with, and remembers the choice.
+
+    The chosen model is the fastest one (measured tokens/s from a short
+    generation) whose parameter count meets the quality tier. Measurements are
+    stored per model digest in REGISTRY_FILE, so a restart reuses the previous
+    selection without loading anything, and only new or re-pulled models are
+    calibrated. `select_in_background()` answers straight away and calibrates
+    in a thread; `select()` waits for calibration.
+
+    Calibration requests go through the LLM gateway at PRIORITY_BACKGROUND and
+    only start while it is idle, and a model is skipped (to be tried again on a
+    later start) when it wouldn't fit in MODEL_MEMORY_GB beside the models
+    Ollama already has loaded.
+    """
+
+    def __init__(self, base_url=OLLAMA_BASE_URL, tier=QUALITY_TIER, path=REGISTRY_FILE,
+                 tags_ttl=TAGS_TTL_SECONDS, max_model_gb=MAX_MODEL_GB, memory_gb=MODEL_MEMORY_GB):
+        if tier not in QUALITY_TIERS:
+            raise ValueError(f"Unknown quality tier {tier!r}; expected one of {sorted(QUALITY_TIERS)}")
+        self.base_url = base_url.rstrip("/")
+        self.tier = tier
+        self.path = path
+        self.tags_ttl = tags_ttl
+        self.max_model_gb = max_model_gb
+        self.memory_gb = memory_gb
+        self._tags = None
+        self._tags_fetched = 0.0
+        self._lock = threading.Lock()
+        self._calibration = None
+        self.state = self._load()
+
+    # --- Persistence ---
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+        state.setdefault("models", {})
+        return state
+
+    def _save(self):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp, self.path)
+
+    # --- Ollama ---
+    def fetch_tags(self):
+        response = requests.get(f"{self.base_url}/api/tags", timeout=2)
+        response.raise_for_status()
+        return response.json().get("models", [])
+
+    def tags(self, refresh=False):
+        """Installed models, from /api/tags at most once per `tags_ttl` seconds."""
+        with self._lock:
+            if refresh or self._tags is None or time.monotonic() - self._tags_fetched > self.tags_ttl:
+                self._tags = self.fetch_tags()
+                self._tags_fetched = time.monotonic()
+            return self._tags
+
+    def loaded_models(self):
+        """Models Ollama has in memory right now (/api/ps), as {name: bytes}."""
+        response = requests.get(f"{self.base_url}/api/ps", timeout=2)
+        response.raise_for_status()
+        return {m.get("name"): m.get("size", 0) for m in response.json().get("models", [])}
+
+    def fits_in_memory(self, model, loaded):
+        """Whether `model` can be loaded beside the `loaded` ones without evicting any."""
+        if model["name"] in loaded:
+            return True
+        return (model.get("size", 0) + sum(loaded.values())) / 1e9 <= self.memory_gb
+
+    def measure(self, name, loaded=()):
+        """Generation speed in tokens/s for a short banking answer.
+
+        Waits for the gateway to be idle, then runs at PRIORITY_BACKGROUND. A model
+        that calibration loaded is unloaded again afterwards (keep_alive=0) so the
+        serving model keeps its memory; one already in `loaded` is left alone.
+        """
+        payload = {
+            "model": name,
+            "prompt": CALIBRATION_PROMPT,
+            "stream": False,
+            "options": {"num_predict": CALIBRATION_TOKENS, "temperature": 0},
+        }
+        if name not in loaded:
+            payload["keep_alive"] = 0
+        while not gateway.idle():
+            time.sleep(IDLE_POLL_SECONDS)
+        with health.call(), gateway.slot(PRIORITY_BACKGROUND):
+            response = requests.post(f"{self.base_url}/api/generate", json=payload, timeout=300)
+            response.raise_for_status()
+        result = response.json()
+        seconds = result.get("eval_duration", 0) / 1e9
+        return result.get("eval_count", 0) / seconds if seconds else 0.0
+
+    # --- Selection ---
+    def profile(self, model):
+        """Size, quantization and (once calibrated) speed for one /api/tags entry."""
+        name = model["name"]
+        known = self.state["models"].get(name, {})
+        if known.get("digest") == model.get("digest") and known.get("tokens_per_second") is not None:
+            return known
+        return {
+            "digest": model.get("digest"),
+            "size_gb": round(model.get("size", 0) / 1e9, 2),
+            "parameters_b": parameter_billions(model),
+            "quantization": model.get("details", {}).get("quantization_level"),
+            "tokens_per_second": None,
+        }
+
+    def candidates(self, models):
+        minimum = QUALITY_TIERS[self.tier]
+        usable = [m for m in models if not is_embedding_model(m) and m.get("size", 0) / 1e9 <= self.max_model_gb]
+        meeting = [m for m in usable if (parameter_billions(m) or 0) >= minimum]
+        if not meeting and usable:
+            logging.warning(f"No installed model meets the '{self.tier}' tier ({minimum}B+); choosing from all models")
+            return usable
+        return meeting
+
+    def calibrate(self, models):
+        for model in models:
+            name = model["name"]
+            profile = self.profile(model)
+            if profile["tokens_per_second"] is None:
+                try:
+                    loaded = self.loaded_models()
+                    if not self.fits_in_memory(model, loaded):
+                        logging.info(f"Not calibrating {name}: it doesn't fit beside {sorted(loaded)} "
+                                     f"in {self.memory_gb:.0f} GB (BANKBOT_MODEL_MEMORY_GB)")
+                        continue
+                    profile["tokens_per_second"] = round(self.measure(name, loaded), 1)
+                    profile["calibrated_at"] = datetime.now().isoformat(timespec="seconds")
+                    logging.info(f"Calibrated {name}: {profile['tokens_per_second']} tokens/s")
+                except (requests.RequestException, CircuitOpen, GatewayBusy) as e:
+                    logging.warning(f"Calibration of {name} failed: {e}")
+                    continue
+            self.state["models"][name] = profile
+
+    def saved_selection(self, models):
+        """The previous selection if it is still installed, unchanged, and for this tier; else None."""
+        installed = {m["name"]: m for m in models}
+        previous = self.state.get("selected")
+        if (previous in installed and self.state.get("tier") == self.tier
+                and self.state["models"].get(previous, {}).get("digest") == installed[previous].get("digest")):
+            return previous
+        return None
+
+    def select(self, refresh=False):
+        """Name of the model to answer with. Falls back to the last selection, then FALLBACK_MODEL, if Ollama is down.
+
+        Calibrates every uncalibrated candidate first, which can take minutes.
+        """
+        try:
+            models = self.tags(refresh=refresh)
+        except requests.RequestException as e:
+            logging.error(f"Error listing Ollama models: {e}")
+            return self.state.get("selected") or FALLBACK_MODEL
+
+        previous = None if refresh else self.saved_selection(models)
+        if previous:
+            logging.info(f"Using saved model selection: {previous}")
+            return previous
+
+        candidates = self.candidates(models)
+        if not candidates:
+            logging.warning(f"No models found in Ollama, defaulting to {FALLBACK_MODEL}")
+            return FALLBACK_MODEL
+
+        self.calibrate(candidates)
+        measured = [m["name"] for m in candidates if self.state["models"].get(m["name"], {}).get("tokens_per_second")]
+        if measured:
+            selected = max(measured, key=lambda name: self.state["models"][name]["tokens_per_second"])
+        else:
+            # Nothing could be measured; the smallest candidate is the safest guess for speed.
+            selected = min(candidates, key=lambda m: m.get("size", 0))["name"]
+
+        self.state.update({"selected": selected, "tier": self.tier, "selected_at": datetime.now().isoformat(timespec="seconds")})
+        try:
+            self._save()
+        except OSError as e:
+            logging.warning(f"Could not save model selection: {e}")
+        logging.info(f"Selected model {selected} for the '{self.tier}' tier")
+        return selected
+
+    def select_in_background(self, on_selected):
+        """Name of a model to answer with right now, without calibrating anything.
+
+        That is the saved selection when it is still valid. Otherwise it is the
+        smallest candidate, and `select()` runs in a background thread and calls
+        `on_selected(name)` with its choice when calibration finishes.
+        """
+        try:
+            models = self.tags()
+        except requests.RequestException as e:
+            logging.error(f"Error listing Ollama models: {e}")
+            return self.state.get("selected") or FALLBACK_MODEL
+
+        previous = self.saved_selection(models)
+        if previous:
+            logging.info(f"Using saved model selection: {previous}")
+            return previous
+
+        candidates = self.candidates(models)
+        if not candidates:
+            logging.warning(f"No models found in Ollama, defaulting to {FALLBACK_MODEL}")
+            return FALLBACK_MODEL
+
+        provisional = min(candidates, key=lambda m: m.get("size", 0))["name"]
+        with self._lock:
+            if self._calibration is None or not self._calibration.is_alive():
+                self._calibration = threading.Thread(
+                    target=self._calibrate_then, args=(on_selected,), name="model-calibration", daemon=True
+                )
+                self._calibration.start()
+        logging.info(f"Answering with {provisional} while the installed models are calibrated")
+        return provisional
+
+    def _calibrate_then(self, on_selected):
+        try:
+            on_selected(self.select())
+        except Exception as e:
+            logging.error(f"Background model calibration failed: {e}")
+
+    def describe(self, name):
+        return self.state["models"].get(name, {})
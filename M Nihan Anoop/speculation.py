@@ -0,0 +1,112 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from title_jobs import normalize_question
+from tracing import metrics
+
+# off | retrieval | generation: how far a displayed suggestion is prepared before it is clicked.
+SPECULATE_MODE = os.getenv("BANKBOT_SPECULATE", "retrieval")
+# Prepared results older than this are thrown away rather than served.
+SPECULATION_TTL_SECONDS = float(os.getenv("BANKBOT_SPECULATION_TTL", "120"))
+# Speculative work shares the process with real requests, so it gets a single worker.
+SPECULATION_WORKERS = int(os.getenv("BANKBOT_SPECULATION_WORKERS", "1"))
+
+_pool = ThreadPoolExecutor(max_workers=SPECULATION_WORKERS, thread_name_prefix="speculation")
+
+
+class Speculation:
+    """Prepares answers to the suggested follow-ups while the user reads the last reply.
+
+    One per session (kept in st.session_state); the worker pool is shared by all
+    of them. `start()` queues `job(question, cancelled)` for each suggestion not
+    already prepared, where `cancelled` is a threading.Event the job checks
+    between stages. `take()` hands over a finished result when that suggestion
+    is asked; results stay cached until they are `ttl` seconds old. `cancel()`
+    stops the unfinished work once the user asks something else. Outcomes are
+    counted in the speculation_* metrics; see `hit_rate()`.
+    """
+
+    def __init__(self, job, mode=SPECULATE_MODE, ttl=SPECULATION_TTL_SECONDS, pool=None):
+        self.job = job
+        self.mode = mode
+        self.ttl = ttl
+        self.pool = pool or _pool
+        self._jobs = {}  # normalized question -> (Future, started, cancel event)
+        self._lock = threading.Lock()
+
+    def _expire(self, now):
+        for key, (future, started, cancelled) in list(self._jobs.items()):
+            if now - started > self.ttl:
+                cancelled.set()
+                future.cancel()
+                del self._jobs[key]
+                metrics.inc("speculation_discarded_total", reason="expired")
+
+    def start(self, questions):
+        if self.mode == "off":
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            for question in questions:
+                key = normalize_question(question)
+                if key in self._jobs:
+                    continue
+                cancelled = threading.Event()
+                self._jobs[key] = (self.pool.submit(self._run, question, cancelled), now, cancelled)
+                metrics.inc("speculation_started_total", mode=self.mode)
+
+    def _run(self, question, cancelled):
+        if cancelled.is_set():
+            return None
+        try:
+            return self.job(question, cancelled)
+        except Exception as e:
+            logging.warning(f"Speculation for {question!r} failed: {e}")
+            return None
+
+    def take(self, question):
+        """The prepared result for `question` if it finished in time, else None."""
+        key = normalize_question(question)
+        with self._lock:
+            self._expire(time.monotonic())
+            entry = self._jobs.get(key)
+            if entry is None:
+                return None
+            future, _, cancelled = entry
+            if not future.done():
+                # Asked before it finished: answer normally and drop the duplicate work.
+                del self._jobs[key]
+                cancelled.set()
+                future.cancel()
+                metrics.inc("speculation_discarded_total", reason="not_ready")
+                return None
+            result = future.result()
+            if not result:
+                del self._jobs[key]
+                metrics.inc("speculation_discarded_total", reason="failed")
+                return None
+        metrics.inc("speculation_used_total", stage="generation" if result.get("answer") else "retrieval")
+        return result
+
+    def cancel(self):
+        """Stops queued and running jobs; finished results are kept for a later click."""
+        with self._lock:
+            for key, (future, _, cancelled) in list(self._jobs.items()):
+                if not future.done():
+                    cancelled.set()
+                    future.cancel()
+                    del self._jobs[key]
+                    metrics.inc("speculation_discarded_total", reason="cancelled")
+
+    def pending(self):
+        with self._lock:
+            return sum(not future.done() for future, _, _ in self._jobs.values())
+
+
+def hit_rate():
+    """(used, started) speculations across all sessions since the process started."""
+    return metrics.counter_total("speculation_used_total"), metrics.counter_total("speculation_started_total")
@@ -0,0 +1,59 @@
+import backend as backend_module
+from backend import BankBotBackend
+
+
+class FakeCollection:
+    """The parts of a Chroma collection the backend uses; dense search returns ids in insertion order."""
+
+    def __init__(self, documents):
+        self.documents = dict(documents)
+        self.count_calls = 0
+
+    def add(self, ids, documents):
+        self.documents.update(zip(ids, documents))
+
+    def count(self):
+        self.count_calls += 1
+        return len(self.documents)
+
+    def get(self, include):
+        return {"ids": list(self.documents), "documents": list(self.documents.values())}
+
+    def query(self, query_embeddings, n_results, include):
+        return {"ids": [list(self.documents)[:n_results]]}
+
+
+class FakeEncoder:
+    def encode(self, texts):
+        return [[0.0, 1.0] for _ in texts]
+
+
+def make_backend(documents):
+    backend = BankBotBackend()
+    backend.collection = FakeCollection(documents)
+    backend.model = FakeEncoder()
+    backend.rag_enabled = True
+    backend.refresh_indexes()
+    return backend
+
+
+def test_documents_ingested_after_start_are_retrieved(monkeypatch):
+    monkeypatch.setattr(backend_module, "INDEX_CHECK_SECONDS", 0)
+    backend = make_backend({"atm": "The daily ATM withdrawal limit depends on your debit card variant."})
+
+    version = backend.index_version
+    backend.collection.add(["form15g"], ["Submit Form 15G to avoid TDS on fixed deposit interest."])
+    assert backend.query_knowledge_base("form 15g", n_results=1) == [
+        "Submit Form 15G to avoid TDS on fixed deposit interest."
+    ]
+    assert set(backend.documents) == {"atm", "form15g"}
+    assert backend.index_version == version + 1
+
+
+def test_collection_is_checked_at_most_once_per_interval(monkeypatch):
+    monkeypatch.setattr(backend_module, "INDEX_CHECK_SECONDS", 60)
+    backend = make_backend({"atm": "The daily ATM withdrawal limit depends on your debit card variant."})
+
+    for _ in range(5):
+        backend.query_knowledge_base("atm limit")
+    assert backend.collection.count_calls == 0
@@ -0,0 +1,61 @@
+import pytest
+
+from canned_answers import CannedAnswers, generate, knowledge_base_fingerprint
+from llm_engine import BUSY_MESSAGE
+
+
+class FakeBackend:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def query_knowledge_base(self, query_text):
+        return list(self.documents.values())
+
+
+class FakeEngine:
+    model = "llama3.2:latest"
+
+    def __init__(self, reply=None):
+        self.reply = reply
+        self.calls = []
+
+    def query_ollama(self, user_query, context_chunks):
+        self.calls.append(user_query)
+        return self.reply or f"Answer to {user_query} from {len(context_chunks)} documents"
+
+
+def test_generated_answers_are_looked_up_by_normalized_prompt(tmp_path):
+    path = str(tmp_path / "answers.json")
+    backend, engine = FakeBackend({"faq1": "PINs can be reset at any ATM."}), FakeEngine()
+    assert generate(backend, engine, prompts=["Reset my PIN"], path=path) == 1
+
+    answers = CannedAnswers(knowledge_base_fingerprint(backend.documents, engine.model), path)
+    assert answers.lookup("reset my pin") == "Answer to Reset my PIN from 1 documents"
+    assert answers.lookup("Reset my password") is None
+
+    # Unchanged knowledge base: nothing to regenerate
+    assert generate(backend, engine, prompts=["Reset my PIN"], path=path) == 0
+    assert engine.calls == ["Reset my PIN"]
+
+
+def test_knowledge_base_change_invalidates_answers(tmp_path):
+    path = str(tmp_path / "answers.json")
+    backend, engine = FakeBackend({"faq1": "Old rates."}), FakeEngine()
+    generate(backend, engine, prompts=["Interest rates?"], path=path)
+
+    backend.documents["faq1"] = "New rates."
+    fingerprint = knowledge_base_fingerprint(backend.documents, engine.model)
+    assert CannedAnswers(fingerprint, path).lookup("Interest rates?") is None
+    assert generate(backend, engine, prompts=["Interest rates?"], path=path) == 1
+    assert CannedAnswers(fingerprint, path).lookup("Interest rates?") is not None
+
+
+def test_failed_generation_keeps_previous_answers(tmp_path):
+    path = str(tmp_path / "answers.json")
+    backend = FakeBackend({"faq1": "Call 1800-000-000."})
+    generate(backend, FakeEngine(), prompts=["Contact support"], path=path)
+
+    with pytest.raises(RuntimeError):
+        generate(backend, FakeEngine(reply=BUSY_MESSAGE), prompts=["Contact support"], path=path, force=True)
+    fingerprint = knowledge_base_fingerprint(backend.documents, FakeEngine.model)
+    assert CannedAnswers(fingerprint, path).lookup("Contact support").startswith("Answer to")
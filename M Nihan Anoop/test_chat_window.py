@@ -0,0 +1,19 @@
+from chat_window import visible_messages
+
+
+def test_short_chat_is_shown_whole():
+    messages = list(range(5))
+    assert visible_messages(messages, pages=1, page_size=20) == (0, messages)
+
+
+def test_only_latest_page_is_visible():
+    messages = list(range(45))
+    start, window = visible_messages(messages, pages=1, page_size=20)
+    assert start == 25
+    assert window == messages[25:]
+
+
+def test_each_page_adds_earlier_messages_until_the_start():
+    messages = list(range(45))
+    assert visible_messages(messages, pages=2, page_size=20)[0] == 5
+    assert visible_messages(messages, pages=3, page_size=20) == (0, messages)
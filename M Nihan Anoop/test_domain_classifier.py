@@ -0,0 +1,42 @@
+import re
+import zlib
+
+import numpy as np
+
+from domain_classifier import BANKING_EXAMPLES, DomainClassifier
+
+
+class WordVectorEncoder:
+    """Stand-in for MiniLM: a text's vector is the sum of a fixed random vector per word."""
+
+    def __init__(self, dim=128):
+        self.dim = dim
+
+    def word_vector(self, word):
+        return np.random.default_rng(zlib.crc32(word.encode())).normal(size=self.dim)
+
+    def encode(self, texts):
+        return np.array([
+            sum((self.word_vector(w) for w in re.findall(r"[a-z]+", text.lower())), np.zeros(self.dim))
+            for text in texts
+        ], dtype=np.float32)
+
+
+def test_refuses_off_topic_and_accepts_banking():
+    encoder = WordVectorEncoder()
+    classifier = DomainClassifier(encoder)
+    banking, off_topic = encoder.encode(["How do I block my stolen debit card?", "Tell me a joke about a dragon"])
+    assert classifier.is_banking(banking)
+    assert not classifier.is_banking(off_topic)
+
+
+def test_calibrated_threshold_keeps_banking_recall():
+    encoder = WordVectorEncoder()
+    classifier = DomainClassifier(encoder, recall=0.95)
+    accepted = [classifier.is_banking(v) for v in encoder.encode(BANKING_EXAMPLES)]
+    assert np.mean(accepted) >= 0.95
+
+
+def test_fixed_threshold_skips_calibration():
+    classifier = DomainClassifier(WordVectorEncoder(), threshold="0.25")
+    assert classifier.threshold == 0.25
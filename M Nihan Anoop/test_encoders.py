@@ -0,0 +1,28 @@
+import numpy as np
+
+from encoders import QuantizedVectors
+
+
+def unit_vectors(rows, dim=384, seed=0):
+    vectors = np.random.default_rng(seed).normal(size=(rows, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_quantized_search_matches_float32():
+    vectors = unit_vectors(200)
+    ids = [f"doc{i}" for i in range(200)]
+    exact = QuantizedVectors(ids, vectors, "float32")
+    for dtype in ("float16", "int8"):
+        quantized = QuantizedVectors(ids, vectors, dtype)
+        for row in (0, 57, 199):
+            assert quantized.search(vectors[row], 1) == exact.search(vectors[row], 1) == [ids[row]]
+
+
+def test_int8_storage_is_a_quarter_of_float32():
+    vectors = unit_vectors(100)
+    ids = list(range(100))
+    assert QuantizedVectors(ids, vectors, "int8").nbytes < QuantizedVectors(ids, vectors, "float32").nbytes / 3
+
+
+def test_search_on_empty_store():
+    assert QuantizedVectors([], np.zeros((0, 384)), "int8").search(np.ones(384), 3) == []
@@ -0,0 +1,37 @@
+from hybrid_retriever import BM25Index, reciprocal_rank_fusion, tokenize
+
+DOCS = {
+    "neft": "NEFT transfers settle in half-hourly batches through the RBI.",
+    "rtgs": "RTGS is meant for large value transfers settled in real time.",
+    "form15g": "Submit Form 15G to avoid TDS on fixed deposit interest.",
+    "atm": "The daily ATM withdrawal limit depends on your debit card variant.",
+}
+
+
+def build_index():
+    return BM25Index().build(DOCS.keys(), DOCS.values())
+
+
+def test_tokenize_keeps_codes():
+    assert tokenize("Form 15G, NEFT/RTGS!") == ["form", "15g", "neft", "rtgs"]
+
+
+def test_bm25_finds_exact_terms():
+    index = build_index()
+    assert index.search("what is neft", 1)[0][0] == "neft"
+    assert index.search("form 15g", 1)[0][0] == "form15g"
+
+
+def test_bm25_ignores_unknown_terms():
+    assert build_index().search("cryptocurrency") == []
+
+
+def test_rrf_rewards_agreement():
+    fused = reciprocal_rank_fusion([["a", "b", "d"], ["c", "b", "e"]])
+    assert fused[0] == "b"
+    assert set(fused) == {"a", "b", "c", "d", "e"}
+
+
+def test_rrf_ties_follow_first_ranking():
+    assert reciprocal_rank_fusion([["a", "b"], ["b", "a"]]) == ["a", "b"]
+    assert reciprocal_rank_fusion([["x"], ["y"]], n_results=1) == ["x"]
@@ -0,0 +1,81 @@
+import json
+import threading
+import time
+
+import llm_engine
+from llm_engine import LLMEngine
+from llm_gateway import PRIORITY_ANSWER, PRIORITY_SPECULATIVE, LLMGateway
+
+
+class FakeStream:
+    """A streamed /api/chat response that runs `before_chunk(n)` before yielding chunk n."""
+
+    def __init__(self, words, before_chunk=lambda n: None):
+        self.words = words
+        self.before_chunk = before_chunk
+        self.sent = 0
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.closed = True
+
+    def raise_for_status(self):
+        pass
+
+    def iter_lines(self):
+        for word in self.words:
+            self.before_chunk(self.sent)
+            self.sent += 1
+            yield json.dumps({"message": {"content": word}, "done": False}).encode()
+        yield json.dumps({"message": {"content": ""}, "done": True, "prompt_eval_count": 10}).encode()
+
+
+def engine_streaming(monkeypatch, stream):
+    monkeypatch.setattr(llm_engine.requests, "post", lambda url, json, timeout, stream=False: fake)
+    fake = stream
+    return LLMEngine(model="llama3.2:latest", registry=object())
+
+
+WORDS = ["Fixed ", "deposits ", "earn ", "interest."]
+
+
+def test_speculative_answer_is_streamed_to_the_end(monkeypatch):
+    engine = engine_streaming(monkeypatch, FakeStream(WORDS))
+    answer = engine.query_ollama("Interest rates?", [], priority=PRIORITY_SPECULATIVE, cancelled=threading.Event())
+    assert answer == "Fixed deposits earn interest."
+
+
+def test_cancelled_speculation_closes_the_stream(monkeypatch):
+    cancelled = threading.Event()
+    stream = FakeStream(WORDS, lambda n: n == 2 and cancelled.set())
+    engine = engine_streaming(monkeypatch, stream)
+
+    assert engine.query_ollama("Interest rates?", [], priority=PRIORITY_SPECULATIVE, cancelled=cancelled) is None
+    assert stream.closed and stream.sent == 3
+
+
+def test_speculation_gives_way_to_a_waiting_request(monkeypatch):
+    gateway = LLMGateway(max_concurrency=1)
+    monkeypatch.setattr(llm_engine, "gateway", gateway)
+    answered = threading.Event()
+
+    def real_request():
+        with gateway.slot(PRIORITY_ANSWER):
+            answered.set()
+
+    def user_asks(n):
+        if n == 1:
+            # The user's question queues behind the speculative generation for the only slot.
+            threading.Thread(target=real_request).start()
+            while not gateway.waiting_ahead_of(PRIORITY_SPECULATIVE):
+                time.sleep(0.001)
+
+    stream = FakeStream(WORDS, user_asks)
+    engine = engine_streaming(monkeypatch, stream)
+
+    assert engine.query_ollama("Interest rates?", [], priority=PRIORITY_SPECULATIVE, cancelled=threading.Event()) is None
+    assert stream.closed and stream.sent == 2
+    assert answered.wait(2)
@@ -0,0 +1,93 @@
+import threading
+import time
+
+from llm_gateway import PRIORITY_ANSWER, PRIORITY_SHORT, GatewayBusy, LLMGateway
+
+
+def run_jobs(gateway, jobs, hold=0.05):
+    """Runs (name, priority) jobs behind one job that holds the only slot; returns start order."""
+    started = []
+
+    def job(name, priority):
+        try:
+            with gateway.slot(priority):
+                started.append(name)
+                time.sleep(hold)
+        except GatewayBusy:
+            started.append(f"{name}:busy")
+
+    blocker = threading.Thread(target=job, args=("blocker", PRIORITY_ANSWER))
+    blocker.start()
+    time.sleep(0.02)
+    threads = []
+    for name, priority in jobs:
+        thread = threading.Thread(target=job, args=(name, priority))
+        thread.start()
+        threads.append(thread)
+        time.sleep(0.01)
+    for thread in [blocker] + threads:
+        thread.join()
+    return started
+
+
+def test_short_requests_jump_the_queue():
+    gateway = LLMGateway(max_concurrency=1, max_wait=5, max_queue=10)
+    started = run_jobs(gateway, [("answer1", PRIORITY_ANSWER), ("answer2", PRIORITY_ANSWER), ("title", PRIORITY_SHORT)])
+    assert started == ["blocker", "title", "answer1", "answer2"]
+    assert gateway.stats()["completed"] == 4
+
+
+def test_rejects_when_wait_exceeds_slo():
+    gateway = LLMGateway(max_concurrency=1, max_wait=0.05, max_queue=10)
+    started = run_jobs(gateway, [("late", PRIORITY_ANSWER)], hold=0.3)
+    assert started == ["blocker", "late:busy"]
+    assert gateway.stats()["rejected"] == 1
+
+
+def test_rejects_when_queue_full():
+    gateway = LLMGateway(max_concurrency=1, max_wait=5, max_queue=1)
+    started = run_jobs(gateway, [("queued", PRIORITY_ANSWER), ("overflow", PRIORITY_ANSWER)])
+    assert started == ["blocker", "overflow:busy", "queued"]
+
+
+def test_concurrency_limit():
+    gateway = LLMGateway(max_concurrency=2, max_wait=5)
+    peak = []
+    lock = threading.Lock()
+
+    def job():
+        with gateway.slot():
+            with lock:
+                peak.append(gateway.stats()["active"])
+            time.sleep(0.02)
+
+    threads = [threading.Thread(target=job) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert max(peak) == 2
+
+
+def test_idle_only_when_nothing_runs_or_waits():
+    gateway = LLMGateway(max_concurrency=1)
+    assert gateway.idle()
+    with gateway.slot(PRIORITY_ANSWER):
+        assert not gateway.idle()
+    assert gateway.idle()
+
+
+def test_waiting_ahead_of_sees_only_higher_priorities():
+    gateway = LLMGateway(max_concurrency=1)
+
+    def short_request():
+        with gateway.slot(PRIORITY_SHORT):
+            pass
+
+    with gateway.slot(PRIORITY_ANSWER):
+        waiter = threading.Thread(target=short_request)
+        waiter.start()
+        time.sleep(0.02)
+        assert gateway.waiting_ahead_of(PRIORITY_ANSWER)
+        assert not gateway.waiting_ahead_of(PRIORITY_SHORT)
+    waiter.join(1)
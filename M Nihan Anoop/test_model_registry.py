@@ -0,0 +1,128 @@
+import os
+import tempfile
+import threading
+
+import model_registry
+from model_registry import ModelRegistry, parameter_billions
+
+GB = 10 ** 9
+
+TAGS = [
+    {"name": "llama3.1:70b", "digest": "a", "size": 40 * GB, "details": {"parameter_size": "70.6B", "quantization_level": "Q4_0"}},
+    {"name": "llama3.2:latest", "digest": "b", "size": 2 * GB, "details": {"parameter_size": "3.2B", "quantization_level": "Q4_K_M"}},
+    {"name": "mistral:latest", "digest": "c", "size": 4 * GB, "details": {"parameter_size": "7.2B", "quantization_level": "Q4_0"}},
+    {"name": "qwen2.5:1.5b", "digest": "d", "size": 1 * GB, "details": {}},
+    {"name": "nomic-embed-text:latest", "digest": "e", "size": GB // 4, "details": {"family": "nomic-bert", "parameter_size": "137M"}},
+]
+SPEEDS = {"llama3.2:latest": 40.0, "mistral:latest": 25.0, "qwen2.5:1.5b": 70.0, "llama3.1:70b": 3.0}
+
+
+class FakeRegistry(ModelRegistry):
+    def __init__(self, path, tags=TAGS, speeds=SPEEDS, loaded=None, **kwargs):
+        self.fake_tags = tags
+        self.speeds = speeds
+        self.loaded = loaded or {}
+        self.tag_calls = 0
+        self.measured = []
+        super().__init__(path=path, **kwargs)
+
+    def fetch_tags(self):
+        self.tag_calls += 1
+        return self.fake_tags
+
+    def loaded_models(self):
+        return self.loaded
+
+    def measure(self, name, loaded=()):
+        self.measured.append(name)
+        return self.speeds[name]
+
+
+def registry_path():
+    return os.path.join(tempfile.mkdtemp(), "model_registry.json")
+
+
+def test_parameter_billions_from_details_or_tag():
+    assert parameter_billions(TAGS[1]) == 3.2
+    assert parameter_billions(TAGS[3]) == 1.5
+    assert parameter_billions(TAGS[4]) == 0.137
+
+
+def test_selects_fastest_model_meeting_tier():
+    registry = FakeRegistry(registry_path(), tier="standard")
+    assert registry.select() == "llama3.2:latest"
+    # Too small, an embedding model, and one too large to load are never calibrated.
+    assert sorted(registry.measured) == ["llama3.2:latest", "mistral:latest"]
+    assert registry.describe("mistral:latest")["quantization"] == "Q4_0"
+
+
+def test_selection_persists_without_recalibrating():
+    path = registry_path()
+    FakeRegistry(path, tier="high").select()
+    restarted = FakeRegistry(path, tier="high")
+    assert restarted.select() == "mistral:latest"
+    assert restarted.measured == []
+
+
+def test_repulled_model_is_recalibrated():
+    path = registry_path()
+    FakeRegistry(path).select()
+    repulled = [dict(m, digest="new") if m["name"] == "llama3.2:latest" else m for m in TAGS]
+    restarted = FakeRegistry(path, tags=repulled)
+    assert restarted.select() == "llama3.2:latest"
+    assert restarted.measured == ["llama3.2:latest"]
+
+
+def test_tags_are_cached_for_ttl():
+    registry = FakeRegistry(registry_path(), tags_ttl=60)
+    registry.tags()
+    registry.tags()
+    assert registry.tag_calls == 1
+    registry.tags(refresh=True)
+    assert registry.tag_calls == 2
+
+
+def test_background_selection_answers_with_smallest_model_until_calibrated():
+    selected = threading.Event()
+    registry = FakeRegistry(registry_path(), speeds=dict(SPEEDS, **{"mistral:latest": 90.0}))
+    choices = []
+    assert registry.select_in_background(lambda name: (choices.append(name), selected.set())) == "llama3.2:latest"
+    assert selected.wait(2)
+    assert choices == ["mistral:latest"]
+
+    # After a restart the calibrated choice is used straight away.
+    restarted = FakeRegistry(registry.path)
+    assert restarted.select_in_background(choices.append) == "mistral:latest"
+    assert restarted.measured == []
+
+
+class FakeResponse:
+    def __init__(self, body):
+        self.body = body
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.body
+
+
+def test_calibration_only_unloads_models_it_loaded(monkeypatch):
+    sent = []
+    monkeypatch.setattr(model_registry.requests, "post", lambda url, json, timeout: sent.append(json) or FakeResponse(
+        {"eval_count": 48, "eval_duration": 10 ** 9}))
+
+    registry = ModelRegistry(path=registry_path())
+    loaded = {"llama3.2:latest": 2 * GB}
+    assert registry.measure("llama3.2:latest", loaded) == 48.0
+    assert registry.measure("mistral:latest", loaded) == 48.0
+    assert "keep_alive" not in sent[0]
+    assert sent[1]["keep_alive"] == 0
+
+
+def test_models_that_would_evict_the_serving_model_are_not_calibrated():
+    # 5 GB budget with the 2 GB serving model resident: mistral (4 GB) would push it out.
+    registry = FakeRegistry(registry_path(), tier="standard", memory_gb=5, loaded={"llama3.2:latest": 2 * GB})
+    assert registry.select() == "llama3.2:latest"
+    assert registry.measured == ["llama3.2:latest"]
+    assert registry.describe("mistral:latest") == {}
@@ -0,0 +1,59 @@
+import time
+
+import pytest
+import requests
+
+from ollama_health import CLOSED, HALF_OPEN, OPEN, CircuitOpen, OllamaHealth
+
+
+def fail(health, error=None):
+    with pytest.raises(requests.RequestException):
+        with health.call():
+            raise error or requests.ConnectionError("connection refused")
+
+
+def not_found():
+    response = requests.Response()
+    response.status_code = 404
+    return requests.HTTPError("model not found", response=response)
+
+
+def test_opens_after_threshold_and_fails_fast():
+    health = OllamaHealth(failure_threshold=3, open_seconds=60)
+    fail(health)
+    fail(health)
+    assert health.state == CLOSED
+    fail(health)
+    assert health.state == OPEN and not health.online
+
+    started = time.perf_counter()
+    with pytest.raises(CircuitOpen):
+        with health.call():
+            raise AssertionError("Ollama must not be called while the breaker is open")
+    assert time.perf_counter() - started < 0.05
+    assert health.fast_failed == 1
+
+
+def test_half_open_trial_closes_or_reopens():
+    health = OllamaHealth(failure_threshold=1, open_seconds=0.05)
+    fail(health)
+    time.sleep(0.06)
+    fail(health)  # the half-open trial fails: open again right away
+    assert health.state == OPEN
+
+    time.sleep(0.06)
+    with health.call():
+        assert health.state == HALF_OPEN
+        # Only one trial at a time
+        with pytest.raises(CircuitOpen):
+            with health.call():
+                pass
+    assert health.state == CLOSED and health.failures == 0
+
+
+def test_client_errors_and_success_reset_the_count():
+    health = OllamaHealth(failure_threshold=2)
+    fail(health)
+    fail(health, not_found())  # Ollama answered; not an outage
+    fail(health)
+    assert health.state == CLOSED
@@ -0,0 +1,35 @@
+import ast
+import os
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+SHARED = ["chat_window.py", "llm_gateway.py", "model_warmer.py", "ollama_health.py", "tracing.py"]
+COPIES = ["Ankesh Maurya", "Hariprasad R S"]
+TYPED_PORT = "Reja Fathima"
+
+
+def read(folder, name):
+    with open(os.path.join(ROOT, folder, name), "rb") as f:
+        return f.read()
+
+
+def public_api(source):
+    """Top-level public functions and classes; constants differ since the typed port reads config.settings."""
+    tree = ast.parse(source)
+    return {node.name for node in tree.body
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))
+            and not node.name.startswith("_")}
+
+
+@pytest.mark.parametrize("folder", COPIES)
+@pytest.mark.parametrize("name", SHARED)
+def test_copies_match_the_original(name, folder):
+    assert read(folder, name) == read(os.path.basename(HERE), name), f"{folder}/{name} has drifted"
+
+
+@pytest.mark.parametrize("name", SHARED)
+def test_typed_port_keeps_the_public_api(name):
+    missing = public_api(read(os.path.basename(HERE), name)) - public_api(read(TYPED_PORT, name))
+    assert not missing, f"{TYPED_PORT}/{name} lacks {sorted(missing)}"
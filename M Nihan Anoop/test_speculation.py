@@ -0,0 +1,77 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from speculation import Speculation
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+class SlowJob:
+    """Retrieves instantly, then 'generates' until released or cancelled."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.generated = []
+
+    def __call__(self, question, cancelled):
+        context = [f"doc for {question}"]
+        while not self.release.is_set():
+            if cancelled.wait(0.01):
+                return {"context": context}
+        self.generated.append(question)
+        return {"context": context, "answer": f"answer to {question}"}
+
+
+def test_finished_results_are_served_until_they_expire():
+    job = SlowJob()
+    job.release.set()
+    speculation = Speculation(job, ttl=0.2, pool=ThreadPoolExecutor(max_workers=2))
+    speculation.start(["Interest rates?", "Contact support"])
+    assert wait_until(lambda: speculation.pending() == 0)
+
+    assert speculation.take("interest rates")["answer"] == "answer to Interest rates?"
+    assert speculation.take("Interest rates?")["answer"] == "answer to Interest rates?"
+    assert speculation.take("How do I open an account?") is None
+
+    time.sleep(0.25)
+    assert speculation.take("Contact support") is None
+
+
+def test_cancel_stops_unfinished_work_only():
+    job = SlowJob()
+    speculation = Speculation(job, pool=ThreadPoolExecutor(max_workers=1))
+    job.release.set()
+    speculation.start(["Interest rates?"])
+    assert wait_until(lambda: speculation.pending() == 0)
+
+    job.release.clear()
+    speculation.start(["Contact support", "How do I open an account?"])
+    speculation.cancel()
+    job.release.set()
+    time.sleep(0.1)
+
+    assert job.generated == ["Interest rates?"]
+    assert speculation.take("Interest rates?") is not None
+    assert speculation.take("Contact support") is None
+
+
+def test_asking_before_it_finishes_falls_back():
+    job = SlowJob()
+    speculation = Speculation(job, pool=ThreadPoolExecutor(max_workers=1))
+    speculation.start(["Interest rates?"])
+    assert speculation.take("Interest rates?") is None
+    job.release.set()
+    time.sleep(0.1)
+    assert job.generated == []
+
+
+def test_off_mode_does_nothing():
+    speculation = Speculation(SlowJob(), mode="off")
+    speculation.start(["Interest rates?"])
+    assert speculation.pending() == 0 and speculation.take("Interest rates?") is None
@@ -0,0 +1,54 @@
+import threading
+import time
+
+from title_jobs import TitleJobs, fast_title
+
+
+def wait_for(jobs, job_id, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        finished = jobs.collect([job_id])
+        if finished:
+            return finished[job_id]
+        time.sleep(0.01)
+    return None
+
+
+def test_returns_fast_title_without_waiting():
+    release = threading.Event()
+
+    def slow_generate(question):
+        release.wait(2)
+        return "Card Blocking"
+
+    jobs = TitleJobs(slow_generate)
+    question = "How do I block my lost debit card right away?"
+    assert jobs.request("chat-1", question) == fast_title(question)
+    assert jobs.pending(["chat-1"])
+    release.set()
+    assert wait_for(jobs, "chat-1") == "Card Blocking"
+    assert not jobs.pending(["chat-1"])
+
+
+def test_similar_questions_reuse_cached_title():
+    calls = []
+    jobs = TitleJobs(lambda question: calls.append(question) or "NEFT Timings")
+    jobs.request("chat-1", "What are the NEFT timings?")
+    assert wait_for(jobs, "chat-1") == "NEFT Timings"
+    assert jobs.request("chat-2", "what are the neft timings") == "NEFT Timings"
+    assert jobs.request("chat-3", "What are the NEFT timing?") == "NEFT Timings"
+    assert len(calls) == 1
+
+
+def test_failed_generation_finishes_with_fast_title():
+    def broken_generate(question):
+        raise RuntimeError("Ollama is down")
+
+    for generate in (lambda question: None, broken_generate):
+        jobs = TitleJobs(generate)
+        question = "What is the interest rate on a home loan?"
+        jobs.request("chat-1", question)
+        assert wait_for(jobs, "chat-1") == fast_title(question)
+        assert not jobs.pending(["chat-1"])
+        # The fallback isn't cached, so the next chat asks for a real title again.
+        assert jobs.cached(question) is None
@@ -0,0 +1,56 @@
+import json
+import os
+import tempfile
+
+import tracing
+from tracing import Metrics, TraceWriter, record_ollama, request_trace, span
+
+
+def traced_request(path):
+    previous = tracing.trace_writer
+    tracing.trace_writer = TraceWriter(path, max_bytes=10 ** 6)
+    try:
+        with request_trace("chat", model="llama3.2"):
+            with span("retrieval"):
+                pass
+            record_ollama({
+                "model": "llama3.2", "load_duration": 0,
+                "prompt_eval_count": 120, "prompt_eval_duration": 40_000_000,
+                "eval_count": 50, "eval_duration": 1_000_000_000,
+            })
+    finally:
+        tracing.trace_writer = previous
+
+
+def test_trace_is_written_as_one_json_line():
+    path = os.path.join(tempfile.mkdtemp(), "traces.jsonl")
+    traced_request(path)
+    with open(path) as f:
+        lines = f.readlines()
+    assert len(lines) == 1
+    record = json.loads(lines[0])
+    assert record["status"] == "ok"
+    assert [s["name"] for s in record["spans"]] == ["retrieval", "prefill", "decode", "time_to_first_token"]
+    assert record["attrs"]["generated_tokens"] == 50
+    assert record["attrs"]["decode_tokens_per_s"] == 50.0
+
+
+def test_trace_file_rolls_over():
+    path = os.path.join(tempfile.mkdtemp(), "traces.jsonl")
+    writer = TraceWriter(path, max_bytes=100)
+    for i in range(5):
+        writer.write({"i": i, "padding": "x" * 40})
+    assert os.path.exists(f"{path}.1")
+    assert os.path.getsize(path) <= 100
+
+
+def test_prometheus_histogram_is_cumulative():
+    metrics = Metrics()
+    metrics.observe_span("retrieval", 0.02)
+    metrics.observe_span("retrieval", 3.0)
+    metrics.inc("ollama_tokens_total", 7, phase="prompt")
+    text = metrics.render()
+    assert 'bankbot_span_seconds_bucket{span="retrieval",le="0.025"} 1' in text
+    assert 'bankbot_span_seconds_bucket{span="retrieval",le="5"} 2' in text
+    assert 'bankbot_span_seconds_count{span="retrieval"} 2' in text
+    assert 'bankbot_ollama_tokens_total{phase="prompt"} 7' in text
@@ -0,0 +1,28 @@
+import os
+
+from ui_styles import get_custom_css, style_tags
+
+
+def test_stylesheet_has_no_remote_imports():
+    css = get_custom_css()
+    assert css.startswith("<style>")
+    assert "@import" not in css
+    assert "fonts.googleapis.com" not in css
+
+
+def test_static_serving_links_versioned_file():
+    tag = style_tags(True)
+    assert tag.startswith('<link rel="stylesheet" href="app/static/style.css?v=')
+    assert len(tag) < 200
+    assert style_tags(True) is tag
+
+
+def test_inline_fallback_is_the_stylesheet():
+    assert style_tags(False) == get_custom_css()
+
+
+def test_app_config_turns_on_static_serving():
+    config = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".streamlit", "config.toml")
+    with open(config, encoding="utf-8") as f:
+        lines = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    assert lines[lines.index("[server]") + 1:].count("enableStaticServing = true") == 1
@@ -0,0 +1,98 @@
+import logging
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from difflib import get_close_matches
+
+# First questions this close (difflib ratio on the normalized text) share a title.
+SIMILARITY_CUTOFF = 0.9
+
+
+def fast_title(text, limit=30):
+    """Instant placeholder title: the question, truncated."""
+    text = " ".join(text.split())
+    return (text[:limit] + '...') if len(text) > limit else text
+
+
+def normalize_question(text):
+    return " ".join(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+class TitleJobs:
+    """Generates chat titles off the request path and caches them by first question.
+
+    `request()` returns a title straight away: a cached one if this (or a very
+    similar) question was titled before, otherwise `fast_title` while the LLM
+    title is generated in the background. Finished titles are picked up with
+    `collect()` on a later rerun; a job whose generation failed finishes with
+    the `fast_title`, so callers polling `pending()` always see it end.
+    Shared by every session in the process.
+    """
+
+    MAX_UNCOLLECTED = 256
+
+    def __init__(self, generate, max_workers=1, cache_size=512, cutoff=SIMILARITY_CUTOFF):
+        self.generate = generate  # question -> title, or None on failure
+        self.cutoff = cutoff
+        self.cache_size = cache_size
+        self._cache = OrderedDict()  # normalized question -> title
+        self._pending = {}  # job id -> Future
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="titles")
+
+    def cached(self, question):
+        key = normalize_question(question)
+        with self._lock:
+            if key not in self._cache:
+                close = get_close_matches(key, list(self._cache), n=1, cutoff=self.cutoff)
+                if not close:
+                    return None
+                key = close[0]
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+    def _remember(self, question, title):
+        with self._lock:
+            self._cache[normalize_question(question)] = title
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _run(self, question):
+        try:
+            title = self.generate(question)
+        except Exception as e:
+            logging.warning(f"Title generation failed: {e}")
+            title = None
+        if not title:
+            # Not cached, so the next chat starting with this question tries again.
+            return fast_title(question)
+        self._remember(question, title)
+        return title
+
+    def request(self, job_id, question):
+        title = self.cached(question)
+        if title:
+            return title
+        with self._lock:
+            if len(self._pending) > self.MAX_UNCOLLECTED:
+                # Sessions that ended never collect; their titles are in the cache anyway.
+                self._pending = {k: f for k, f in self._pending.items() if not f.done()}
+            if job_id not in self._pending:
+                self._pending[job_id] = self._pool.submit(self._run, question)
+        return fast_title(question)
+
+    def pending(self, job_ids):
+        with self._lock:
+            return any(job_id in self._pending for job_id in job_ids)
+
+    def collect(self, job_ids):
+        """Finished titles for these job ids, as {job id: title}. Failed jobs come back with their fast title."""
+        finished = {}
+        with self._lock:
+            for job_id in job_ids:
+                future = self._pending.get(job_id)
+                if future is not None and future.done():
+                    del self._pending[job_id]
+                    finished[job_id] = future.result()
+        return finished
@@ -1,29 +1,28 @@
 import os
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
+from streamlit.errors import StreamlitAPIException
 from datetime import datetime
 import time
 import uuid
 import requests
 import json
+import re
 from typing import Generator, Optional
+# pandas and plotly are imported inside the dashboard functions that use them,
+# so drawing the login screen on a fresh worker doesn't load them
 
 # ============================================================================
 # BANKING KNOWLEDGE BASE & RESTRICTIONS
 # ============================================================================
 
-BANK_KB = """
-SECUREBANK OFFICIAL POLICIES:
-1. SAVINGS INTEREST: 4.5% p.a., credited quarterly.
-2. HOME LOANS: Starting at 8.75% p.a. for amounts > 50 Lakhs.
-3. CREDIT CARDS: 'Platinum' (Rs. 1000/yr fee) and 'Gold' (Free for life).
-4. BRANCH HOURS: Mon-Sat, 9:30 AM - 4:00 PM. Closed on 2nd/4th Saturdays.
-5. UPI LIMITS: Rs. 1,00,000 per day.
-6. SUPPORT: Call 1800-123-4567 or email support@securebank.com.
-7. FIXED DEPOSITS: 6.5% for 1 year, 7.2% for 3 years (Senior citizens +0.5%).
-"""
+from chat_window import StreamRenderer, message_html, render_window
+from llm_gateway import BUSY_MESSAGE, PRIORITY_ANSWER, PRIORITY_SHORT, GatewayBusy, gateway
+from model_warmer import ModelWarmer
+from ollama_health import UNAVAILABLE_MESSAGE, CircuitOpen, OllamaHealth, health
+from title_jobs import TitleJobs
+from rerun_profiler import finish_rerun, is_admin, profiled, profiled_fragment, render_panel, section, start_rerun
+from tracing import current_trace, metrics, record_ollama, request_trace, span, start_metrics_server, traced
+from prompts import OLLAMA_OPTIONS, build_strict_banking_prompt, prefill_stats
 
 RESTRICTED_TOPICS = {
     'technology': ['coding', 'programming', 'python', 'javascript', 'html', 'css', 'software', 'computer', 'algorithm', 'debug'],
@@ -66,22 +65,43 @@ input_validator = InputValidator()
 OLLAMA_URL = settings.OLLAMA_URL
 OLLAMA_MODEL = settings.OLLAMA_MODEL
 OLLAMA_TIMEOUT = settings.OLLAMA_TIMEOUT
+OLLAMA_KEEP_ALIVE = settings.OLLAMA_KEEP_ALIVE
+TITLE_MODEL = settings.TITLE_MODEL
+TITLE_NUM_PREDICT = settings.TITLE_NUM_PREDICT
+CHAT_PAGE_SIZE = settings.CHAT_PAGE_SIZE
+STREAM_FLUSH_MS = settings.STREAM_FLUSH_MS
+STREAM_FLUSH_CHARS = settings.STREAM_FLUSH_CHARS
 USE_OLLAMA = True
 DB_FILE = settings.DATABASE_FILE
 
+@st.cache_resource
+def get_model_warmer():
+    """One warmer per server process, shared by every session"""
+    return ModelWarmer(OLLAMA_MODEL).start()
+
+@st.cache_resource
+def get_ollama_health() -> OllamaHealth:
+    """One circuit breaker per server process, probed in the background and shared by every session"""
+    return health.start()
+
+@st.cache_resource
+def get_metrics_server():
+    """Prometheus /metrics endpoint for the latency spans (settings.METRICS_PORT)"""
+    return start_metrics_server()
+
 # ============================================================================
 # HELPER FUNCTIONS
 # ============================================================================
 
-def safe_rerun():
+def safe_rerun(scope: str = "app"):
+    """Reruns the app, or with scope="fragment" only the fragment this is called from"""
     try:
-        st.experimental_rerun()
-    except Exception:
-        try:
-            st.rerun()
-        except Exception:
-            st.stop()
+        st.rerun(scope=scope)
+    except StreamlitAPIException:
+        # Fragment-scoped reruns aren't allowed while the fragment runs as part of a full-app rerun
+        st.rerun()
 
+@profiled("load_data")
 def load_data():
     """Load database and ensure passwords are hashed"""
     if os.path.exists(DB_FILE):
@@ -158,6 +178,7 @@ def load_data():
         }
     }
 
+@profiled("save_data")
 def save_data():
     with open(DB_FILE, 'w') as f:
         json.dump(st.session_state.db, f, indent=4)
@@ -166,6 +187,8 @@ def save_data():
 # VALIDATION FUNCTIONS
 # ============================================================================
 
+@traced("guardrail")
+@profiled("guardrail")
 def is_banking_query(prompt: str) -> tuple[bool, str]:
     """
     Validates if a query is banking-related.
@@ -200,99 +223,125 @@ def is_banking_query(prompt: str) -> tuple[bool, str]:
     
     return True, "valid banking query"
 
+# Phrases that show a reply has left banking (code, recipes, history, stories)
+OFF_TOPIC_INDICATORS = [
+    'here is a python script',
+    'here\'s some code',
+    'def ', 'function(',
+    'import ',
+    'recipe for',
+    'ingredients:',
+    'world war',
+    'the capital of',
+    'once upon a time'
+]
+BANKING_TERMS = ['account', 'balance', 'transaction', 'transfer', 'bank', 'credit', 'debit', 'loan', 'deposit']
+# A complete reply this long without a single banking term is treated as off-topic
+MAX_UNGROUNDED_CHARS = 800
+REFUSAL_MESSAGE = "I apologize, but I can only assist with banking and financial queries."
+
+OFF_TOPIC_PATTERN = re.compile("|".join(re.escape(p) for p in OFF_TOPIC_INDICATORS), re.IGNORECASE)
+BANKING_TERM_PATTERN = re.compile("|".join(re.escape(t) for t in BANKING_TERMS), re.IGNORECASE)
+
+
+class StreamGuard:
+    """Checks a reply as it is generated, so an off-topic answer can be cut off early.
+
+    Only an explicit off-topic phrase stops the stream. Whether the reply mentions
+    banking at all is judged by `finish` on the complete text, since a valid
+    answer may take a while to get to its first banking term. Each `feed` only
+    scans the new text plus enough of the previous text to catch a phrase split
+    across chunks.
+    """
+    OFF_TOPIC_OVERLAP = max(len(p) for p in OFF_TOPIC_INDICATORS) - 1
+    BANKING_OVERLAP = max(len(t) for t in BANKING_TERMS) - 1
+
+    def __init__(self):
+        self.text = ""
+        self.has_banking_term = False
+        self.violation: Optional[str] = None
+
+    def feed(self, chunk: str) -> bool:
+        """Adds a chunk; False once the reply contains an off-topic phrase (see `violation`)"""
+        scanned = len(self.text)
+        self.text += chunk
+        match = OFF_TOPIC_PATTERN.search(self.text, max(0, scanned - self.OFF_TOPIC_OVERLAP))
+        if match:
+            self.violation = match.group(0).lower()
+        elif not self.has_banking_term:
+            self.has_banking_term = bool(BANKING_TERM_PATTERN.search(self.text, max(0, scanned - self.BANKING_OVERLAP)))
+        return self.violation is None
+
+    def finish(self) -> bool:
+        """Checks the complete reply; False if it is long yet never mentions banking"""
+        if self.violation is None and not self.has_banking_term and len(self.text) > MAX_UNGROUNDED_CHARS:
+            self.violation = "no banking terms"
+        return self.violation is None
+
+
+@traced("output_check")
 def validate_ollama_response(response: str, original_query: str) -> str:
     """
     Post-validation: Check if Ollama's response stayed on-topic.
     Returns: cleaned response or refusal message
     """
-    response_lower = response.lower()
-    
-    # Check if response contains non-banking content indicators
-    off_topic_indicators = [
-        'here is a python script',
-        'here\'s some code',
-        'def ', 'function(',
-        'import ',
-        'recipe for',
-        'ingredients:',
-        'world war',
-        'the capital of',
-        'once upon a time'
-    ]
-    
-    if any(indicator in response_lower for indicator in off_topic_indicators):
-        return "I apologize, but I can only assist with banking and financial queries."
-    
-    # If response is suspiciously generic/long and doesn't mention banking terms
-    banking_terms = ['account', 'balance', 'transaction', 'transfer', 'bank', 'credit', 'debit', 'loan', 'deposit']
-    has_banking_term = any(term in response_lower for term in banking_terms)
-    
-    if len(response) > 800 and not has_banking_term:
-        return "I apologize, but I can only assist with banking and financial queries."
-    
-    return response
+    guard = StreamGuard()
+    return response if guard.feed(response) and guard.finish() else REFUSAL_MESSAGE
 
 # ============================================================================
 # OLLAMA FUNCTIONS
 # ============================================================================
 
+@traced("prompt_build")
 def get_strict_banking_prompt(user_id, user_query):
     """Generate strict banking-only prompt for Ollama"""
-    user = st.session_state.db[user_id]
-    recent = "\n".join([f"- {t['date']}: {t['desc']} ({t['cat']}) | Amount: Rs. {t['amt']}" 
-                       for t in user['transactions'][:5]])
-    
-    return f"""You are a STRICTLY REGULATED banking assistant for SecureBank. You MUST follow these rules:
-
-CRITICAL RULES:
-1. ONLY answer questions about: account balances, transactions, transfers, loans, credit cards, banking policies, and financial services
-2. If asked about ANYTHING else (coding, history, weather, jokes, general knowledge, recipes, travel), respond EXACTLY with: "I apologize, but I can only assist with banking and financial queries."
-3. Do NOT provide any information outside banking/finance domain
-4. Do NOT explain why you can't answer non-banking questions
-5. Keep responses concise and professional
-
-BANK POLICIES (Official Information):
-{BANK_KB}
-
-USER DATA (Confidential):
-- Name: {user['name']}
-- Balance: Rs. {user['balance']:,.2f}
-- Account Type: {user['type']}
-- Credit Score: {user['credit_score']}
-- Recent Transactions:
-{recent}
-
-USER QUESTION: {user_query}
+    return build_strict_banking_prompt(st.session_state.db[user_id], user_query)
 
-YOUR RESPONSE (banking-only, max 300 words):"""
-
-def call_ollama_stream(prompt):
-    """Stream response from Ollama"""
+def call_ollama_stream(prompt, guard: Optional[StreamGuard] = None):
+    """Stream response from Ollama, stopping early if `guard` rejects the reply"""
     try:
         payload = {
             "model": OLLAMA_MODEL, 
             "prompt": prompt, 
             "stream": True,
-            "options": {
-                "temperature": 0.1,
-                "top_p": 0.9,
-                "top_k": 40
-            }
+            "keep_alive": OLLAMA_KEEP_ALIVE,
+            "options": OLLAMA_OPTIONS
         }
-        with requests.post(
-            f"{OLLAMA_URL.rstrip('/')}/api/generate", 
-            json=payload, 
-            stream=True, 
-            timeout=OLLAMA_TIMEOUT
-        ) as resp:
-            resp.raise_for_status()
-            for line in resp.iter_lines():
-                if line:
-                    obj = json.loads(line.decode("utf-8"))
-                    if obj.get("done"): 
-                        break
-                    if obj.get("response"): 
-                        yield obj.get("response")
+        # The breaker is checked before queueing, so an outage fails fast instead of timing out.
+        # The slot is held until the stream finishes, since Ollama is generating all that time
+        with health.call(), gateway.slot(PRIORITY_ANSWER), span("generation"):
+            sent = time.perf_counter()
+            first_token = None
+            with requests.post(
+                f"{OLLAMA_URL.rstrip('/')}/api/generate", 
+                json=payload, 
+                stream=True, 
+                timeout=OLLAMA_TIMEOUT
+            ) as resp:
+                resp.raise_for_status()
+                for line in resp.iter_lines():
+                    if line:
+                        obj = json.loads(line.decode("utf-8"))
+                        if obj.get("done"): 
+                            prefill_stats.record(obj)
+                            record_ollama(obj, first_token)
+                            break
+                        if obj.get("response"): 
+                            if first_token is None:
+                                first_token = time.perf_counter() - sent
+                            if guard is not None and not guard.feed(obj["response"]):
+                                # Leaving the with-blocks closes the connection, which stops
+                                # Ollama generating, and frees the gateway slot
+                                metrics.inc("stream_guard_aborts_total", reason=guard.violation)
+                                trace = current_trace()
+                                if trace is not None:
+                                    trace.attrs.update(aborted=guard.violation, aborted_after_chars=len(guard.text))
+                                return
+                            yield obj.get("response")
+    except CircuitOpen:
+        yield UNAVAILABLE_MESSAGE
+    except GatewayBusy:
+        yield BUSY_MESSAGE
     except Exception as e: 
         yield f"[System Error: Unable to connect to AI service]"
 
@@ -300,6 +349,8 @@ def call_ollama_stream(prompt):
 # RULE-BASED RESPONSES
 # ============================================================================
 
+@traced("rule_response")
+@profiled("rule_response")
 def get_bot_response(prompt: str) -> str:
     """Fast rule-based responses for common queries"""
     prompt_lower = prompt.lower()
@@ -323,6 +374,7 @@ def get_bot_response(prompt: str) -> str:
         return msg
     
     elif any(w in prompt_lower for w in ["spend", "expense", "analytics"]):
+        import pandas as pd
         df = pd.DataFrame(user.get('transactions', []))
         debits = df[df['type'] == 'Debit'].copy() if not df.empty else pd.DataFrame()
         total_spent = abs(debits['amt'].sum()) if not debits.empty else 0
@@ -366,17 +418,41 @@ def add_chat_message(role, content):
 
 def generate_fast_title(first_prompt):
     return (first_prompt[:30] + "...") if len(first_prompt) > 30 else first_prompt
-def generate_smart_title(first_prompt):
-    """Slow but smart title generation"""
+def generate_smart_title(first_prompt) -> Optional[str]:
+    """Slow but smart title generation (runs as a background job, see get_title_jobs)"""
     try:
-        if not USE_OLLAMA: return (first_prompt[:25] + "..")
         prompt = f"Summarize this into a 3-4 word title (no quotes): '{first_prompt}'"
-        payload = {"model": OLLAMA_MODEL, "prompt": prompt, "stream": False}
-        resp = requests.post(f"{OLLAMA_URL.rstrip('/')}/api/generate", json=payload, timeout=5)
+        payload = {
+            "model": TITLE_MODEL, "prompt": prompt, "stream": False, "keep_alive": OLLAMA_KEEP_ALIVE,
+            "options": {"num_predict": TITLE_NUM_PREDICT, "temperature": 0.2}
+        }
+        # Titles are short, so they go ahead of queued answers
+        with health.call(), gateway.slot(PRIORITY_SHORT):
+            resp = requests.post(f"{OLLAMA_URL.rstrip('/')}/api/generate", json=payload, timeout=30)
+            if resp.status_code >= 500:
+                resp.raise_for_status()  # counts against the breaker
         if resp.status_code == 200:
-            return resp.json().get("response", "").strip().strip('"')
+            title = resp.json().get("response", "").strip().strip('"').strip()
+            title = title.splitlines()[0] if title else ""
+            return title[:40] or None
     except: pass
-    return (first_prompt[:25] + "..")
+    return None
+
+@st.cache_resource
+def get_title_jobs():
+    """Background title generation shared by every session, cached by first question"""
+    return TitleJobs(generate_smart_title, placeholder=generate_fast_title)
+
+def apply_finished_titles():
+    """Swap in LLM titles that finished since the last run; returns True if any changed"""
+    finished = get_title_jobs().collect([chat['id'] for chat in st.session_state.all_chats])
+    for chat in st.session_state.all_chats:
+        if chat['id'] in finished:
+            chat['title'] = finished[chat['id']]
+    if finished and st.session_state.user_id:
+        st.session_state.db[st.session_state.user_id]['chats'] = st.session_state.all_chats
+        save_data()
+    return bool(finished)
 
 def save_current_chat(title_update=None):
     if not st.session_state.chat_history: return
@@ -385,8 +461,13 @@ def save_current_chat(title_update=None):
     if st.session_state.current_chat_id is None:
         st.session_state.current_chat_id = str(uuid.uuid4())
         first_msg = st.session_state.chat_history[0]['content']
-        # USE FAST TITLE INITIALLY (ZERO DELAY)
-        title = title_update if title_update else generate_fast_title(first_msg)
+        # USE FAST TITLE INITIALLY (ZERO DELAY); the smart title replaces it in the background
+        if title_update:
+            title = title_update
+        elif st.session_state.get("ollama_toggle", USE_OLLAMA):
+            title = get_title_jobs().request(st.session_state.current_chat_id, first_msg)
+        else:
+            title = generate_fast_title(first_msg)
         
         st.session_state.all_chats.insert(0, {
             'id': st.session_state.current_chat_id, 'title': title,
@@ -413,6 +494,34 @@ def load_chat(chat_id):
             st.session_state.current_chat_id = chat_id
             return
 
+@profiled("chat_list")
+def chat_list():
+    if apply_finished_titles():
+        safe_rerun(scope="fragment")
+
+    if st.session_state.all_chats:
+        for i, chat in enumerate(st.session_state.all_chats):
+            label = f"🟢 {chat['title']}" if chat['id'] == st.session_state.current_chat_id else chat['title']
+            
+            c_btn, c_del = st.columns([4, 1])
+            with c_btn:
+                st.button(label, key=f"load_{chat['id']}_{i}", use_container_width=True,
+                          on_click=open_chat, args=(chat['id'],))
+            with c_del:
+                st.button("🗑️", key=f"del_{chat['id']}_{i}", on_click=remove_chat, args=(chat['id'],))
+    else:
+        st.caption("No history.")
+
+# Button callbacks: this list is a fragment nested in the assistant tab, which
+# has to redraw too, so they rerun the "assistant" fragment rather than the app
+def open_chat(chat_id):
+    load_chat(chat_id)
+    st.rerun("assistant")
+
+def remove_chat(chat_id):
+    delete_chat(chat_id)
+    st.rerun("assistant")
+
 def start_new_chat():
     st.session_state.chat_history = []
     st.session_state.current_chat_id = None
@@ -469,8 +578,10 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="expanded"
 )
+# Opt-in (settings.PROFILE_MODE); times the sections below and the backend calls marked @profiled
+start_rerun()
 
-st.markdown("""
+APP_CSS = """
 <style>
     * {
         margin: 0;
@@ -583,6 +694,25 @@ st.markdown("""
         animation: slideInLeft 0.3s ease;
     }
 
+    /* Reply being streamed (StreamRenderer); drawn like .chat-bubble-assistant */
+    .st-key-streaming_reply {
+        background: linear-gradient(135deg, #1a2847, #0f1929);
+        padding: 12px 16px;
+        border-radius: 12px 12px 12px 0px;
+        box-shadow: 0 2px 8px rgba(0, 0, 0, 0.2);
+        width: fit-content;
+        max-width: 70%;
+        color: #e9edef;
+        margin: 8px 0;
+        gap: 0.25rem;
+        animation: slideInLeft 0.3s ease;
+    }
+
+    .st-key-streaming_reply p {
+        color: #e9edef;
+        margin-bottom: 0.25rem;
+    }
+
     /* Container for chat messages */
     .chat-message-container {
         display: flex;
@@ -757,7 +887,9 @@ st.markdown("""
         background-color: rgba(15, 23, 42, 0.5);
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+with section("css"):
+    st.markdown(APP_CSS, unsafe_allow_html=True)
 # ----------------------------------------------------------------------------- 
 # 2. STATE MANAGEMENT
 # ----------------------------------------------------------------------------- 
@@ -941,12 +1073,8 @@ def login_screen():
 # 4. DASHBOARD SCREEN
 # ----------------------------------------------------------------------------- 
 
-def dashboard_screen():
-    """Dashboard with session validation"""
-    
-    # ============================================================================
-    # SESSION VALIDATION - ADD THIS AT THE TOP
-    # ============================================================================
+def check_session() -> bool:
+    """Logs the user out when the session has expired, else records the activity"""
     if not st.session_state.session_data or not session_manager.is_session_valid(st.session_state.session_data):
         st.error("⚠️ Your session has expired. Please login again.")
         st.session_state.authenticated = False
@@ -954,521 +1082,583 @@ def dashboard_screen():
         st.session_state.session_data = None
         time.sleep(2)
         safe_rerun()
-        return
-    
-    # Update session activity
+        return False
+
     st.session_state.session_data = session_manager.update_activity(st.session_state.session_data)
-    user = st.session_state.db[st.session_state.user_id]
+    return True
+
+def current_user() -> dict:
+    return st.session_state.db[st.session_state.user_id]
+
+# Each part of the dashboard below is a fragment: its widgets rerun only that
+# fragment, so a chat turn doesn't rebuild the charts. Anything that changes
+# data shown elsewhere (a transfer, logging out) reruns the whole app.
+
+@st.fragment(run_every=5)
+def ollama_status():
+    """Refreshes on its own, so an outage or a recovery shows without a rerun"""
+    ollama = get_ollama_health()
+    st.caption(get_model_warmer().status_label() if ollama.online else ollama.status_label())
+
+@st.fragment
+@profiled_fragment("sidebar")
+def sidebar_panel():
+    user = current_user()
+    st.title("🏦 SecureBank")
+    st.write(f"**{user['name']}**")
+    st.caption(f"Account: {st.session_state.user_id}")
+    st.markdown("---")
     
-    # Sidebar
-    with st.sidebar:
-        st.title("🏦 SecureBank")
-        st.write(f"**{user['name']}**")
-        st.caption(f"Account: {st.session_state.user_id}")
-        st.markdown("---")
-        
-        
-        
-        st.subheader("Account Summary")
-        st.metric("Balance", format_currency(user['balance']))
-        st.metric("Credit Score", user['credit_score'])
-        st.markdown("---")
-        
-        if st.button("🚪 Logout", use_container_width=True):
-    # Clear session data
-            st.session_state.authenticated = False
-            st.session_state.user_id = None
-            st.session_state.session_data = None
-            st.session_state.chat_history = []
-            st.session_state.all_chats = []
-            st.session_state.current_chat_id = None
-    
-            st.success("✅ Logged out successfully!")
-            time.sleep(1)
-            safe_rerun()
     
-    # Header
-    c1, c2 = st.columns([3, 1])
-    with c1:
-        hour = datetime.now().hour
-        greeting = "Good Morning" if hour < 12 else "Good Afternoon" if hour < 18 else "Good Evening"
-        st.title(f"{greeting}, {user['name'].split()[0]}")
-    with c2:
-        st.caption("🔒 Secure Connection • Encrypted")
-        st.write(datetime.now().strftime("%B %d, %Y"))
     
-    # Tabs
-    tab1, tab2, tab3, tab4 = st.tabs(["📊 Overview", "📈 Analytics", "💸 Transfer", "💬 Assistant"])
+    ollama_status()
+    st.markdown("---")
+
+    st.subheader("Account Summary")
+    st.metric("Balance", format_currency(user['balance']))
+    st.metric("Credit Score", user['credit_score'])
+    st.markdown("---")
     
-    # TAB 1: Overview
-    with tab1:
-        col_card, col_stats = st.columns([1.5, 2.5])
-        with col_card:
-            st.markdown(f"""
-                <div class="bank-card">
-                    <div style="display:flex; justify-content:space-between;">
-                        <span>Current Balance</span>
-                        <span style="font-size:1.5em;">💳</span>
-                    </div>
-                    <h1 style="margin:10px 0;">{format_currency(user['balance'])}</h1>
-                    <div style="display:flex; justify-content:space-between; margin-top:20px;">
-                        <span>**** **** **** {st.session_state.user_id[-4:]}</span>
-                        <span>EXP 12/28</span>
-                    </div>
+    if st.button("🚪 Logout", use_container_width=True):
+        # Clear session data
+        st.session_state.authenticated = False
+        st.session_state.user_id = None
+        st.session_state.session_data = None
+        st.session_state.chat_history = []
+        st.session_state.all_chats = []
+        st.session_state.current_chat_id = None
+
+        st.success("✅ Logged out successfully!")
+        time.sleep(1)
+        safe_rerun()
+
+@st.fragment
+@profiled_fragment("tab_overview")
+def overview_tab():
+    import pandas as pd
+    import plotly.graph_objects as go
+    user = current_user()
+    col_card, col_stats = st.columns([1.5, 2.5])
+    with col_card:
+        st.markdown(f"""
+            <div class="bank-card">
+                <div style="display:flex; justify-content:space-between;">
+                    <span>Current Balance</span>
+                    <span style="font-size:1.5em;">💳</span>
                 </div>
-            """, unsafe_allow_html=True)
-        
-        with col_stats:
-            m1, m2, m3 = st.columns(3)
-            df = pd.DataFrame(user['transactions'])
-            income = df[df['type'] == 'Credit']['amt'].sum()
-            expense = abs(df[df['type'] == 'Debit']['amt'].sum())
-            
-            m1.metric("Monthly Income", format_currency(income), "+12%")
-            m2.metric("Monthly Spend", format_currency(expense), "-5%")
-            m3.metric("Credit Score", user['credit_score'], "+15 pts")
-            
-            dates = pd.date_range(end=datetime.now(), periods=6).strftime("%b %d")
-            fig_trend = go.Figure(go.Scatter(x=dates, y=user['history'], fill='tozeroy', 
-                                           line=dict(color='#667eea', width=2)))
-            fig_trend.update_layout(margin=dict(l=0, r=0, t=0, b=0), height=80, 
-                                  paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)',
-                                  xaxis=dict(showgrid=False, visible=False), yaxis=dict(showgrid=False, visible=False))
-            st.plotly_chart(fig_trend, use_container_width=True, config={'displayModeBar': False})
-
-        st.subheader("Recent Activity")
-        st.dataframe(
-            df[['date', 'desc', 'cat', 'amt', 'type']],
-            use_container_width=True,
-            column_config={
-                "amt": st.column_config.NumberColumn("Amount", format="Rs. %.2f"),
-                "date": "Date",
-                "desc": "Description",
-                "cat": "Category",
-                "type": "Type"
-            },
-            hide_index=True
-        )
+                <h1 style="margin:10px 0;">{format_currency(user['balance'])}</h1>
+                <div style="display:flex; justify-content:space-between; margin-top:20px;">
+                    <span>**** **** **** {st.session_state.user_id[-4:]}</span>
+                    <span>EXP 12/28</span>
+                </div>
+            </div>
+        """, unsafe_allow_html=True)
     
-    # TAB 2: Analytics
-    with tab2:
-        st.markdown("### 📊 Financial Analytics Dashboard")
-        
+    with col_stats:
+        m1, m2, m3 = st.columns(3)
         df = pd.DataFrame(user['transactions'])
+        income = df[df['type'] == 'Credit']['amt'].sum()
+        expense = abs(df[df['type'] == 'Debit']['amt'].sum())
         
-        col1, col2, col3, col4 = st.columns(4)
+        m1.metric("Monthly Income", format_currency(income), "+12%")
+        m2.metric("Monthly Spend", format_currency(expense), "-5%")
+        m3.metric("Credit Score", user['credit_score'], "+15 pts")
         
-        total_income = df[df['type'] == 'Credit']['amt'].sum()
-        total_expense = abs(df[df['type'] == 'Debit']['amt'].sum())
-        net_savings = total_income - total_expense
-        avg_transaction = df['amt'].abs().mean()
+        dates = pd.date_range(end=datetime.now(), periods=6).strftime("%b %d")
+        fig_trend = go.Figure(go.Scatter(x=dates, y=user['history'], fill='tozeroy', 
+                                       line=dict(color='#667eea', width=2)))
+        fig_trend.update_layout(margin=dict(l=0, r=0, t=0, b=0), height=80, 
+                              paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)',
+                              xaxis=dict(showgrid=False, visible=False), yaxis=dict(showgrid=False, visible=False))
+        st.plotly_chart(fig_trend, use_container_width=True, config={'displayModeBar': False})
+
+    st.subheader("Recent Activity")
+    st.dataframe(
+        df[['date', 'desc', 'cat', 'amt', 'type']],
+        use_container_width=True,
+        column_config={
+            "amt": st.column_config.NumberColumn("Amount", format="Rs. %.2f"),
+            "date": "Date",
+            "desc": "Description",
+            "cat": "Category",
+            "type": "Type"
+        },
+        hide_index=True
+    )
+
+@st.fragment
+@profiled_fragment("tab_analytics")
+def analytics_tab():
+    import pandas as pd
+    import plotly.express as px
+    import plotly.graph_objects as go
+    user = current_user()
+    st.markdown("### 📊 Financial Analytics Dashboard")
+    
+    df = pd.DataFrame(user['transactions'])
+    
+    col1, col2, col3, col4 = st.columns(4)
+    
+    total_income = df[df['type'] == 'Credit']['amt'].sum()
+    total_expense = abs(df[df['type'] == 'Debit']['amt'].sum())
+    net_savings = total_income - total_expense
+    avg_transaction = df['amt'].abs().mean()
+    
+    col1.metric("💰 Total Income", format_currency(total_income), "This Month")
+    col2.metric("💸 Total Expenses", format_currency(total_expense), delta="-15%", delta_color="inverse")
+    col3.metric("📈 Net Savings", format_currency(net_savings), delta="+8%")
+    col4.metric("📊 Avg Transaction", format_currency(avg_transaction))
+    
+    st.markdown("---")
+    
+    chart_col1, chart_col2 = st.columns(2)
+    
+    with chart_col1:
+        st.markdown("<div class='stat-card'>", unsafe_allow_html=True)
+        st.subheader("🎯 Spending by Category")
         
-        col1.metric("💰 Total Income", format_currency(total_income), "This Month")
-        col2.metric("💸 Total Expenses", format_currency(total_expense), delta="-15%", delta_color="inverse")
-        col3.metric("📈 Net Savings", format_currency(net_savings), delta="+8%")
-        col4.metric("📊 Avg Transaction", format_currency(avg_transaction))
+        spending = df[df['type'] == 'Debit'].copy()
+        spending['amt'] = spending['amt'].abs()
+        category_totals = spending.groupby('cat')['amt'].sum().reset_index()
         
-        st.markdown("---")
+        fig_pie = px.pie(
+            category_totals, 
+            values='amt', 
+            names='cat',
+            hole=0.5,
+            color_discrete_sequence=['#667eea', '#764ba2', '#f093fb', '#f5576c', '#4facfe']
+        )
+        fig_pie.update_traces(
+            textposition='outside',
+            textinfo='label+percent',
+            marker=dict(line=dict(color='#0e1117', width=2))
+        )
+        fig_pie.update_layout(
+            paper_bgcolor='rgba(0,0,0,0)',
+            plot_bgcolor='rgba(0,0,0,0)',
+            font=dict(color='white', size=12),
+            showlegend=True,
+            legend=dict(orientation="h", yanchor="bottom", y=-0.2, xanchor="center", x=0.5),
+            height=350
+        )
+        st.plotly_chart(fig_pie, use_container_width=True)
         
-        chart_col1, chart_col2 = st.columns(2)
+        st.markdown("**Category Breakdown:**")
+        category_table = category_totals.sort_values('amt', ascending=False)
+        category_table['Percentage'] = (category_table['amt'] / category_table['amt'].sum() * 100).round(1)
+        category_table['amt'] = category_table['amt'].apply(lambda x: format_currency(x))
+        category_table.columns = ['Category', 'Amount', 'Share (%)']
+        st.dataframe(category_table, hide_index=True, use_container_width=True)
         
-        with chart_col1:
-            st.markdown("<div class='stat-card'>", unsafe_allow_html=True)
-            st.subheader("🎯 Spending by Category")
-            
-            spending = df[df['type'] == 'Debit'].copy()
-            spending['amt'] = spending['amt'].abs()
-            category_totals = spending.groupby('cat')['amt'].sum().reset_index()
-            
-            fig_pie = px.pie(
-                category_totals, 
-                values='amt', 
-                names='cat',
-                hole=0.5,
-                color_discrete_sequence=['#667eea', '#764ba2', '#f093fb', '#f5576c', '#4facfe']
-            )
-            fig_pie.update_traces(
-                textposition='outside',
-                textinfo='label+percent',
-                marker=dict(line=dict(color='#0e1117', width=2))
-            )
-            fig_pie.update_layout(
-                paper_bgcolor='rgba(0,0,0,0)',
-                plot_bgcolor='rgba(0,0,0,0)',
-                font=dict(color='white', size=12),
-                showlegend=True,
-                legend=dict(orientation="h", yanchor="bottom", y=-0.2, xanchor="center", x=0.5),
-                height=350
-            )
-            st.plotly_chart(fig_pie, use_container_width=True)
-            
-            st.markdown("**Category Breakdown:**")
-            category_table = category_totals.sort_values('amt', ascending=False)
-            category_table['Percentage'] = (category_table['amt'] / category_table['amt'].sum() * 100).round(1)
-            category_table['amt'] = category_table['amt'].apply(lambda x: format_currency(x))
-            category_table.columns = ['Category', 'Amount', 'Share (%)']
-            st.dataframe(category_table, hide_index=True, use_container_width=True)
-            
-            st.markdown("</div>", unsafe_allow_html=True)
+        st.markdown("</div>", unsafe_allow_html=True)
 
-        with chart_col2:
-            st.markdown("<div class='stat-card'>", unsafe_allow_html=True)
-            st.subheader("📈 Balance Trend")
-            
-            dates = pd.date_range(end=datetime.now(), periods=len(user['history'])).strftime("%b %d")
-            
-            fig_area = go.Figure()
-            
-            fig_area.add_trace(go.Scatter(
-                x=dates,
-                y=user['history'],
-                fill='tozeroy',
-                name='Balance',
-                line=dict(color='#00ff88', width=3),
-                fillcolor='rgba(0, 255, 136, 0.3)',
-                mode='lines+markers',
-                marker=dict(size=8, color='#00ff88', line=dict(width=2, color='white'))
-            ))
-            
-            fig_area.update_layout(
-                paper_bgcolor='rgba(0,0,0,0)',
-                plot_bgcolor='rgba(0,0,0,0)',
-                font=dict(color='white'),
-                xaxis=dict(
-                    showgrid=True,
-                    gridcolor='rgba(255,255,255,0.1)',
-                    title="Date"
-                ),
-                yaxis=dict(
-                    showgrid=True,
-                    gridcolor='rgba(255,255,255,0.1)',
-                    title="Balance (Rs.)"
-                ),
-                hovermode='x unified',
-                height=350
-            )
-            st.plotly_chart(fig_area, use_container_width=True)
-            
-            st.markdown("**Balance Statistics:**")
-            balance_stats = pd.DataFrame({
-                'Metric': ['Current', 'Highest', 'Lowest', 'Average'],
-                'Value': [
-                    format_currency(user['history'][-1]),
-                    format_currency(max(user['history'])),
-                    format_currency(min(user['history'])),
-                    format_currency(sum(user['history'])/len(user['history']))
-                ]
-            })
-            st.dataframe(balance_stats, hide_index=True, use_container_width=True)
-            
-            st.markdown("</div>", unsafe_allow_html=True)
+    with chart_col2:
+        st.markdown("<div class='stat-card'>", unsafe_allow_html=True)
+        st.subheader("📈 Balance Trend")
         
-        st.markdown("---")
+        dates = pd.date_range(end=datetime.now(), periods=len(user['history'])).strftime("%b %d")
         
-        col_bar1, col_bar2 = st.columns([2, 1])
+        fig_area = go.Figure()
         
-        with col_bar1:
-            st.markdown("<div class='stat-card'>", unsafe_allow_html=True)
-            st.subheader("💵 Income vs Expenses Comparison")
-            
-            type_summary = df.groupby('type')['amt'].apply(lambda x: abs(x).sum()).reset_index()
-            
-            fig_bar = px.bar(
-                type_summary,
-                x='type',
-                y='amt',
-                color='type',
-                color_discrete_map={'Credit': '#00ff88', 'Debit': '#ff6b6b'},
-                text='amt'
-            )
-            fig_bar.update_traces(
-                texttemplate='Rs. %{text:,.0f}',
-                textposition='outside'
-            )
-            fig_bar.update_layout(
-                paper_bgcolor='rgba(0,0,0,0)',
-                plot_bgcolor='rgba(0,0,0,0)',
-                font=dict(color='white'),
-                xaxis_title="Transaction Type",
-                yaxis_title="Amount (Rs.)",
-                showlegend=False,
-                height=300
-            )
-            st.plotly_chart(fig_bar, use_container_width=True)
-            st.markdown("</div>", unsafe_allow_html=True)
+        fig_area.add_trace(go.Scatter(
+            x=dates,
+            y=user['history'],
+            fill='tozeroy',
+            name='Balance',
+            line=dict(color='#00ff88', width=3),
+            fillcolor='rgba(0, 255, 136, 0.3)',
+            mode='lines+markers',
+            marker=dict(size=8, color='#00ff88', line=dict(width=2, color='white'))
+        ))
         
-        with col_bar2:
-            st.markdown("<div class='stat-card'>", unsafe_allow_html=True)
-            st.subheader("🎯 Financial Health")
-            
-            savings_rate = (net_savings / total_income * 100) if total_income > 0 else 0
-            health_score = min(100, max(0, savings_rate * 2))
-            
-            fig_gauge = go.Figure(go.Indicator(
-                mode="gauge+number",
-                value=health_score,
-                domain={'x': [0, 1], 'y': [0, 1]},
-                title={'text': "Health Score", 'font': {'color': 'white'}},
-                number={'suffix': "%", 'font': {'color': 'white'}},
-                gauge={
-                    'axis': {'range': [None, 100], 'tickcolor': "white"},
-                    'bar': {'color': "#00ff88"},
-                    'bgcolor': "#1f2937",
-                    'borderwidth': 2,
-                    'bordercolor': "white",
-                    'steps': [
-                        {'range': [0, 33], 'color': '#ff6b6b'},
-                        {'range': [33, 66], 'color': '#ffd93d'},
-                        {'range': [66, 100], 'color': '#00ff88'}
-                    ],
-                }
-            ))
-            fig_gauge.update_layout(
-                paper_bgcolor='rgba(0,0,0,0)',
-                font={'color': "white"},
-                height=350,
-                margin=dict(l=20, r=20, t=50, b=20)
-            )
-            st.plotly_chart(fig_gauge, use_container_width=True)
-            
-            st.metric("Savings Rate", f"{savings_rate:.1f}%")
-            st.markdown("</div>", unsafe_allow_html=True)
+        fig_area.update_layout(
+            paper_bgcolor='rgba(0,0,0,0)',
+            plot_bgcolor='rgba(0,0,0,0)',
+            font=dict(color='white'),
+            xaxis=dict(
+                showgrid=True,
+                gridcolor='rgba(255,255,255,0.1)',
+                title="Date"
+            ),
+            yaxis=dict(
+                showgrid=True,
+                gridcolor='rgba(255,255,255,0.1)',
+                title="Balance (Rs.)"
+            ),
+            hovermode='x unified',
+            height=350
+        )
+        st.plotly_chart(fig_area, use_container_width=True)
         
-        st.markdown("---")
+        st.markdown("**Balance Statistics:**")
+        balance_stats = pd.DataFrame({
+            'Metric': ['Current', 'Highest', 'Lowest', 'Average'],
+            'Value': [
+                format_currency(user['history'][-1]),
+                format_currency(max(user['history'])),
+                format_currency(min(user['history'])),
+                format_currency(sum(user['history'])/len(user['history']))
+            ]
+        })
+        st.dataframe(balance_stats, hide_index=True, use_container_width=True)
         
-        st.subheader("📋 Transaction Timeline")
+        st.markdown("</div>", unsafe_allow_html=True)
+    
+    st.markdown("---")
+    
+    col_bar1, col_bar2 = st.columns([2, 1])
+    
+    with col_bar1:
+        st.markdown("<div class='stat-card'>", unsafe_allow_html=True)
+        st.subheader("💵 Income vs Expenses Comparison")
         
-        df_display = df.copy()
-        df_display['amt'] = df_display['amt'].apply(lambda x: format_currency(x))
-        df_display = df_display[['date', 'desc', 'cat', 'amt', 'type']]
-        df_display.columns = ['Date', 'Description', 'Category', 'Amount', 'Type']
+        type_summary = df.groupby('type')['amt'].apply(lambda x: abs(x).sum()).reset_index()
         
-        st.dataframe(
-            df_display,
-            use_container_width=True,
-            hide_index=True,
-            column_config={
-                "Type": st.column_config.TextColumn(
-                    "Type",
-                    help="Credit or Debit"
-                )
-            }
+        fig_bar = px.bar(
+            type_summary,
+            x='type',
+            y='amt',
+            color='type',
+            color_discrete_map={'Credit': '#00ff88', 'Debit': '#ff6b6b'},
+            text='amt'
         )
+        fig_bar.update_traces(
+            texttemplate='Rs. %{text:,.0f}',
+            textposition='outside'
+        )
+        fig_bar.update_layout(
+            paper_bgcolor='rgba(0,0,0,0)',
+            plot_bgcolor='rgba(0,0,0,0)',
+            font=dict(color='white'),
+            xaxis_title="Transaction Type",
+            yaxis_title="Amount (Rs.)",
+            showlegend=False,
+            height=300
+        )
+        st.plotly_chart(fig_bar, use_container_width=True)
+        st.markdown("</div>", unsafe_allow_html=True)
     
-    # TAB 3: Transfer
-    with tab3:
-        st.markdown("### 💸 Quick Transfer")
-        col_form, col_info = st.columns([1, 1])
-        with col_form:
-            with st.form("transfer_form"):
-                recipient = st.text_input("Recipient Name / Account")
-                amount = st.number_input("Amount (Rs.)", min_value=1.0, max_value=100000.0, step=100.0)
-                note = st.text_input("Note (Optional)")
-                submitted = st.form_submit_button("💳 Send Money", use_container_width=True)
-                if submitted:
-                    if not recipient:
-                        st.error("Please enter a recipient.")
-                    else:
-                        success, msg = process_transfer(recipient, amount)
-                        if success:
-                            st.success(f"✅ Successfully sent Rs. {amount:,.2f} to {recipient}!")
-                            time.sleep(1)
-                            safe_rerun()
-                        else:
-                            st.error(msg)
-        with col_info:
-            st.info("**Transfer Limits:**\n\nDaily Limit: Rs. 50,000\n\nSecure transfers with 256-bit encryption.")
-    
-    # TAB 4: Assistant
-    with tab4:
-        st.subheader("🤖 AI Banking Assistant")
-        if st.session_state.current_chat_id:
-            st.caption(f"Session: {st.session_state.current_chat_id[:8]}...")
-        else:
-            st.caption("New Conversation")
+    with col_bar2:
+        st.markdown("<div class='stat-card'>", unsafe_allow_html=True)
+        st.subheader("🎯 Financial Health")
         
-        left_col, center_col, right_col = st.columns([2, 4.5, 2])
+        savings_rate = (net_savings / total_income * 100) if total_income > 0 else 0
+        health_score = min(100, max(0, savings_rate * 2))
         
-        # LEFT COLUMN: Chat history
-        with left_col:
-            st.markdown("**Chats**")
-            if st.button("➕ New", key="new_left", use_container_width=False):
-                start_new_chat()
-                safe_rerun()
-            
-            st.markdown("---")
-            
-            with st.container(height=400):
-                if st.session_state.all_chats:
-                    for i, chat in enumerate(st.session_state.all_chats):
-                        label = f"🟢 {chat['title']}" if chat['id'] == st.session_state.current_chat_id else chat['title']
-                        
-                        c_btn, c_del = st.columns([4, 1])
-                        with c_btn:
-                            if st.button(label, key=f"load_{chat['id']}_{i}", use_container_width=True):
-                                load_chat(chat['id'])
-                                safe_rerun()
-                        with c_del:
-                            if st.button("🗑️", key=f"del_{chat['id']}_{i}"):
-                                delete_chat(chat['id'])
-                                safe_rerun()
-                else:
-                    st.caption("No history.")
+        fig_gauge = go.Figure(go.Indicator(
+            mode="gauge+number",
+            value=health_score,
+            domain={'x': [0, 1], 'y': [0, 1]},
+            title={'text': "Health Score", 'font': {'color': 'white'}},
+            number={'suffix': "%", 'font': {'color': 'white'}},
+            gauge={
+                'axis': {'range': [None, 100], 'tickcolor': "white"},
+                'bar': {'color': "#00ff88"},
+                'bgcolor': "#1f2937",
+                'borderwidth': 2,
+                'bordercolor': "white",
+                'steps': [
+                    {'range': [0, 33], 'color': '#ff6b6b'},
+                    {'range': [33, 66], 'color': '#ffd93d'},
+                    {'range': [66, 100], 'color': '#00ff88'}
+                ],
+            }
+        ))
+        fig_gauge.update_layout(
+            paper_bgcolor='rgba(0,0,0,0)',
+            font={'color': "white"},
+            height=350,
+            margin=dict(l=20, r=20, t=50, b=20)
+        )
+        st.plotly_chart(fig_gauge, use_container_width=True)
         
-        # CENTER COLUMN: Chat interface
-        with center_col:
-            top_cols = st.columns([1,2])
-            
-            with top_cols[0]:
-                use_ollama = st.checkbox("Ollama", value=USE_OLLAMA, key="ollama_toggle")
-            
-            st.markdown("<br>", unsafe_allow_html=True)
+        st.metric("Savings Rate", f"{savings_rate:.1f}%")
+        st.markdown("</div>", unsafe_allow_html=True)
+    
+    st.markdown("---")
+    
+    st.subheader("📋 Transaction Timeline")
+    
+    df_display = df.copy()
+    df_display['amt'] = df_display['amt'].apply(lambda x: format_currency(x))
+    df_display = df_display[['date', 'desc', 'cat', 'amt', 'type']]
+    df_display.columns = ['Date', 'Description', 'Category', 'Amount', 'Type']
+    
+    st.dataframe(
+        df_display,
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            "Type": st.column_config.TextColumn(
+                "Type",
+                help="Credit or Debit"
+            )
+        }
+    )
 
-            # Chat container
-            chat_container = st.container()
-            with chat_container:
-                if not st.session_state.chat_history:
-                    st.info("👋 Try: 'Check balance', 'Show transactions', or 'Spending analysis'")
+@st.fragment
+@profiled_fragment("tab_transfer")
+def transfer_tab():
+    if not check_session():
+        return
+    st.markdown("### 💸 Quick Transfer")
+    col_form, col_info = st.columns([1, 1])
+    with col_form:
+        with st.form("transfer_form"):
+            recipient = st.text_input("Recipient Name / Account")
+            amount = st.number_input("Amount (Rs.)", min_value=1.0, max_value=100000.0, step=100.0)
+            note = st.text_input("Note (Optional)")
+            submitted = st.form_submit_button("💳 Send Money", use_container_width=True)
+            if submitted:
+                if not recipient:
+                    st.error("Please enter a recipient.")
                 else:
-                    for i, msg in enumerate(st.session_state.chat_history):
-                        if msg["role"] == "user":
-                            c_msg, c_edit = st.columns([9, 1])
-                            with c_msg:
-                                st.markdown(f"""
-                                    <div class="chat-message-user">
-                                        <div class="chat-bubble-user">
-                                            {msg["content"]}
-                                            <div class="chat-timestamp">{msg['timestamp'].split()[1]}</div>
-                                        </div>
-                                    </div>
-                                """, unsafe_allow_html=True)
-                            with c_edit:
-                                with st.popover("✏️", use_container_width=True):
-                                    new_text = st.text_area("Edit message:", value=msg["content"], key=f"edit_{i}")
-                                    if st.button("Save & Retry", key=f"save_{i}"):
-                                        # 1. Truncate history
-                                        st.session_state.chat_history = st.session_state.chat_history[:i]
-                                        # 2. Set retry flag
-                                        st.session_state.retry_prompt = new_text
-                                        st.session_state.current_chat_id = st.session_state.current_chat_id # Keep ID
-                                        safe_rerun()
-                        else:
+                    success, msg = process_transfer(recipient, amount)
+                    if success:
+                        st.success(f"✅ Successfully sent Rs. {amount:,.2f} to {recipient}!")
+                        time.sleep(1)
+                        safe_rerun()
+                    else:
+                        st.error(msg)
+    with col_info:
+        st.info("**Transfer Limits:**\n\nDaily Limit: Rs. 50,000\n\nSecure transfers with 256-bit encryption.")
+
+@st.fragment(key="assistant")
+@profiled_fragment("tab_assistant")
+def assistant_tab():
+    if not check_session():
+        return
+    st.subheader("🤖 AI Banking Assistant")
+    if st.session_state.current_chat_id:
+        st.caption(f"Session: {st.session_state.current_chat_id[:8]}...")
+    else:
+        st.caption("New Conversation")
+    
+    left_col, center_col, right_col = st.columns([2, 4.5, 2])
+    
+    # LEFT COLUMN: Chat history
+    with left_col:
+        st.markdown("**Chats**")
+        if st.button("➕ New", key="new_left", use_container_width=False):
+            start_new_chat()
+            safe_rerun(scope="fragment")
+        
+        st.markdown("---")
+        
+        with st.container(height=400):
+            # Poll for background titles without rerunning the whole dashboard
+            titles_pending = get_title_jobs().pending([c['id'] for c in st.session_state.all_chats])
+            st.fragment(chat_list, run_every=2 if titles_pending else None)()
+    
+    # CENTER COLUMN: Chat interface
+    with center_col:
+        top_cols = st.columns([1,2])
+        
+        with top_cols[0]:
+            use_ollama = st.checkbox("Ollama", value=USE_OLLAMA, key="ollama_toggle")
+        with top_cols[1]:
+            prefill = prefill_stats.summary()
+            if prefill["requests"]:
+                st.caption(f"⚡ Prompt prefill: {prefill['last_ms']:.0f} ms last "
+                           f"({prefill['last_tokens']} tokens) · {prefill['avg_ms']:.0f} ms avg over {prefill['requests']}")
+            queue = gateway.stats()
+            if queue["queued"] or queue["rejected"]:
+                st.caption(f"🚦 {queue['queued']} waiting · p95 wait {queue['p95_wait_ms']:.0f} ms · "
+                           f"{queue['rejected']} turned away")
+        
+        st.markdown("<br>", unsafe_allow_html=True)
+
+        # Chat container
+        chat_container = st.container()
+        with chat_container:
+            if not st.session_state.chat_history:
+                st.info("👋 Try: 'Check balance', 'Show transactions', or 'Spending analysis'")
+            else:
+                def render_message(i, msg):
+                    if msg["role"] == "user":
+                        c_msg, c_edit = st.columns([9, 1])
+                        with c_msg:
                             st.markdown(f"""
-                                <div class="chat-message-assistant">
-                                    <div class="chat-bubble-assistant">
-                                        {msg["content"]}
+                                <div class="chat-message-user">
+                                    <div class="chat-bubble-user">
+                                        {message_html(msg["content"])}
                                         <div class="chat-timestamp">{msg['timestamp'].split()[1]}</div>
                                     </div>
                                 </div>
                             """, unsafe_allow_html=True)
-            # Chat input
-            prompt = st.chat_input("Type a message...")
+                        with c_edit:
+                            with st.popover("✏️", use_container_width=True):
+                                new_text = st.text_area("Edit message:", value=msg["content"], key=f"edit_{i}")
+                                if st.button("Save & Retry", key=f"save_{i}"):
+                                    # 1. Truncate history
+                                    st.session_state.chat_history = st.session_state.chat_history[:i]
+                                    # 2. Set retry flag
+                                    st.session_state.retry_prompt = new_text
+                                    st.session_state.current_chat_id = st.session_state.current_chat_id # Keep ID
+                                    safe_rerun(scope="fragment")
+                    else:
+                        st.markdown(f"""
+                            <div class="chat-message-assistant">
+                                <div class="chat-bubble-assistant">
+                                    {message_html(msg["content"])}
+                                    <div class="chat-timestamp">{msg['timestamp'].split()[1]}</div>
+                                </div>
+                            </div>
+                        """, unsafe_allow_html=True)
+
+                with section("chat_history"):
+                    render_window(st.session_state.chat_history, render_message,
+                                  chat_key=st.session_state.current_chat_id, page_size=CHAT_PAGE_SIZE)
+        # Chat input
+        prompt = st.chat_input("Type a message...")
+        
+        # Handle retry prompt
+        if st.session_state.retry_prompt:
+            prompt = st.session_state.retry_prompt
+            st.session_state.retry_prompt = None
             
-            # Handle retry prompt
-            if st.session_state.retry_prompt:
-                prompt = st.session_state.retry_prompt
-                st.session_state.retry_prompt = None
-                
-            if prompt:
+        if prompt:
+            with request_trace("chat", model=OLLAMA_MODEL):
                 # STEP 1: Validate query
                 is_valid, reason = is_banking_query(prompt)
-                
+            
                 if not is_valid:
                     # Rejected query - add refusal message
                     add_chat_message("user", prompt)
                     add_chat_message("assistant", reason)
                     save_current_chat()
-                    safe_rerun()
-                
+                    safe_rerun(scope="fragment")
+            
                 # STEP 2: Query is valid (either banking or greeting)
                 # Add user message
                 add_chat_message("user", prompt)
-                
+            
                 # STEP 3: Try rule-based response first
                 rule_response = get_bot_response(prompt)
-                
+            
                 if rule_response != "NEED_OLLAMA":
                     # Rule-based response worked (includes greetings!)
                     add_chat_message("assistant", rule_response)
                     save_current_chat()
-                    safe_rerun()
-                
+                    safe_rerun(scope="fragment")
+            
                 # STEP 4: Use Ollama for complex queries
                 if use_ollama:
                     save_current_chat()
-                    
+                
                     with chat_container:
                         st.markdown(f"""
                             <div class="chat-message-user">
-                                <div class="chat-bubble-user">{prompt}</div>
+                                <div class="chat-bubble-user">{message_html(prompt)}</div>
                             </div>
                         """, unsafe_allow_html=True)
-                        resp_ph = st.empty()
-                        
+                        # Styled as an assistant bubble by the .st-key-streaming_reply CSS rule
+                        renderer = StreamRenderer(st.container(key="streaming_reply"),
+                                                  interval=STREAM_FLUSH_MS / 1000, max_chars=STREAM_FLUSH_CHARS)
+                    
                         strict_prompt = get_strict_banking_prompt(st.session_state.user_id, prompt)
-                        stream = call_ollama_stream(strict_prompt)
-                        
-                        resp_text = ""
-                        for chunk in stream:
-                            resp_text += chunk
-                            resp_ph.markdown(
-                                f"""
-                                <div class="chat-message-assistant">
-                                    <div class="chat-bubble-assistant">{resp_text}</div>
-                                </div>
-                                """,
-                                unsafe_allow_html=True
-                            )
-                        
+                        guard = StreamGuard()
+                        stream = call_ollama_stream(strict_prompt, guard)
+                    
+                        with section("ollama_stream"):
+                            for chunk in stream:
+                                renderer.write(chunk)
+                            if guard.violation:
+                                # Generation was cut off; the partial reply is never kept
+                                resp_text = renderer.replace(REFUSAL_MESSAGE)
+                            else:
+                                resp_text = renderer.close()
+                    
                         # STEP 5: Post-validation
                         resp_text = validate_ollama_response(resp_text, prompt)
-                        
+                    
                         add_chat_message("assistant", resp_text)
                         save_current_chat()
-                        safe_rerun()
+                        safe_rerun(scope="fragment")
                 else:
                     # Ollama disabled, use fallback
                     add_chat_message("assistant", "Please enable Ollama for complex queries.")
                     save_current_chat()
-                    safe_rerun()
-                    
-        # RIGHT COLUMN: Quick actions
-        with right_col:
-            st.markdown("**Quick Actions**")
-            if st.button("💳 Show Balance", key="quick_balance", use_container_width=True):
-                add_chat_message("user", "What is my balance?")
-                add_chat_message("assistant", get_bot_response("balance"))
-                save_current_chat()
-                safe_rerun()
-            
-            if st.button("📄 Transactions", key="quick_trans", use_container_width=True):
-                add_chat_message("user", "Show my recent transactions")
-                add_chat_message("assistant", get_bot_response("transactions"))
-                save_current_chat()
-                safe_rerun()
-            
-            st.markdown("---")
-            st.markdown("**Suggestions**")
-            st.write("• How much did I spend?")
-            st.write("• Show transactions")
-            st.write("• Transfer money")
-            st.write("• Show profile")
-            
-            st.markdown("---")
-            st.markdown("**Export**")
-            if st.button("📥 Export Chat", key="export_chat", use_container_width=True):
-                if not st.session_state.chat_history:
-                    st.warning("No chat to export")
-                else:
-                    df_export = pd.DataFrame(st.session_state.chat_history)
-                    csv = df_export.to_csv(index=False).encode('utf-8')
-                    st.download_button("Download CSV", csv, file_name="chat_history.csv", mime="text/csv")
+                    safe_rerun(scope="fragment")
+                
+    # RIGHT COLUMN: Quick actions
+    with right_col:
+        st.markdown("**Quick Actions**")
+        if st.button("💳 Show Balance", key="quick_balance", use_container_width=True):
+            add_chat_message("user", "What is my balance?")
+            add_chat_message("assistant", get_bot_response("balance"))
+            save_current_chat()
+            safe_rerun(scope="fragment")
+        
+        if st.button("📄 Transactions", key="quick_trans", use_container_width=True):
+            add_chat_message("user", "Show my recent transactions")
+            add_chat_message("assistant", get_bot_response("transactions"))
+            save_current_chat()
+            safe_rerun(scope="fragment")
+        
+        st.markdown("---")
+        st.markdown("**Suggestions**")
+        st.write("• How much did I spend?")
+        st.write("• Show transactions")
+        st.write("• Transfer money")
+        st.write("• Show profile")
+        
+        st.markdown("---")
+        st.markdown("**Export**")
+        if st.button("📥 Export Chat", key="export_chat", use_container_width=True):
+            if not st.session_state.chat_history:
+                st.warning("No chat to export")
+            else:
+                import pandas as pd
+                df_export = pd.DataFrame(st.session_state.chat_history)
+                csv = df_export.to_csv(index=False).encode('utf-8')
+                st.download_button("Download CSV", csv, file_name="chat_history.csv", mime="text/csv")
+
+def dashboard_screen():
+    """Dashboard with session validation"""
+    if not check_session():
+        return
+    user = current_user()
+
+    with st.sidebar:
+        sidebar_panel()
+    
+    # Header
+    # Header
+    c1, c2 = st.columns([3, 1])
+    with c1:
+        hour = datetime.now().hour
+        greeting = "Good Morning" if hour < 12 else "Good Afternoon" if hour < 18 else "Good Evening"
+        st.title(f"{greeting}, {user['name'].split()[0]}")
+    with c2:
+        st.caption("🔒 Secure Connection • Encrypted")
+        st.write(datetime.now().strftime("%B %d, %Y"))
+    
+    # Tabs
+    tab1, tab2, tab3, tab4 = st.tabs(["📊 Overview", "📈 Analytics", "💸 Transfer", "💬 Assistant"])
+    with tab1:
+        overview_tab()
+    with tab2:
+        analytics_tab()
+    with tab3:
+        transfer_tab()
+    with tab4:
+        assistant_tab()
+
 # ----------------------------------------------------------------------------- 
 # 6. MAIN EXECUTION
 # ----------------------------------------------------------------------------- 
 
 if __name__ == "__main__":
+    # Start loading the model while the customer is still on the login screen
+    if get_ollama_health().online:
+        get_model_warmer().ensure_warm()
+    get_metrics_server()
     if st.session_state.authenticated:
         dashboard_screen()
     else:
-        login_screen()
\ No newline at end of file
+        login_screen()
+    # Not reached when the rerun ends in st.rerun(); that partial rerun isn't recorded
+    finish_rerun("dashboard" if st.session_state.authenticated else "login")
+    if is_admin(st.session_state.user_id):
+        render_panel()
\ No newline at end of file
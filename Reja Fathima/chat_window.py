@@ -0,0 +1,144 @@
+# chat_window.py
+# Typed port of the shared M Nihan Anoop/chat_window.py, plus the streamed-message rendering; keep the two in step.
+import html
+import re
+import time
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
+
+import streamlit as st
+
+# ============================================================================
+# WINDOWED CHAT RENDERING
+# ============================================================================
+# Only the newest page(s) of a conversation are drawn on a rerun; older messages
+# are added a page at a time when the user asks for them.
+
+
+def visible_messages(messages: List[Dict], pages: int, page_size: int) -> Tuple[int, List[Dict]]:
+    """Index of the first visible message, and the visible messages themselves"""
+    start = max(0, len(messages) - pages * page_size)
+    return start, messages[start:]
+
+
+def _show_more(pages_key: str) -> None:
+    chat_key, pages = st.session_state[pages_key]
+    st.session_state[pages_key] = (chat_key, pages + 1)
+
+
+def render_window(messages: List[Dict], render_message: Callable[[int, Dict], None], chat_key,
+                  page_size: int, pages_key: str = "chat_pages") -> None:
+    """Calls `render_message(index, message)` for the visible window of this chat.
+
+    The number of pages shown is remembered per session and starts again at one
+    whenever `chat_key` (the open chat) changes.
+    """
+    stored_key, pages = st.session_state.get(pages_key, (None, 1))
+    if pages_key not in st.session_state or stored_key != chat_key:
+        pages = 1
+        st.session_state[pages_key] = (chat_key, pages)
+
+    start, window = visible_messages(messages, pages, page_size)
+    if start:
+        st.button(f"⬆️ Show {min(start, page_size)} earlier messages ({start} hidden)",
+                  key=f"{pages_key}_more", on_click=_show_more, args=(pages_key,))
+    for offset, message in enumerate(window):
+        render_message(start + offset, message)
+
+# ============================================================================
+# MESSAGE HTML
+# ============================================================================
+
+_BOLD = re.compile(r"\*\*(.+?)\*\*")
+_ITALIC = re.compile(r"(?<![*\w])\*(?!\s)(.+?)(?<!\s)\*(?![*\w])")
+_CODE = re.compile(r"`([^`]+)`")
+
+
+def markdown_to_html(text: str) -> str:
+    """The markdown subset bot replies use (bold, italics, inline code, line breaks), escaped for HTML bubbles"""
+    out = html.escape(text.strip())
+    out = _CODE.sub(r"<code>\1</code>", out)
+    out = _BOLD.sub(r"<strong>\1</strong>", out)
+    out = _ITALIC.sub(r"<em>\1</em>", out)
+    return out.replace("\n", "<br>")
+
+
+@lru_cache(maxsize=2048)
+def message_html(content: str) -> str:
+    """Cached `markdown_to_html` for stored messages, which never change once added"""
+    return markdown_to_html(content)
+
+# ============================================================================
+# STREAMED REPLIES
+# ============================================================================
+# Redrawing the whole reply on every token sends O(N^2) text over N websocket
+# messages. Instead tokens are batched, each finished paragraph is written once
+# as its own element, and only the paragraph still being generated is redrawn.
+# The reply is drawn with Streamlit's own markdown while it streams; the bubble
+# HTML (`message_html`) is built once, when the stored message is shown.
+
+CURSOR = " ▌"
+
+
+class StreamRenderer:
+    """Draws a streamed reply into `container`, at most once per `interval` seconds
+    or `max_chars` new characters"""
+
+    def __init__(self, container, interval: float, max_chars: int):
+        self.container = container
+        self.interval = interval
+        self.max_chars = max_chars
+        self.text = ""
+        self.done = 0  # self.text[:done] is already drawn as finished paragraphs
+        self.tail = None  # placeholder for the paragraph still being generated
+        self.elements = []  # every placeholder drawn into, for `replace`
+        self.pending = 0
+        self.last_flush = time.monotonic()
+        self.flushes = 0
+
+    def write(self, chunk: str) -> None:
+        self.text += chunk
+        self.pending += len(chunk)
+        if self.pending >= self.max_chars or time.monotonic() - self.last_flush >= self.interval:
+            self.flush()
+
+    def _finished_until(self) -> Optional[int]:
+        """End of the last complete paragraph not yet drawn (never inside a ``` block)"""
+        cut = self.text.rfind("\n\n", self.done)
+        while cut != -1 and self.text.count("```", 0, cut) % 2:
+            cut = self.text.rfind("\n\n", self.done, cut)
+        return cut if cut != -1 else None
+
+    def _placeholder(self):
+        if self.tail is None:
+            with self.container:
+                self.tail = st.empty()
+            self.elements.append(self.tail)
+        return self.tail
+
+    def flush(self, cursor: bool = True) -> None:
+        cut = self._finished_until()
+        if cut is not None:
+            # Replace the live paragraph with the finished text; it is never sent again
+            self._placeholder().markdown(self.text[self.done:cut])
+            self.tail = None
+            self.done = cut + 2
+        live = self.text[self.done:]
+        if live.strip():
+            self._placeholder().markdown(live + (CURSOR if cursor else ""))
+        self.pending = 0
+        self.last_flush = time.monotonic()
+        self.flushes += 1
+
+    def close(self) -> str:
+        """Draws whatever is left (without the cursor) and returns the full reply"""
+        self.flush(cursor=False)
+        return self.text
+
+    def replace(self, text: str) -> str:
+        """Removes what has been drawn so far and shows `text` instead"""
+        for element in self.elements:
+            element.empty()
+        self.elements, self.tail, self.text, self.done = [], None, text, 0
+        self.flush(cursor=False)
+        return text
@@ -9,6 +9,34 @@ class Settings:
     OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
     OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.2")
     OLLAMA_TIMEOUT = int(os.getenv("OLLAMA_TIMEOUT", "120"))
+    OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+    OLLAMA_NUM_PARALLEL = int(os.getenv("OLLAMA_NUM_PARALLEL", "4"))
+    LLM_QUEUE_WAIT_SLO = float(os.getenv("LLM_QUEUE_WAIT_SLO", "15"))
+    LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "32"))
+    # Circuit breaker: probe period, failures in a row that open it, seconds it fails fast before a trial
+    OLLAMA_HEALTH_INTERVAL = float(os.getenv("OLLAMA_HEALTH_INTERVAL", "10"))
+    OLLAMA_FAILURE_THRESHOLD = int(os.getenv("OLLAMA_FAILURE_THRESHOLD", "3"))
+    OLLAMA_BREAKER_OPEN_SECONDS = float(os.getenv("OLLAMA_BREAKER_OPEN_SECONDS", "15"))
+    # A smaller/faster model can be used for chat titles; defaults to OLLAMA_MODEL
+    TITLE_MODEL = os.getenv("TITLE_MODEL", os.getenv("OLLAMA_MODEL", "llama3.2"))
+    TITLE_NUM_PREDICT = int(os.getenv("TITLE_NUM_PREDICT", "12"))
+    # Messages drawn per page of a conversation; older pages load on demand
+    CHAT_PAGE_SIZE = int(os.getenv("CHAT_PAGE_SIZE", "20"))
+    # Streamed replies are redrawn at most every STREAM_FLUSH_MS or STREAM_FLUSH_CHARS new characters
+    STREAM_FLUSH_MS = int(os.getenv("STREAM_FLUSH_MS", "50"))
+    STREAM_FLUSH_CHARS = int(os.getenv("STREAM_FLUSH_CHARS", "400"))
+    WARM_INTERVAL_SECONDS = int(os.getenv("WARM_INTERVAL_SECONDS", "240"))
+    BUSINESS_HOURS_START = int(os.getenv("BUSINESS_HOURS_START", "8"))
+    BUSINESS_HOURS_END = int(os.getenv("BUSINESS_HOURS_END", "20"))
+    # Latency tracing: JSONL trace file (empty disables), its rollover size, Prometheus port (0 disables).
+    # Each team app has its own default port (Nihan 9464, Ankesh 9465, Hariprasad 9466, this one 9467).
+    TRACE_FILE = os.getenv("BANKBOT_TRACE_FILE", "traces.jsonl")
+    TRACE_MAX_MB = float(os.getenv("BANKBOT_TRACE_MAX_MB", "10"))
+    METRICS_PORT = int(os.getenv("BANKBOT_METRICS_PORT", "9467"))
+    # Rerun profiler: off | sections | cprofile | pyinstrument; admins (user ids, or *) see the sidebar panel
+    PROFILE_MODE = os.getenv("BANKBOT_PROFILE_MODE", "off").lower()
+    PROFILE_DIR = os.getenv("BANKBOT_PROFILE_DIR", "profiles")
+    ADMIN_USERS = {u.strip() for u in os.getenv("BANKBOT_ADMIN_USERS", "").split(",") if u.strip()}
     SECRET_KEY = os.getenv("SECRET_KEY", "change-this-secret-key")
     SESSION_TIMEOUT_MINUTES = int(os.getenv("SESSION_TIMEOUT_MINUTES", "15"))
     MAX_LOGIN_ATTEMPTS = int(os.getenv("MAX_LOGIN_ATTEMPTS", "5"))
@@ -0,0 +1,166 @@
+# ollama_health.py
+# Typed port of the shared M Nihan Anoop/ollama_health.py, configured from config.settings; keep the two in step.
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+import requests
+
+from config import settings
+
+PROBE_TIMEOUT_SECONDS = 2
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+UNAVAILABLE_MESSAGE = ("⚠️ **System Offline:** my AI brain (Ollama) isn't responding right now, "
+                       "so I can't answer this. Please try again in a minute.")
+
+
+class CircuitOpen(Exception):
+    pass
+
+
+def is_outage(error: requests.exceptions.RequestException) -> bool:
+    """Connection failures, timeouts and 5xx replies count against Ollama; a 404 for a missing model doesn't."""
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return True
+    response = getattr(error, "response", None)
+    return response is not None and response.status_code >= 500
+
+
+class OllamaHealth:
+    """Circuit breaker in front of Ollama, shared by every session in the process.
+
+    closed:    calls go through. OLLAMA_FAILURE_THRESHOLD consecutive failures open the breaker.
+    open:      calls raise CircuitOpen at once instead of waiting out a timeout.
+    half_open: after OLLAMA_BREAKER_OPEN_SECONDS one trial (a call or the background probe) is
+               let through; success closes the breaker, failure opens it again.
+
+    A background thread probes /api/version every OLLAMA_HEALTH_INTERVAL seconds
+    while closed, and as soon as a half-open trial is allowed while open, so an
+    outage is noticed before a customer hits it and recovery without one.
+    """
+
+    def __init__(self, base_url: str = settings.OLLAMA_URL,
+                 failure_threshold: int = settings.OLLAMA_FAILURE_THRESHOLD,
+                 open_seconds: float = settings.OLLAMA_BREAKER_OPEN_SECONDS,
+                 interval: float = settings.OLLAMA_HEALTH_INTERVAL):
+        self.base_url = base_url.rstrip("/")
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.interval = interval
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.last_checked: Optional[float] = None
+        self.fast_failed = 0
+        self._trial_running = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # --- Breaker ---
+    def retry_in(self) -> float:
+        """Seconds until an open breaker allows a trial (0 when it already would)."""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.opened_at + self.open_seconds - time.monotonic())
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and self.retry_in() > 0:
+                return False
+            if self._trial_running:
+                return False  # one trial at a time while half-open
+            self.state = HALF_OPEN
+            self._trial_running = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != CLOSED:
+                print("Ollama is reachable again; closing the circuit breaker")
+            self.state = CLOSED
+            self.failures = 0
+            self.last_error = None
+            self._trial_running = False
+
+    def record_failure(self, error: Exception) -> None:
+        with self._lock:
+            self.failures += 1
+            self.last_error = str(error)
+            self._trial_running = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    print(f"Ollama unavailable ({error}); failing fast for {self.open_seconds:.0f}s")
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    @contextmanager
+    def call(self) -> Iterator[None]:
+        """Wraps one request to Ollama. Raises CircuitOpen without calling it while the breaker is open."""
+        if not self.allow():
+            self.fast_failed += 1
+            raise CircuitOpen(f"Ollama unavailable, retrying in {self.retry_in():.0f}s")
+        try:
+            yield
+        except requests.exceptions.RequestException as e:
+            if is_outage(e):
+                self.record_failure(e)
+            else:
+                self.record_success()  # Ollama answered, just not with what we wanted
+            raise
+        except BaseException:
+            # Anything else (a busy gateway, the user leaving mid-stream) says nothing about Ollama.
+            with self._lock:
+                self._trial_running = False
+            raise
+        self.record_success()
+
+    # --- Background probe ---
+    def probe(self) -> str:
+        try:
+            with self.call():
+                response = requests.get(f"{self.base_url}/api/version", timeout=PROBE_TIMEOUT_SECONDS)
+                response.raise_for_status()
+        except (CircuitOpen, requests.exceptions.RequestException):
+            pass
+        self.last_checked = time.time()
+        return self.state
+
+    def _run(self):
+        while True:
+            self.probe()
+            wait = self.interval if self.state == CLOSED else max(self.retry_in(), 0.5)
+            if self._stop.wait(wait):
+                return
+
+    def start(self) -> "OllamaHealth":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="ollama-health", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    # --- Status ---
+    @property
+    def online(self) -> bool:
+        return self.state == CLOSED
+
+    def status_label(self) -> str:
+        if self.state == CLOSED:
+            return "🟢 Ollama online"
+        if self.state == HALF_OPEN:
+            return "🟡 Ollama: checking whether it's back..."
+        return f"🔴 Ollama offline · retrying in {self.retry_in():.0f}s"
+
+
+# One breaker per server process: Streamlit imports this module once and every session shares it.
+health = OllamaHealth()
@@ -0,0 +1,98 @@
+# prompts.py
+from collections import deque
+from typing import Dict
+
+# ============================================================================
+# BANKING KNOWLEDGE BASE
+# ============================================================================
+
+BANK_KB = """
+SECUREBANK OFFICIAL POLICIES:
+1. SAVINGS INTEREST: 4.5% p.a., credited quarterly.
+2. HOME LOANS: Starting at 8.75% p.a. for amounts > 50 Lakhs.
+3. CREDIT CARDS: 'Platinum' (Rs. 1000/yr fee) and 'Gold' (Free for life).
+4. BRANCH HOURS: Mon-Sat, 9:30 AM - 4:00 PM. Closed on 2nd/4th Saturdays.
+5. UPI LIMITS: Rs. 1,00,000 per day.
+6. SUPPORT: Call 1800-123-4567 or email support@securebank.com.
+7. FIXED DEPOSITS: 6.5% for 1 year, 7.2% for 3 years (Senior citizens +0.5%).
+"""
+
+# ============================================================================
+# PROMPT LAYOUT
+# ============================================================================
+# Ollama reuses the KV cache for the longest prefix a new prompt shares with the
+# previous one, so everything that never changes comes first and stays
+# byte-identical; per-user and per-query data is appended at the end.
+
+OLLAMA_OPTIONS = {
+    "temperature": 0.1,
+    "top_p": 0.9,
+    "top_k": 40
+}
+
+STRICT_BANKING_INSTRUCTIONS = f"""You are a STRICTLY REGULATED banking assistant for SecureBank. You MUST follow these rules:
+
+CRITICAL RULES:
+1. ONLY answer questions about: account balances, transactions, transfers, loans, credit cards, banking policies, and financial services
+2. If asked about ANYTHING else (coding, history, weather, jokes, general knowledge, recipes, travel), respond EXACTLY with: "I apologize, but I can only assist with banking and financial queries."
+3. Do NOT provide any information outside banking/finance domain
+4. Do NOT explain why you can't answer non-banking questions
+5. Keep responses concise and professional
+
+BANK POLICIES (Official Information):
+{BANK_KB}
+"""
+
+
+def build_strict_banking_prompt(user: Dict, user_query: str) -> str:
+    """Static instructions first, then this user's data, then the question"""
+    recent = "\n".join([f"- {t['date']}: {t['desc']} ({t['cat']}) | Amount: Rs. {t['amt']}"
+                       for t in user['transactions'][:5]])
+
+    return f"""{STRICT_BANKING_INSTRUCTIONS}
+USER DATA (Confidential):
+- Name: {user['name']}
+- Balance: Rs. {user['balance']:,.2f}
+- Account Type: {user['type']}
+- Credit Score: {user['credit_score']}
+- Recent Transactions:
+{recent}
+
+USER QUESTION: {user_query}
+
+YOUR RESPONSE (banking-only, max 300 words):"""
+
+# ============================================================================
+# PREFILL METRICS
+# ============================================================================
+
+class PrefillStats:
+    """Prompt-evaluation (prefill) time reported by Ollama for recent requests"""
+
+    def __init__(self, maxlen: int = 200):
+        self.samples = deque(maxlen=maxlen)
+
+    def record(self, final_chunk: Dict) -> Dict:
+        """Store the timings from Ollama's final (`done`) response object"""
+        # Some Ollama versions leave the prompt_eval fields out when the whole prompt was cached.
+        sample = {
+            "prompt_tokens": final_chunk.get("prompt_eval_count", 0),
+            "prefill_ms": final_chunk.get("prompt_eval_duration", 0) / 1e6,
+            "load_ms": final_chunk.get("load_duration", 0) / 1e6,
+        }
+        self.samples.append(sample)
+        return sample
+
+    def summary(self) -> Dict:
+        if not self.samples:
+            return {"requests": 0}
+        prefill = [s["prefill_ms"] for s in self.samples]
+        return {
+            "requests": len(prefill),
+            "last_ms": prefill[-1],
+            "avg_ms": sum(prefill) / len(prefill),
+            "last_tokens": self.samples[-1]["prompt_tokens"],
+        }
+
+
+prefill_stats = PrefillStats()
@@ -0,0 +1,260 @@
+# rerun_profiler.py
+"""Opt-in profiler for Streamlit reruns.
+
+Set BANKBOT_PROFILE_MODE to time the named sections of every rerun ("sections"), or to
+also sample the whole rerun with cProfile ("cprofile") or pyinstrument
+("pyinstrument", if installed). Each rerun is appended to PROFILE_DIR/reruns.jsonl;
+sampled reruns also get a .prof / .html file. Users listed in ADMIN_USERS see a
+breakdown panel in the sidebar.
+
+Compare two runs offline with: python rerun_profiler.py before.jsonl after.jsonl
+"""
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import sys
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional
+
+import streamlit as st
+
+from config import settings
+
+PROFILE_MODE = settings.PROFILE_MODE  # off | sections | cprofile | pyinstrument
+PROFILE_DIR = settings.PROFILE_DIR
+ADMIN_USERS = settings.ADMIN_USERS
+HISTORY_KEY = "_rerun_profiles"
+HISTORY_LENGTH = 20
+
+_current: ContextVar[Optional["RerunProfile"]] = ContextVar("rerun_profile", default=None)
+
+# ============================================================================
+# PROFILE OF ONE RERUN
+# ============================================================================
+
+class RerunProfile:
+    def __init__(self, mode: str):
+        self.mode = mode
+        self.sections: List[Dict] = []
+        self.depth = 0
+        self.sampler = None
+        if mode == "cprofile":
+            self.sampler = cProfile.Profile()
+            try:
+                self.sampler.enable()
+            except ValueError:  # another profiler (e.g. a debugger) already owns the hook
+                self.sampler = None
+        elif mode == "pyinstrument":
+            try:
+                from pyinstrument import Profiler
+                self.sampler = Profiler()
+                self.sampler.start()
+            except ImportError:
+                print("pyinstrument is not installed; profiling sections only")
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def section(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        entry = {"name": name, "depth": self.depth, "start_ms": round((start - self.started) * 1000, 2)}
+        self.sections.append(entry)
+        self.depth += 1
+        try:
+            yield
+        finally:
+            self.depth -= 1
+            entry["ms"] = round((time.perf_counter() - start) * 1000, 2)
+
+    def stop(self) -> Dict:
+        total_ms = round((time.perf_counter() - self.started) * 1000, 2)
+        record = {
+            "timestamp": datetime.now().isoformat(timespec="milliseconds"),
+            "mode": self.mode,
+            "total_ms": total_ms,
+            "sections": [s for s in self.sections if "ms" in s],
+        }
+        if isinstance(self.sampler, cProfile.Profile):
+            self.sampler.disable()
+            stats = pstats.Stats(self.sampler, stream=io.StringIO())
+            record["top_functions"] = top_functions(stats)
+            record["profile_file"] = self._dump(lambda path: stats.dump_stats(path), "prof")
+        elif self.sampler is not None:
+            self.sampler.stop()
+            html = self.sampler.output_html()
+
+            def write_html(path: str) -> None:
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(html)
+            record["profile_file"] = self._dump(write_html, "html")
+        return record
+
+    def _dump(self, write: Callable[[str], object], extension: str) -> Optional[str]:
+        path = os.path.join(PROFILE_DIR, f"rerun-{datetime.now():%Y%m%d-%H%M%S-%f}.{extension}")
+        try:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            write(path)
+            return path
+        except OSError as e:
+            print(f"Could not save profile: {e}")
+            return None
+
+
+def top_functions(stats: pstats.Stats, limit: int = 12) -> List[Dict]:
+    rows = []
+    for (filename, line, func), (_, calls, _, cumulative, _) in stats.stats.items():
+        rows.append({
+            "function": f"{func} ({os.path.basename(filename)}:{line})",
+            "calls": calls,
+            "cumulative_ms": round(cumulative * 1000, 2),
+        })
+    return sorted(rows, key=lambda r: -r["cumulative_ms"])[:limit]
+
+# ============================================================================
+# PUBLIC API
+# ============================================================================
+
+def start_rerun(mode: str = PROFILE_MODE) -> Optional[RerunProfile]:
+    """Begins profiling this rerun; a no-op when profiling is off"""
+    if mode == "off":
+        return None
+    profile = RerunProfile(mode)
+    _current.set(profile)
+    return profile
+
+
+@contextmanager
+def section(name: str) -> Iterator[None]:
+    """Times a named UI section or backend call (nested sections are indented in the panel)"""
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    with profile.section(name):
+        yield
+
+
+def profiled(name: str) -> Callable:
+    """Decorator form of `section`"""
+    def decorate(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with section(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def profiled_fragment(name: str) -> Callable:
+    """Like `profiled`, but a fragment rerunning on its own is recorded as a rerun of its own"""
+    def decorate(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current.get() is not None:  # part of a full-app rerun
+                with section(name):
+                    return func(*args, **kwargs)
+            if start_rerun() is None:
+                return func(*args, **kwargs)
+            try:
+                with section(name):
+                    return func(*args, **kwargs)
+            finally:
+                # Also on st.rerun(): a fragment rerun usually ends in one after a chat turn
+                finish_rerun(f"fragment:{name}")
+        return wrapper
+    return decorate
+
+
+def finish_rerun(label: str) -> Optional[Dict]:
+    """Stops profiling, writes the rerun to PROFILE_DIR/reruns.jsonl and keeps it for the panel"""
+    profile = _current.get()
+    if profile is None:
+        return None
+    _current.set(None)
+    record = profile.stop()
+    record["label"] = label
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        with open(os.path.join(PROFILE_DIR, "reruns.jsonl"), "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+    except OSError as e:
+        print(f"Could not save rerun profile: {e}")
+    st.session_state.setdefault(HISTORY_KEY, deque(maxlen=HISTORY_LENGTH)).append(record)
+    return record
+
+
+def is_admin(user_id: Optional[str]) -> bool:
+    return bool(user_id) and (user_id in ADMIN_USERS or "*" in ADMIN_USERS)
+
+# ============================================================================
+# SIDEBAR PANEL
+# ============================================================================
+
+def average_sections(records: List[Dict]) -> Dict[str, float]:
+    totals: Dict[str, List[float]] = {}
+    for record in records:
+        for entry in record["sections"]:
+            totals.setdefault(entry["name"], []).append(entry["ms"])
+    return {name: sum(values) / len(values) for name, values in totals.items()}
+
+
+def render_panel() -> None:
+    history = list(st.session_state.get(HISTORY_KEY, []))
+    if not history:
+        return
+    last = history[-1]
+    with st.sidebar.expander("⏱️ Rerun profile", expanded=False):
+        st.caption(f"Last rerun ({last['label']}): {last['total_ms']:.0f} ms · mode: {last['mode']}")
+        st.dataframe(
+            [{"section": "  " * s["depth"] + s["name"], "ms": s["ms"],
+              "% of rerun": round(100 * s["ms"] / last["total_ms"], 1) if last["total_ms"] else 0.0}
+             for s in last["sections"]],
+            hide_index=True, use_container_width=True
+        )
+        averages = average_sections(history)
+        st.caption(f"Average over the last {len(history)} reruns: "
+                   f"{sum(r['total_ms'] for r in history) / len(history):.0f} ms")
+        st.dataframe(
+            [{"section": name, "avg ms": round(ms, 2)} for name, ms in sorted(averages.items(), key=lambda kv: -kv[1])],
+            hide_index=True, use_container_width=True
+        )
+        if last.get("top_functions"):
+            st.caption("cProfile: slowest functions (cumulative)")
+            st.dataframe(last["top_functions"], hide_index=True, use_container_width=True)
+        if last.get("profile_file"):
+            st.caption(f"Saved: {last['profile_file']}")
+
+# ============================================================================
+# OFFLINE COMPARISON
+# ============================================================================
+
+def load_records(path: str) -> List[Dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main() -> None:
+    if len(sys.argv) < 2:
+        print(__doc__)
+        return
+    runs = [(path, load_records(path)) for path in sys.argv[1:3]]
+    averages = [average_sections(records) for _, records in runs]
+    totals = [sum(r["total_ms"] for r in records) / len(records) if records else 0.0 for _, records in runs]
+    names = sorted(set().union(*averages), key=lambda n: -averages[0].get(n, 0.0))
+    header = f"{'section':<28}" + "".join(f"{os.path.basename(path)[:14]:>16}" for path, _ in runs)
+    print(header + (f"{'delta ms':>12}" if len(runs) == 2 else ""))
+    for name, values in [("(rerun total)", totals)] + [(n, [a.get(n, 0.0) for a in averages]) for n in names]:
+        line = f"{name:<28}" + "".join(f"{v:>16.2f}" for v in values)
+        if len(values) == 2:
+            line += f"{values[1] - values[0]:>+12.2f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
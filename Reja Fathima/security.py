@@ -1,5 +1,4 @@
 # security.py
-import bcrypt
 import secrets
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Tuple
@@ -12,6 +11,7 @@ class PasswordHasher:
     @staticmethod
     def hash_password(password: str) -> str:
         """Hash a password using bcrypt"""
+        import bcrypt  # deferred: only needed once a form is submitted, not to draw the login page
         salt = bcrypt.gensalt(rounds=12)
         hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
         return hashed.decode('utf-8')
@@ -19,6 +19,7 @@ class PasswordHasher:
     @staticmethod
     def verify_password(password: str, hashed: str) -> bool:
         """Verify a password against a hash"""
+        import bcrypt
         try:
             return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
         except Exception:
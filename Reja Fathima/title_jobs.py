@@ -0,0 +1,92 @@
+# title_jobs.py
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from difflib import get_close_matches
+from typing import Callable, Dict, Iterable, Optional
+
+# First questions this close (difflib ratio on the normalized text) share a title
+SIMILARITY_CUTOFF = 0.9
+
+
+def normalize_question(text: str) -> str:
+    return " ".join(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+class TitleJobs:
+    """Generates chat titles off the request path and caches them by first question.
+
+    `request()` returns a title straight away: a cached one if this (or a very
+    similar) question was titled before, otherwise the `placeholder` title while
+    the LLM title is generated in the background. Finished titles are picked up with
+    `collect()` on a later rerun. Shared by every session in the process.
+    """
+
+    MAX_UNCOLLECTED = 256
+
+    def __init__(self, generate: Callable[[str], Optional[str]], placeholder: Callable[[str], str],
+                 max_workers: int = 1, cache_size: int = 512, cutoff: float = SIMILARITY_CUTOFF):
+        self.generate = generate  # question -> title, or None on failure
+        self.placeholder = placeholder
+        self.cutoff = cutoff
+        self.cache_size = cache_size
+        self._cache = OrderedDict()  # normalized question -> title
+        self._pending = {}  # job id -> Future
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="titles")
+
+    def cached(self, question: str) -> Optional[str]:
+        key = normalize_question(question)
+        with self._lock:
+            if key not in self._cache:
+                close = get_close_matches(key, list(self._cache), n=1, cutoff=self.cutoff)
+                if not close:
+                    return None
+                key = close[0]
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+    def _remember(self, question: str, title: str) -> None:
+        with self._lock:
+            self._cache[normalize_question(question)] = title
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _run(self, question: str) -> Optional[str]:
+        try:
+            title = self.generate(question)
+        except Exception as e:
+            print(f"Title generation failed: {e}")
+            return None
+        if title:
+            self._remember(question, title)
+        return title
+
+    def request(self, job_id: str, question: str) -> str:
+        title = self.cached(question)
+        if title:
+            return title
+        with self._lock:
+            if len(self._pending) > self.MAX_UNCOLLECTED:
+                # Sessions that ended never collect; their titles are in the cache anyway.
+                self._pending = {k: f for k, f in self._pending.items() if not f.done()}
+            if job_id not in self._pending:
+                self._pending[job_id] = self._pool.submit(self._run, question)
+        return self.placeholder(question)
+
+    def pending(self, job_ids: Iterable[str]) -> bool:
+        with self._lock:
+            return any(job_id in self._pending for job_id in job_ids)
+
+    def collect(self, job_ids: Iterable[str]) -> Dict[str, str]:
+        """Finished titles for these job ids, as {job id: title}. Failed jobs are dropped."""
+        finished = {}
+        with self._lock:
+            for job_id in job_ids:
+                future = self._pending.get(job_id)
+                if future is not None and future.done():
+                    del self._pending[job_id]
+                    if future.result():
+                        finished[job_id] = future.result()
+        return finished
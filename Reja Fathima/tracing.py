@@ -0,0 +1,293 @@
+# tracing.py
+# Typed port of the shared M Nihan Anoop/tracing.py, configured from config.settings; keep the two in step.
+"""Per-request latency spans, Prometheus metrics and a rolling JSONL trace file.
+
+    with request_trace("chat"):
+        with span("retrieval"):
+            ...
+
+Spans recorded inside a request_trace are written to TRACE_FILE as one JSON
+line per request. Every span, inside a trace or not, also feeds the histograms
+served on http://127.0.0.1:METRICS_PORT/metrics.
+
+Summarize a trace file with: python tracing.py [traces.jsonl]
+"""
+import contextvars
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterator, List, Optional
+
+from config import settings
+
+TRACE_FILE = settings.TRACE_FILE  # empty disables the file
+TRACE_FILE_MAX_BYTES = int(settings.TRACE_MAX_MB * 2 ** 20)
+METRICS_PORT = settings.METRICS_PORT  # 0 disables the endpoint
+
+# Histogram bucket bounds in seconds.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_current = contextvars.ContextVar("bankbot_trace", default=None)
+
+
+class Histogram:
+    def __init__(self) -> None:
+        self.buckets = [0] * len(BUCKETS)  # cumulative, as Prometheus expects
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.sum += seconds
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+
+
+class Metrics:
+    def __init__(self, prefix: str = "bankbot") -> None:
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self.spans: Dict[str, Histogram] = {}
+        self.requests: Dict[str, Histogram] = {}
+        self.counters: Dict[tuple, float] = {}  # (metric, sorted labels) -> value
+
+    def observe_span(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.spans.setdefault(name, Histogram()).observe(seconds)
+
+    def observe_request(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.requests.setdefault(name, Histogram()).observe(seconds)
+
+    def inc(self, metric: str, value: float = 1, **labels) -> None:
+        key = (metric, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def _histogram_lines(self, metric: str, label: str, histograms: Dict[str, Histogram]) -> Iterator[str]:
+        for value, hist in sorted(histograms.items()):
+            for bound, count in zip(BUCKETS, hist.buckets):
+                yield f'{metric}_bucket{{{label}="{value}",le="{bound}"}} {count}'
+            yield f'{metric}_bucket{{{label}="{value}",le="+Inf"}} {hist.count}'
+            yield f'{metric}_sum{{{label}="{value}"}} {hist.sum:.6f}'
+            yield f'{metric}_count{{{label}="{value}"}} {hist.count}'
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            lines = [
+                f"# HELP {self.prefix}_span_seconds Time spent in each stage of a request.",
+                f"# TYPE {self.prefix}_span_seconds histogram",
+                *self._histogram_lines(f"{self.prefix}_span_seconds", "span", self.spans),
+                f"# HELP {self.prefix}_request_seconds End-to-end time of traced requests.",
+                f"# TYPE {self.prefix}_request_seconds histogram",
+                *self._histogram_lines(f"{self.prefix}_request_seconds", "name", self.requests),
+            ]
+            for metric in sorted({metric for metric, _ in self.counters}):
+                lines.append(f"# TYPE {self.prefix}_{metric} counter")
+                for (name, labels), value in sorted(self.counters.items()):
+                    if name == metric:
+                        label_text = ",".join(f'{k}="{v}"' for k, v in labels)
+                        lines.append(f"{self.prefix}_{metric}{{{label_text}}} {value}")
+        return "\n".join(lines) + "\n"
+
+
+class Trace:
+    def __init__(self, name: str, **attrs) -> None:
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.attrs = attrs
+        self.spans: List[Dict] = []
+        self.timestamp = datetime.now().isoformat(timespec="milliseconds")
+        self.started = time.perf_counter()
+
+    def add(self, name: str, seconds: float, start: Optional[float] = None, **attrs) -> None:
+        entry = {"name": name, "ms": round(seconds * 1000, 2)}
+        if start is not None:
+            entry["start_ms"] = round((start - self.started) * 1000, 2)
+        entry.update(attrs)
+        self.spans.append(entry)
+
+    def to_dict(self, total_seconds: float, status: str) -> Dict:
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "timestamp": self.timestamp,
+            "status": status,
+            "total_ms": round(total_seconds * 1000, 2),
+            "attrs": self.attrs,
+            "spans": self.spans,
+        }
+
+
+class TraceWriter:
+    """Appends traces to a JSONL file, rolling it over to `<file>.1` past max_bytes."""
+
+    def __init__(self, path: str, max_bytes: int) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def write(self, record: Dict) -> None:
+        if not self.path:
+            return
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock:
+            try:
+                if os.path.exists(self.path) and os.path.getsize(self.path) + len(line) > self.max_bytes:
+                    os.replace(self.path, f"{self.path}.1")
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line)
+            except OSError as e:
+                print(f"Could not write trace: {e}")
+
+
+metrics = Metrics()
+trace_writer = TraceWriter(TRACE_FILE, TRACE_FILE_MAX_BYTES)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current.get()
+
+
+@contextmanager
+def request_trace(name: str, **attrs) -> Iterator[Trace]:
+    """Collects the spans of one user request and writes them out when it ends."""
+    trace = Trace(name, **attrs)
+    token = _current.set(trace)
+    status = "ok"
+    try:
+        yield trace
+    except Exception as e:
+        # st.rerun()/st.stop() derive from BaseException and aren't failures.
+        status = "error"
+        trace.attrs["error"] = repr(e)
+        raise
+    finally:
+        _current.reset(token)
+        total = time.perf_counter() - trace.started
+        metrics.observe_request(name, total)
+        metrics.inc("requests_total", name=name, status=status)
+        trace_writer.write(trace.to_dict(total, status))
+
+
+def record_span(name: str, seconds: float, start: Optional[float] = None, **attrs) -> None:
+    metrics.observe_span(name, seconds)
+    trace = _current.get()
+    if trace is not None:
+        trace.add(name, seconds, start, **attrs)
+
+
+@contextmanager
+def span(name: str, **attrs) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, time.perf_counter() - start, start=start, **attrs)
+
+
+def traced(name: str) -> Callable:
+    """Decorator form of `span` for functions."""
+    def decorate(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def record_ollama(result: Dict, first_token_seconds: Optional[float] = None) -> None:
+    """Ollama's own timings from a final (done) response: model load, prefill and decode.
+
+    Without a measured `first_token_seconds` (non-streamed replies), time to
+    first token is taken as Ollama's load + prefill time.
+    """
+    load = result.get("load_duration", 0) / 1e9
+    prefill = result.get("prompt_eval_duration", 0) / 1e9
+    decode = result.get("eval_duration", 0) / 1e9
+    if load:
+        record_span("model_load", load)
+    record_span("prefill", prefill)
+    record_span("decode", decode)
+    record_span("time_to_first_token", first_token_seconds if first_token_seconds is not None else load + prefill)
+
+    prompt_tokens = result.get("prompt_eval_count", 0)
+    generated_tokens = result.get("eval_count", 0)
+    metrics.inc("ollama_tokens_total", prompt_tokens, phase="prompt")
+    metrics.inc("ollama_tokens_total", generated_tokens, phase="generated")
+    trace = _current.get()
+    if trace is not None:
+        if result.get("model"):
+            trace.attrs["model"] = result["model"]
+        trace.attrs.update({
+            "prompt_tokens": prompt_tokens,
+            "generated_tokens": generated_tokens,
+            "decode_tokens_per_s": round(generated_tokens / decode, 1) if decode else None,
+        })
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = metrics.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port: int = METRICS_PORT, host: str = "127.0.0.1") -> Optional[ThreadingHTTPServer]:
+    """Serves /metrics from a daemon thread. Returns None when disabled or the port is taken."""
+    if not port:
+        return None
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        # Usually another BankBot app on this host already has the port
+        print(f"Error: metrics endpoint not started, port {port} is unavailable ({e}). "
+              f"Set BANKBOT_METRICS_PORT to a free port for this app.")
+        return None
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    print(f"Prometheus metrics on http://{host}:{port}/metrics")
+    return server
+
+
+def percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] if values else 0.0
+
+
+def main() -> None:
+    path = sys.argv[1] if len(sys.argv) > 1 else TRACE_FILE
+    durations = {}
+    with open(path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    for record in records:
+        durations.setdefault("(total)", []).append(record["total_ms"])
+        for entry in record["spans"]:
+            durations.setdefault(entry["name"], []).append(entry["ms"])
+    print(f"{len(records)} traces from {path}")
+    print(f"{'span':<22}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'total s':>10}")
+    for name, values in sorted(durations.items(), key=lambda item: -sum(item[1])):
+        print(f"{name:<22}{len(values):>7}{percentile(values, 0.5):>10.1f}"
+              f"{percentile(values, 0.95):>10.1f}{sum(values) / 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()